@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+
+The /events change feed only streams live events when served from here;
+each open stream is a coroutine on the event loop, not a thread.
 """
 
 import os
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import weakref
+
+from django.conf import settings
+from django.core.cache import cache
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from . import metrics
+from .cache import RESPONSE_CACHE_TIMEOUT, STATS_KEY, VERSION_KEY, _initial_version, cached_views, response_key
+
+
+logger = logging.getLogger(__name__)
+
+# redis.asyncio connections are bound to the event loop that opened them.
+_clients = weakref.WeakKeyDictionary()
+
+
+def uses_redis():
+    return settings.CACHES['default']['BACKEND'] == 'django_redis.cache.RedisCache'
+
+
+def get_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        options = settings.CACHES['default'].get('OPTIONS', {})
+        client = _clients[loop] = aioredis.Redis.from_url(
+            settings.CACHES['default']['LOCATION'],
+            socket_connect_timeout=options.get('SOCKET_CONNECT_TIMEOUT'),
+            socket_timeout=options.get('SOCKET_TIMEOUT'),
+        )
+    return client
+
+
+# Keys and values are encoded with django_redis' own client so the sync and
+# async paths read and write the very same entries.
+
+async def aget_many(keys):
+    if not uses_redis():
+        return await cache.aget_many(keys)
+    try:
+        values = await get_client().mget([cache.client.make_key(key) for key in keys])
+    except RedisError:
+        logger.warning('Redis unavailable, skipping cache read', exc_info=True)
+        return {}
+    return {key: cache.client.decode(value) for key, value in zip(keys, values) if value is not None}
+
+
+async def aget(key):
+    return (await aget_many([key])).get(key)
+
+
+async def aset(key, value, timeout=RESPONSE_CACHE_TIMEOUT, nx=False):
+    if not uses_redis():
+        if nx:
+            return await cache.aadd(key, value, timeout)
+        return await cache.aset(key, value, timeout)
+    try:
+        return await get_client().set(cache.client.make_key(key), cache.client.encode(value), ex=timeout, nx=nx)
+    except RedisError:
+        logger.warning('Redis unavailable, skipping cache write', exc_info=True)
+
+
+async def aincr(key):
+    if not uses_redis():
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+        return
+    try:
+        await get_client().incr(cache.client.make_key(key))
+    except RedisError:
+        logger.warning('Redis unavailable, skipping counter update', exc_info=True)
+
+
+async def aget_versions(namespaces):
+    keys = [VERSION_KEY.format(namespace) for namespace in namespaces]
+    versions = await aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await aset(key, _initial_version(), timeout=None, nx=True)
+            versions[key] = await aget(key)
+    return [versions[key] for key in keys]
+
+
+async def acache_payload(name, namespaces, request, build):
+    """
+    Async counterpart of ``cache_response``: return the cached payload for
+    ``request`` or await ``build()`` and cache its result.
+    """
+    cached_views.add(name)
+    key = response_key(name, await aget_versions(namespaces), request)
+    data = await aget(key)
+    metrics.record_cache_lookup(data is not None)
+    if data is not None:
+        await aincr(STATS_KEY.format(name, 'hits'))
+        return data
+
+    await aincr(STATS_KEY.format(name, 'misses'))
+    data = await build()
+    await aset(key, data)
+    return data
@@ -0,0 +1,118 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers, status
+from rest_framework.response import Response
+
+
+MAX_BATCH_SIZE = 1000
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that, under a BulkListSerializer, looks objects
+    up among those fetched once for the whole batch instead of querying for
+    every item.
+    """
+
+    def to_pk(self, data):
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError, ValueError):
+            return None
+
+    def to_internal_value(self, data):
+        prefetched = self.context.get('prefetched', {}).get(self.field_name)
+        if prefetched is None:
+            return super().to_internal_value(data)
+        pk = None if isinstance(data, bool) else self.to_pk(data)
+        if pk is None:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in prefetched:
+            self.fail('does_not_exist', pk_value=data)
+        return prefetched[pk]
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    ``many=True`` serializer for creating objects in bulk. Every item is
+    validated and invalid ones are set aside in ``item_errors`` rather than
+    failing the whole list; the others are handed to the child's
+    ``bulk_create``. Related fields are resolved with one IN query each.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('allow_empty', False)
+        kwargs.setdefault('max_length', MAX_BATCH_SIZE)
+        super().__init__(*args, **kwargs)
+        self.item_errors = {}
+        self.valid_indexes = []
+        self.created_indexes = []
+
+    def prefetch(self, data):
+        prefetched = {}
+        for name, field in self.child.fields.items():
+            if isinstance(field, PrefetchedPrimaryKeyRelatedField) and not field.read_only:
+                pks = {field.to_pk(item.get(name)) for item in data if isinstance(item, dict)}
+                pks.discard(None)
+                prefetched[name] = field.get_queryset().in_bulk(pks)
+        self.context['prefetched'] = prefetched
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data or len(data) > self.max_length:
+            # ListSerializer raises the matching type or length error.
+            return super().to_internal_value(data)
+
+        self.prefetch(data)
+        validated = []
+        for index, item in enumerate(data):
+            try:
+                validated.append(self.run_child_validation(item))
+            except serializers.ValidationError as e:
+                self.item_errors[index] = e.detail
+            else:
+                self.valid_indexes.append(index)
+        return validated
+
+    def create(self, validated_data):
+        # bulk_create returns, per item, the created object or the errors
+        # that kept it from being created.
+        created = []
+        for index, result in zip(self.valid_indexes, self.child.bulk_create(validated_data)):
+            if isinstance(result, dict):
+                self.item_errors[index] = result
+            else:
+                self.created_indexes.append(index)
+                created.append(result)
+        return created
+
+    @property
+    def results(self):
+        """Per item, in request order, ``{'index', 'data'}`` or ``{'index', 'errors'}``."""
+        results = {index: {'index': index, 'errors': errors} for index, errors in self.item_errors.items()}
+        for index, data in zip(self.created_indexes, self.data):
+            results[index] = {'index': index, 'data': data}
+        return [results[index] for index in sorted(results)]
+
+
+class BulkItemResultSerializer(serializers.Serializer):
+    index = serializers.IntegerField()
+    data = serializers.DictField(required=False)
+    errors = serializers.DictField(required=False)
+
+
+class BulkResultSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    results = BulkItemResultSerializer(many=True)
+
+
+def bulk_response(serializer):
+    """
+    The per-item results of a saved BulkListSerializer: 201 when every item
+    was created, 400 when none was and 207 Multi-Status when only some were.
+    """
+    if not serializer.item_errors:
+        status_code = status.HTTP_201_CREATED
+    elif not serializer.created_indexes:
+        status_code = status.HTTP_400_BAD_REQUEST
+    else:
+        status_code = status.HTTP_207_MULTI_STATUS
+    return Response({'created': len(serializer.created_indexes), 'results': serializer.results}, status=status_code)
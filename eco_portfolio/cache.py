@@ -0,0 +1,111 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import metrics
+
+
+RESPONSE_CACHE_TIMEOUT = 60 * 15
+VERSION_KEY = 'cache_version:{}'
+RESPONSE_KEY = 'response:{}:{}:{}'
+STATS_KEY = 'cache_stats:{}:{}'
+
+cached_views = set()
+
+
+def _initial_version():
+    # Seeding from the clock means a version key that was evicted never
+    # restarts at a number whose payloads may still be sitting in the cache.
+    return time.time_ns() // 1000
+
+
+def _incr(key, initial):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, initial, timeout=None)
+        return initial
+
+
+def get_versions(namespaces):
+    keys = [VERSION_KEY.format(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(*namespaces):
+    for namespace in namespaces:
+        _incr(VERSION_KEY.format(namespace), _initial_version())
+
+
+def response_key(name, versions, request):
+    # The absolute URI is hashed because paginated payloads embed absolute links.
+    url = hashlib.md5(request.build_absolute_uri().encode('utf-8')).hexdigest()
+    return RESPONSE_KEY.format(name, '.'.join(str(version) for version in versions), url)
+
+
+def make_response_key(name, namespaces, request):
+    return response_key(name, get_versions(namespaces), request)
+
+
+def record_lookup(name, hit):
+    metrics.record_cache_lookup(hit)
+    _incr(STATS_KEY.format(name, 'hits' if hit else 'misses'), 1)
+
+
+def get_stats(names=None):
+    names = sorted(names or cached_views)
+    keys = [STATS_KEY.format(name, kind) for name in names for kind in ('hits', 'misses')]
+    counters = cache.get_many(keys)
+    stats = {}
+    for name in names:
+        hits = counters.get(STATS_KEY.format(name, 'hits'), 0)
+        misses = counters.get(STATS_KEY.format(name, 'misses'), 0)
+        total = hits + misses
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+        }
+    return stats
+
+
+def reset_stats(names=None):
+    names = names or cached_views
+    cache.delete_many([STATS_KEY.format(name, kind) for name in names for kind in ('hits', 'misses')])
+
+
+def cache_response(name, namespaces, timeout=RESPONSE_CACHE_TIMEOUT):
+    """
+    Cache the serialized payload of an APIView GET handler.
+
+    The key embeds the current version of every namespace the payload is
+    built from, so bumping a namespace invalidates all of its entries at
+    once; the stale ones simply expire.
+    """
+    cached_views.add(name)
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            key = make_response_key(name, namespaces, request)
+            data = cache.get(key)
+            if data is not None:
+                record_lookup(name, hit=True)
+                return Response(data, status=status.HTTP_200_OK)
+
+            record_lookup(name, hit=False)
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, timeout)
+            return response
+        return wrapper
+    return decorator
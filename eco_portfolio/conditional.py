@@ -0,0 +1,64 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def conditional_get(validators):
+    """
+    Answer If-None-Match / If-Modified-Since for an APIView GET handler.
+
+    ``validators(request, *args, **kwargs)`` returns ``(etag, last_modified)``
+    from a cheap query. It runs before the handler, so a 304 costs neither
+    the full query nor serialization. Works like Django's ``condition``
+    decorator, but computes both validators with a single call.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            etag, last_modified = validators(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+            timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = method(view, request, *args, **kwargs)
+
+            if response.status_code in (200, 304):
+                if etag is not None and not response.has_header('ETag'):
+                    response.headers['ETag'] = etag
+                if timestamp is not None and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(timestamp)
+            return response
+        return wrapper
+    return decorator
+
+
+def _tag(request, *parts):
+    raw = '|'.join([request.get_full_path(), *(str(part) for part in parts)])
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def collection_validators(queryset, updated_field='updated_at'):
+    """
+    Validators for a list endpoint. The row count catches deletions that the
+    latest modification time alone would miss, and the query string is part
+    of the tag because pagination and filters change the representation.
+    Only the ETag is sent: a Last-Modified of the newest row would not move
+    when an older one is deleted, so If-Modified-Since could answer a stale 304.
+    """
+    def validators(request, *args, **kwargs):
+        stats = queryset.all().aggregate(count=Count('pk'), last_modified=Max(updated_field))
+        return _tag(request, stats['count'], stats['last_modified']), None
+    return validators
+
+
+def instance_validators(queryset, lookup='pk', updated_field='updated_at'):
+    def validators(request, *args, **kwargs):
+        last_modified = queryset.filter(**{lookup: kwargs[lookup]}).values_list(updated_field, flat=True).first()
+        if last_modified is None:
+            return None, None
+        return _tag(request, last_modified.isoformat()), last_modified
+    return validators
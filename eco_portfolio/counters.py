@@ -0,0 +1,39 @@
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+
+def _touch(model, values):
+    # Counters are part of the representation, so validators built on
+    # updated_at (see conditional.py) must see the change.
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        values['updated_at'] = timezone.now()
+    return values
+
+
+def apply_deltas(model, field, deltas):
+    """
+    Add ``deltas`` (``{pk: delta}``) to the counter column ``field`` with a
+    single UPDATE. The new value is computed by the database from F(), so
+    concurrent writers never lose each other's increments.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if pk is not None and delta}
+    if not deltas:
+        return 0
+    change = Case(
+        *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+        default=Value(0), output_field=IntegerField(),
+    )
+    # Clamped at zero: a drifted counter must not fail the write that moves it.
+    values = _touch(model, {field: Greatest(F(field) + change, Value(0))})
+    return model.objects.filter(pk__in=deltas).update(**values)
+
+
+def recount(queryset, field, count):
+    """
+    Set ``field`` to ``count``, a subquery counting the related rows of
+    ``OuterRef('pk')``, on the rows of ``queryset`` where it is off. Returns
+    the number of rows corrected.
+    """
+    actual = Coalesce(count, Value(0))
+    return queryset.exclude(**{field: actual}).update(**_touch(queryset.model, {field: actual}))
@@ -0,0 +1,85 @@
+import threading
+from importlib import import_module
+
+
+# Stand-ins for drf_yasg's ``openapi`` module and ``swagger_auto_schema``, so
+# views can declare their documentation without importing drf_yasg (and
+# pkg_resources, yaml, uritemplate...) when a worker starts. Declarations
+# are recorded and only turned into drf_yasg objects by ``install()``, which
+# runs the first time the schema is generated.
+
+
+class _Attribute:
+    def __init__(self, module, name):
+        self.module = module
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        return _Call(self, args, kwargs)
+
+    def __repr__(self):
+        return f'{self.module}.{self.name}'
+
+
+class _Call:
+    def __init__(self, target, args, kwargs):
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs
+
+    def __repr__(self):
+        return f'{self.target!r}(...)'
+
+
+class _Module:
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _Attribute(self._name, name)
+
+
+openapi = _Module('drf_yasg.openapi')
+no_body = _Attribute('drf_yasg.utils', 'no_body')
+
+_pending = []
+_lock = threading.Lock()
+
+
+def resolve(value):
+    """Build the drf_yasg objects described by ``value``, recursively."""
+    if isinstance(value, _Attribute):
+        return getattr(import_module(value.module), value.name)
+    if isinstance(value, _Call):
+        return resolve(value.target)(*resolve(value.args), **resolve(value.kwargs))
+    if isinstance(value, dict):
+        return {key: resolve(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(resolve(item) for item in value)
+    return value
+
+
+def swagger_auto_schema(**kwargs):
+    """Record drf_yasg's ``swagger_auto_schema`` for ``install()`` to apply."""
+    def decorator(view_method):
+        with _lock:
+            _pending.append((view_method, kwargs))
+        return view_method
+    return decorator
+
+
+def install():
+    """
+    Apply the recorded decorators with drf_yasg. The URLconf is loaded first
+    so every view module has registered its declarations.
+    """
+    from django.urls import get_resolver
+    from drf_yasg.utils import swagger_auto_schema as decorate
+
+    get_resolver().url_patterns
+    with _lock:
+        while _pending:
+            view_method, kwargs = _pending.pop()
+            decorate(**resolve(kwargs))(view_method)
@@ -0,0 +1,307 @@
+import asyncio
+import itertools
+import logging
+import threading
+import weakref
+from collections import deque
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from redis.exceptions import RedisError
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+
+from . import metrics
+from .async_cache import get_client, uses_redis
+
+
+logger = logging.getLogger(__name__)
+
+# Change events are published to one Redis channel and kept in a sorted set
+# scored by event id, which is the replay buffer behind Last-Event-ID.
+CHANNEL = 'events'
+LAST_ID_KEY = 'events:last_id'
+BUFFER_KEY = 'events:buffer'
+REPLAY_SIZE = 1000
+# Events a stream may fall behind before it is resynced from the buffer.
+QUEUE_SIZE = 256
+HEARTBEAT_INTERVAL = 15.0
+READY_TIMEOUT = 2.0
+RECONNECT_DELAY = 1.0
+RETRY_MS = 3000
+# Payload fields only streams opened with API credentials receive.
+PRIVATE_FIELDS = {'team': ('members',)}
+
+# Messages are '<id> <topic> <json>'; the id is assigned by the script so
+# ids, buffer order and publish order always agree.
+PUBLISH_SCRIPT = """
+for i = 3, #ARGV do
+    local id = redis.call('INCR', KEYS[1])
+    local message = id .. ' ' .. ARGV[i]
+    redis.call('ZADD', KEYS[2], id, message)
+    redis.call('PUBLISH', ARGV[1], message)
+end
+redis.call('ZREMRANGEBYRANK', KEYS[2], 0, -tonumber(ARGV[2]) - 1)
+"""
+
+RESYNC = object()
+
+_script = None
+
+# Without Redis (development, tests) events only reach the streams of this process.
+_local_ids = itertools.count(1)
+_local_buffer = deque(maxlen=REPLAY_SIZE)
+_local_lock = threading.Lock()
+
+# One hub per event loop, like the redis.asyncio clients.
+_hubs = weakref.WeakKeyDictionary()
+
+
+def _publish_script():
+    global _script
+    if _script is None:
+        from django_redis import get_redis_connection
+
+        _script = get_redis_connection('default').register_script(PUBLISH_SCRIPT)
+    return _script
+
+
+def publish(events):
+    """Publish ``[(topic, data), ...]`` now."""
+    messages = [f'{topic} {orjson.dumps(data).decode()}' for topic, data in events]
+    if uses_redis():
+        try:
+            _publish_script()(keys=[LAST_ID_KEY, BUFFER_KEY], args=[CHANNEL, REPLAY_SIZE, *messages])
+        except RedisError:
+            # Like the cache, the feed fails open; clients still resync from the API.
+            logger.warning('Redis unavailable, dropping %d change events', len(messages), exc_info=True)
+            return
+    else:
+        with _local_lock:
+            messages = [f'{next(_local_ids)} {message}' for message in messages]
+            _local_buffer.extend(messages)
+            hubs = list(_hubs.items())
+        for loop, hub in hubs:
+            try:
+                loop.call_soon_threadsafe(hub.dispatch, messages)
+            except RuntimeError:
+                pass
+    metrics.inc('events_published_total', value=len(messages))
+
+
+def emit(topic, action, items):
+    """
+    Publish one ``topic`` event per dict in ``items`` once the current
+    transaction commits, so rolled back changes are never announced.
+    """
+    events = [(topic, {'action': action, **item}) for item in items]
+    if events:
+        transaction.on_commit(lambda: publish(events))
+
+
+def _parse(message):
+    event_id, topic, data = message.split(' ', 2)
+    return int(event_id), topic, data
+
+
+async def replay(after):
+    """
+    The buffered messages after event id ``after``, whether they are all of
+    them (False when the buffer no longer reaches back that far) and the
+    latest event id.
+    """
+    if uses_redis():
+        pipeline = get_client().pipeline(transaction=False)
+        pipeline.zrangebyscore(BUFFER_KEY, f'({after or 0}', '+inf')
+        pipeline.get(LAST_ID_KEY)
+        try:
+            messages, last = await pipeline.execute()
+        except RedisError:
+            logger.warning('Redis unavailable, change feed not replayed', exc_info=True)
+            return [], True, after or 0
+        messages = [message.decode() for message in messages]
+        last = int(last or 0)
+    else:
+        with _local_lock:
+            messages = list(_local_buffer)
+        last = _parse(messages[-1])[0] if messages else 0
+        messages = [message for message in messages if _parse(message)[0] > (after or 0)]
+    if after is None:
+        return [], True, last
+    oldest = _parse(messages[0])[0] if messages else last + 1
+    # An id past the last one means the counter was reset with the buffer.
+    return messages, after <= last and oldest <= after + 1, last
+
+
+class Hub:
+    """
+    Fans the change events out to every stream served by one event loop,
+    over a single pub/sub connection. Streams that fall behind, or miss
+    events while Redis is unreachable, are resynced from the replay buffer.
+    """
+
+    def __init__(self):
+        self.queues = set()
+        self.ready = asyncio.Event()
+        self.task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        self.queues.add(queue)
+        if not uses_redis():
+            self.ready.set()
+        elif self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.queues.discard(queue)
+        if not self.queues and self.task is not None:
+            self.task.cancel()
+            self.task = None
+            self.ready.clear()
+
+    async def wait_ready(self):
+        try:
+            await asyncio.wait_for(self.ready.wait(), READY_TIMEOUT)
+        except TimeoutError:
+            pass
+
+    def dispatch(self, messages):
+        for queue in list(self.queues):
+            for message in messages:
+                try:
+                    queue.put_nowait(message)
+                except asyncio.QueueFull:
+                    self._resync(queue)
+                    break
+
+    def resync(self):
+        for queue in list(self.queues):
+            self._resync(queue)
+
+    def _resync(self, queue):
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESYNC)
+
+    async def _listen(self):
+        reconnected = False
+        while True:
+            pubsub = get_client().pubsub()
+            try:
+                await pubsub.subscribe(CHANNEL)
+                self.ready.set()
+                if reconnected:
+                    self.resync()
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        self.dispatch([message['data'].decode()])
+            except RedisError:
+                logger.warning('Redis unavailable, change feed paused', exc_info=True)
+            finally:
+                self.ready.clear()
+                await pubsub.aclose()
+            reconnected = True
+            await asyncio.sleep(RECONNECT_DELAY)
+
+
+def get_hub():
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = Hub()
+    return hub
+
+
+def format_event(event_id, topic, data):
+    return f'id: {event_id}\nevent: {topic}\ndata: {data}\n\n'
+
+
+def public_data(topic, data):
+    fields = PRIVATE_FIELDS.get(topic)
+    if not fields:
+        return data
+    payload = orjson.loads(data)
+    for field in fields:
+        payload.pop(field, None)
+    return orjson.dumps(payload).decode()
+
+
+async def event_stream(after, topics, follow=True, authenticated=False):
+    """
+    Server-sent events after event id ``after``: the buffered ones first,
+    then live ones when ``follow``. A ``reset`` event tells the client that
+    some events were lost and it should refetch what it shows. Without
+    ``authenticated``, PRIVATE_FIELDS are left out of the payloads.
+    """
+    hub = get_hub() if follow else None
+    queue = hub.subscribe() if follow else None
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        if follow:
+            await hub.wait_ready()
+        item = RESYNC
+        while True:
+            if item is RESYNC:
+                messages, complete, last = await replay(after)
+                if not complete:
+                    yield format_event(last, 'reset', '{}')
+                    after, messages = last, []
+                after = last if after is None else after
+            else:
+                messages = [] if item is None else [item]
+            for message in messages:
+                event_id, topic, data = _parse(message)
+                if event_id <= after:
+                    continue
+                after = event_id
+                if topics is None or topic in topics:
+                    yield format_event(event_id, topic, data if authenticated else public_data(topic, data))
+            if not follow:
+                return
+            try:
+                item = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+            except TimeoutError:
+                item = None
+                yield ': keepalive\n\n'
+    finally:
+        if follow:
+            hub.unsubscribe(queue)
+
+
+def authenticate(request):
+    """The user of the request's API credentials, as DRF views find it, or None."""
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = authentication_class().authenticate(request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+@require_GET
+async def events_view(request):
+    try:
+        user = await sync_to_async(authenticate)(request)
+    except APIException as e:
+        return JsonResponse({'detail': e.detail}, status=e.status_code)
+    after = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        after = int(after) if after else None
+    except ValueError:
+        after = None
+    topics = request.GET.get('topics')
+    topics = set(topics.split(',')) if topics else None
+    # A WSGI server would buffer an endless response, so there only the
+    # backlog is sent and EventSource reconnects after RETRY_MS.
+    follow = isinstance(request, ASGIRequest)
+    response = StreamingHttpResponse(
+        event_stream(after, topics, follow, authenticated=user is not None), content_type='text/event-stream',
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
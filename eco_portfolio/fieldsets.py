@@ -0,0 +1,92 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+from .docs import openapi
+
+
+fieldset_parameters = [
+    openapi.Parameter('fields', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                      description='Comma-separated fields to return; all fields by default.'),
+    openapi.Parameter('exclude', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                      description='Comma-separated fields to leave out.'),
+    openapi.Parameter('profile', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['card'],
+                      description='A named set of fields; "card" is the compact form for lists.'),
+]
+
+
+def _split(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """
+    Let clients pick the fields of a ModelSerializer with ``?fields=``,
+    ``?exclude=`` or a named ``?profile=`` from ``Meta.profiles``.
+
+    Views resolve the selection once with ``get_fieldset(request.GET)``,
+    pass it to the serializer as ``context={'fields': ...}`` and narrow
+    their queryset with ``narrow_queryset`` so unused columns are never
+    read. Fields not backed by a column of the same name declare theirs in
+    ``Meta.field_sources``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get('fields')
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+    @classmethod
+    def get_fieldset(cls, params):
+        """
+        The field names selected by the query ``params``, or None when the
+        full representation was asked for.
+        """
+        profile, fields, exclude = params.get('profile'), params.get('fields'), params.get('exclude')
+        if not (profile or fields or exclude):
+            return None
+        if profile and fields:
+            raise ValidationError({'fields': ['Use either fields or profile, not both.']})
+
+        available = tuple(cls.Meta.fields)
+        profiles = getattr(cls.Meta, 'profiles', {})
+        if profile:
+            if profile not in profiles:
+                raise ValidationError({'profile': [f'Unknown profile; one of: {", ".join(sorted(profiles))}.']})
+            selected = profiles[profile]
+        elif fields:
+            selected = _split(fields)
+        else:
+            selected = available
+
+        excluded = _split(exclude or '')
+        unknown = sorted(set(selected) - set(available) | set(excluded) - set(available))
+        if unknown:
+            raise ValidationError({'fields': [f'Unknown fields: {", ".join(unknown)}.']})
+        return tuple(name for name in available if name in selected and name not in excluded)
+
+    @classmethod
+    def get_columns(cls, fieldset):
+        model = cls.Meta.model
+        sources = getattr(cls.Meta, 'field_sources', {})
+        columns = []
+        for name in fieldset:
+            for column in sources.get(name, (name,)):
+                try:
+                    field = model._meta.get_field(column)
+                except FieldDoesNotExist:
+                    continue
+                if field.concrete and not field.many_to_many:
+                    columns.append(column)
+        return columns
+
+    @classmethod
+    def narrow_queryset(cls, queryset, fieldset, keep=()):
+        """
+        Defer the columns ``fieldset`` does not need. ``keep`` lists columns
+        read outside the serializer, such as the pagination ordering.
+        """
+        if fieldset is None:
+            return queryset
+        return queryset.only('pk', *keep, *cls.get_columns(fieldset))
@@ -0,0 +1,190 @@
+import atexit
+import heapq
+import itertools
+import logging
+import os
+import smtplib
+import threading
+import time
+
+from django.core.mail import get_connection
+from django.db import transaction
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+# After the first message of a batch is due, wait this long for more.
+BATCH_WINDOW = 0.2
+# The SMTP connection is kept open between batches and closed once idle.
+IDLE_TIMEOUT = 30.0
+MAX_ATTEMPTS = 5
+# Doubled after every failed attempt: 2, 4, 8, 16 seconds.
+RETRY_DELAY = 2.0
+SHUTDOWN_TIMEOUT = 5.0
+
+# Anything but a response to a single message means the connection is
+# unusable; the rest of the batch is retried on a new one.
+CONNECTION_ERRORS = (smtplib.SMTPException, OSError)
+
+
+class MailQueue:
+    """
+    In-process outgoing mail queue. Requests only append messages; a daemon
+    worker thread sends them in batches over one SMTP connection that is
+    reused until it has been idle for IDLE_TIMEOUT. Temporary failures are
+    retried with exponential backoff, permanent (5xx) ones are dropped.
+    Pending mail lives in memory, so it is lost if the process dies.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = []
+        self._order = itertools.count()
+        self._busy = False
+        self._thread = None
+        self._pid = None
+        self._send_lock = threading.Lock()
+        self.connection = None
+        self.last_used = 0.0
+
+    def put(self, messages, attempt=0, delay=0.0):
+        with self._cond:
+            due = time.monotonic() + delay
+            for message in messages:
+                heapq.heappush(self._pending, (due, next(self._order), attempt, message))
+            self._start_worker()
+            self._cond.notify_all()
+
+    def _start_worker(self):
+        # A forked worker process inherits the queue but not the thread.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        if self._pid is None:
+            atexit.register(self.drain, SHUTDOWN_TIMEOUT)
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='mail-queue', daemon=True)
+        self._thread.start()
+
+    def drain(self, timeout=None):
+        """Wait until every queued message is sent or dropped; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self):
+        with self._send_lock:
+            if self.connection is not None:
+                try:
+                    self.connection.close()
+                finally:
+                    self.connection = None
+
+    def _next_batch(self):
+        """The next batch of due messages, or None when the connection should be closed."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._pending and self._pending[0][0] <= now:
+                    window_end = now + BATCH_WINDOW
+                    while len(self._pending) < BATCH_SIZE and time.monotonic() < window_end:
+                        self._cond.wait(window_end - time.monotonic())
+                    batch = []
+                    now = time.monotonic()
+                    while self._pending and self._pending[0][0] <= now and len(batch) < BATCH_SIZE:
+                        batch.append(heapq.heappop(self._pending))
+                    self._busy = True
+                    return batch
+
+                self._busy = False
+                self._cond.notify_all()
+                timeout = self._pending[0][0] - now if self._pending else None
+                if self.connection is not None:
+                    idle = self.last_used + IDLE_TIMEOUT - now
+                    if idle <= 0:
+                        return None
+                    timeout = idle if timeout is None else min(timeout, idle)
+                self._cond.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                self.close()
+                continue
+            try:
+                self._send(batch)
+            except Exception:
+                logger.exception('Mail queue worker failed on a batch of %d messages', len(batch))
+                self._retry(batch)
+
+    def _send(self, batch):
+        with self._send_lock:
+            failed = []
+            try:
+                if self.connection is None:
+                    self.connection = get_connection(fail_silently=False)
+                self.connection.open()
+            except CONNECTION_ERRORS:
+                logger.warning('Could not connect to the mail server', exc_info=True)
+                self.connection = None
+                failed = batch
+            else:
+                for index, item in enumerate(batch):
+                    try:
+                        self.connection.send_messages([item[3]])
+                    except smtplib.SMTPRecipientsRefused as e:
+                        logger.error('Mail to %s rejected: %s', item[3].to, e.recipients)
+                        metrics.inc('mail_messages_total', {'result': 'rejected'})
+                    except smtplib.SMTPResponseException as e:
+                        if e.smtp_code >= 500:
+                            logger.error('Mail to %s rejected: %s', item[3].to, e)
+                            metrics.inc('mail_messages_total', {'result': 'rejected'})
+                        else:
+                            failed.append(item)
+                    except CONNECTION_ERRORS:
+                        logger.warning('Mail server connection lost', exc_info=True)
+                        self._discard_connection()
+                        failed.extend(batch[index:])
+                        break
+                    else:
+                        metrics.inc('mail_messages_total', {'result': 'sent'})
+                self.last_used = time.monotonic()
+        self._retry(failed)
+
+    def _discard_connection(self):
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+        self.connection = None
+
+    def _retry(self, items):
+        for _, _, attempt, message in items:
+            attempt += 1
+            if attempt >= MAX_ATTEMPTS:
+                logger.error('Giving up on mail to %s after %d attempts', message.to, attempt)
+                metrics.inc('mail_messages_total', {'result': 'failed'})
+            else:
+                metrics.inc('mail_messages_total', {'result': 'retried'})
+                self.put([message], attempt, RETRY_DELAY * 2 ** (attempt - 1))
+
+
+mail_queue = MailQueue()
+
+
+def send_later(messages):
+    """
+    Queue ``messages`` once the current transaction commits, so a rolled
+    back request sends nothing and no request waits on the mail server.
+    """
+    messages = [message for message in messages if message.recipients()]
+    if messages:
+        transaction.on_commit(lambda: mail_queue.put(messages))
@@ -0,0 +1,292 @@
+import atexit
+import contextvars
+import hmac
+import ipaddress
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = 'metrics:series'
+FLUSH_INTERVAL = 1.0
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+METRICS = {
+    'http_requests_total': ('counter', 'Requests handled, by route, method and status code.'),
+    'http_request_duration_seconds': ('histogram', 'Request latency, by route and method.'),
+    'db_queries_total': ('counter', 'Database queries executed, by route.'),
+    'db_query_duration_seconds_total': ('counter', 'Time spent in database queries, by route.'),
+    'db_replica_fallbacks_total': ('counter', 'Replica reads served by the primary because no replica was healthy.'),
+    'response_cache_lookups_total': ('counter', 'Response cache lookups, by route and result.'),
+    'auth_user_cache_lookups_total': ('counter', 'Authenticated user lookups, by the tier that answered.'),
+    'mail_messages_total': ('counter', 'Outgoing mail, by result: sent, retried, rejected or failed.'),
+    'events_published_total': ('counter', 'Change events published to the event stream.'),
+}
+
+# Per-request counters, filled by the DB wrapper and the cache layer.
+_current = contextvars.ContextVar('metrics_request', default=None)
+
+# Updates go to a process-local buffer; the lock only guards dict updates.
+# A daemon thread flushes the buffer into a Redis hash shared by every worker
+# process once per FLUSH_INTERVAL, with one pipelined round trip, so requests
+# never wait on Redis.
+_pending = defaultdict(float)
+_totals = defaultdict(float)
+_lock = threading.Lock()
+_flusher = None
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    pairs = ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                     for key, value in sorted(labels.items()))
+    return f'{name}{{{pairs}}}'
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def _start_flusher():
+    global _flusher, _flusher_pid
+
+    with _flusher_lock:
+        # A forked worker process inherits the buffer but not the thread.
+        if _flusher is not None and _flusher.is_alive() and _flusher_pid == os.getpid():
+            return
+        if _flusher_pid is None:
+            atexit.register(flush)
+        _flusher_pid = os.getpid()
+        _flusher = threading.Thread(target=_flush_forever, name='metrics-flush', daemon=True)
+        _flusher.start()
+
+
+def _flush_forever():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception:
+            logger.exception('Metrics flush failed')
+
+
+def inc(name, labels=None, value=1.0):
+    series = _series(name, labels)
+    with _lock:
+        _pending[series] += value
+    if _flusher_pid != os.getpid():
+        _start_flusher()
+
+
+def observe(name, labels, value):
+    updates = [(_series(f'{name}_bucket', {**labels, 'le': _format_bound(bound)}), 1.0)
+               for bound in LATENCY_BUCKETS if value <= bound]
+    updates.append((_series(f'{name}_sum', labels), value))
+    updates.append((_series(f'{name}_count', labels), 1.0))
+    with _lock:
+        for series, amount in updates:
+            _pending[series] += amount
+    if _flusher_pid != os.getpid():
+        _start_flusher()
+
+
+def record_cache_lookup(hit):
+    state = _current.get()
+    if state is not None:
+        state['cache_hits' if hit else 'cache_misses'] += 1
+
+
+def _get_redis():
+    from .async_cache import uses_redis
+
+    if not uses_redis():
+        return None
+    from django_redis import get_redis_connection
+
+    return get_redis_connection('default')
+
+
+def flush():
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+    if not batch:
+        return
+
+    client = _get_redis()
+    if client is None:
+        with _lock:
+            for series, value in batch.items():
+                _totals[series] += value
+        return
+    try:
+        pipeline = client.pipeline(transaction=False)
+        for series, value in batch.items():
+            pipeline.hincrbyfloat(METRICS_KEY, series, value)
+        pipeline.execute()
+    except RedisError:
+        # Like the response cache, metrics fail open: the batch is dropped.
+        logger.warning('Redis unavailable, dropping metrics batch', exc_info=True)
+
+
+def collect():
+    flush()
+    client = _get_redis()
+    if client is None:
+        with _lock:
+            return dict(_totals)
+    try:
+        return {key.decode(): float(value) for key, value in client.hgetall(METRICS_KEY).items()}
+    except RedisError:
+        logger.warning('Redis unavailable, serving no metrics', exc_info=True)
+        return {}
+
+
+def reset():
+    with _lock:
+        _pending.clear()
+        _totals.clear()
+    client = _get_redis()
+    if client is not None:
+        try:
+            client.delete(METRICS_KEY)
+        except RedisError:
+            logger.warning('Redis unavailable, metrics not reset', exc_info=True)
+
+
+def render(series):
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        samples = sorted(
+            (key, value) for key, value in series.items()
+            if key.split('{', 1)[0] in (name, f'{name}_bucket', f'{name}_sum', f'{name}_count')
+        )
+        if not samples:
+            continue
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(f'{key} {int(value) if value.is_integer() else value!r}' for key, value in samples)
+    return '\n'.join(lines) + '\n'
+
+
+def is_allowed(request):
+    """
+    Scrapers either present METRICS_TOKEN as a bearer token or connect from
+    an address in METRICS_ALLOWED_IPS (addresses or networks).
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in getattr(settings, 'METRICS_ALLOWED_IPS', ()))
+
+
+@require_GET
+def metrics_view(request):
+    if not is_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    state = _current.get()
+    if state is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        state['queries'] += 1
+        state['query_time'] += time.perf_counter() - start
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    # Installed once per connection rather than per request, so queries run
+    # from sync_to_async threads are attributed through the context variable.
+    if _query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_query_wrapper)
+
+
+connection_created.connect(install_query_wrapper, dispatch_uid='metrics_query_wrapper')
+
+
+def _install_on_open_connections(**kwargs):
+    from django.db import connections
+
+    for connection in connections.all(initialized_only=True):
+        install_query_wrapper(None, connection)
+
+
+request_started.connect(_install_on_open_connections, dispatch_uid='metrics_open_connections')
+
+
+class MetricsMiddleware:
+    """
+    Record per-route request counts, latency, DB queries and response cache
+    lookups. Routes are labelled with the URL name, never the raw path, so
+    the number of series stays bounded.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token, start = self.begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, state, start)
+        return response
+
+    async def __acall__(self, request):
+        state, token, start = self.begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, state, start)
+        return response
+
+    def begin(self):
+        state = {'queries': 0, 'query_time': 0.0, 'cache_hits': 0, 'cache_misses': 0}
+        return state, _current.set(state), time.perf_counter()
+
+    def finish(self, request, response, state, start):
+        elapsed = time.perf_counter() - start
+        match = request.resolver_match
+        route = match.view_name if match is not None else 'unmatched'
+
+        inc('http_requests_total', {'route': route, 'method': request.method, 'status': response.status_code})
+        observe('http_request_duration_seconds', {'route': route, 'method': request.method}, elapsed)
+        if state['queries']:
+            inc('db_queries_total', {'route': route}, state['queries'])
+            inc('db_query_duration_seconds_total', {'route': route}, state['query_time'])
+        if state['cache_hits']:
+            inc('response_cache_lookups_total', {'route': route, 'result': 'hit'}, state['cache_hits'])
+        if state['cache_misses']:
+            inc('response_cache_lookups_total', {'route': route, 'result': 'miss'}, state['cache_misses'])
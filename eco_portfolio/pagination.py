@@ -0,0 +1,165 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .docs import openapi
+
+
+pagination_parameters = [
+    openapi.Parameter(
+        'cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description='Opaque cursor taken from the next/previous link of a page.',
+    ),
+    openapi.Parameter(
+        'page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+        description='Enables cursor pagination. Capped at 100 items per page.',
+    ),
+]
+
+
+class KeysetPagination:
+    """
+    Opt-in keyset pagination. A page is requested by passing ``cursor`` or
+    ``page_size``; without either the view keeps returning the full list,
+    unless ``optional`` is False.
+
+    Pages are fetched with ``WHERE (ordering) > (cursor) ORDER BY ordering
+    LIMIT n``, so the cost of a page does not depend on how deep it is.
+    The ordering must be unique, hence the trailing ``id``.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def __init__(self, ordering=('created_at', 'id'), optional=True):
+        self.ordering = tuple(ordering)
+        self.optional = optional
+
+    def is_requested(self, request):
+        if not self.optional:
+            return True
+        params = request.GET
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request, model):
+        encoded = request.GET.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values = payload['v']
+            reverse = bool(payload.get('r'))
+        except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Cursors come from the client: every value is checked like a form
+        # value of its field, so a tampered one cannot reach the query.
+        try:
+            values = [model._meta.get_field(field).clean(value, None) for field, value in zip(self.ordering, values)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def encode_cursor(self, values, reverse=False):
+        # Datetimes keep full microsecond precision, unlike DjangoJSONEncoder.
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def get_keyset_filter(self, values, reverse=False):
+        # Expands (a, b, c) > (x, y, z) into a > x OR (a = x AND (b > y OR ...)).
+        # The leading a >= x keeps the condition sargable for the composite index.
+        lookup = 'lt' if reverse else 'gt'
+        condition = Q(**{f'{self.ordering[-1]}__{lookup}': values[-1]})
+        for field, value in zip(reversed(self.ordering[:-1]), reversed(values[:-1])):
+            condition = Q(**{f'{field}__{lookup}': value}) | (Q(**{field: value}) & condition)
+        if len(self.ordering) > 1:
+            condition = Q(**{f'{self.ordering[0]}__{lookup}e': values[0]}) & condition
+        return condition
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request, queryset.model)
+        self.reverse = bool(self.cursor and self.cursor[1])
+        if self.cursor is not None:
+            queryset = queryset.filter(self.get_keyset_filter(self.cursor[0], self.reverse))
+        order_by = [f'-{field}' if self.reverse else field for field in self.ordering]
+        return queryset.order_by(*order_by)[:self.page_size_value + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size_value
+        results = list(results[:self.page_size_value])
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = self.cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        if results:
+            self.first_values = self.get_values(results[0])
+            self.last_values = self.get_values(results[-1])
+        elif self.cursor is not None:
+            self.first_values = self.last_values = self.cursor[0]
+        else:
+            self.has_next = self.has_previous = False
+        self.page = results
+        return results
+
+    def paginate_queryset(self, queryset, request):
+        if not self.is_requested(request):
+            return None
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        if not self.is_requested(request):
+            return None
+        return self.set_page([obj async for obj in self.get_page_queryset(queryset, request)])
+
+    def get_values(self, instance):
+        return [getattr(instance, field) for field in self.ordering]
+
+    def get_link(self, values, reverse):
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size_value)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(values, reverse))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.get_link(self.last_values, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.get_link(self.first_values, reverse=True)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
@@ -0,0 +1,59 @@
+from rest_framework import renderers, parsers
+from rest_framework.exceptions import ParseError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed. Values orjson does
+    not know (lazy strings, decimals, datetimes) go through DRF's encoder
+    and U+2028/U+2029 are escaped the same way, so the output is byte for
+    byte that of the default renderer, with two exceptions:
+
+    * NaN and infinite floats are written as null, where DRF's STRICT_JSON
+      raises ValueError;
+    * floats in exponent notation are written without the exponent's sign
+      and padding (1e16, not 1e+16), which is the same number.
+
+    Indented, ASCII-only, non-compact and non-strict output, and integers
+    beyond 64 bits, are left to the default renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact or not self.strict
+                or self.get_indent(accepted_media_type, renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError as exc:
+            # Only integers beyond 64 bits are retried; other errors are real.
+            if 'Integer exceeds' not in str(exc):
+                raise
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(parsers.JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        try:
+            body = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                body = body.decode(encoding)
+            return orjson.loads(body)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
@@ -0,0 +1,136 @@
+import contextlib
+import contextvars
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = 'use_primary'
+HEALTH_CHECK_INTERVAL = 10.0
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Set for safe requests that may read from a replica. Anything outside such a
+# request (writes, management commands, the test suite) reads the primary.
+_read_from_replica = contextvars.ContextVar('read_from_replica', default=False)
+
+# alias -> (healthy, checked_at); per process, refreshed every HEALTH_CHECK_INTERVAL.
+_health = {}
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+def check_replica(alias):
+    try:
+        with connections[alias].cursor() as cursor:
+            # A replica that has not received the schema yet is as good as down.
+            cursor.execute('SELECT 1 FROM django_migrations LIMIT 1')
+        return True
+    except DatabaseError as e:
+        logger.warning('Replica %s is unavailable: %s', alias, e)
+        return False
+
+
+def is_healthy(alias):
+    healthy, checked_at = _health.get(alias, (None, 0.0))
+    now = time.monotonic()
+    if healthy is None or now - checked_at >= HEALTH_CHECK_INTERVAL:
+        healthy = check_replica(alias)
+        _health[alias] = (healthy, now)
+    return healthy
+
+
+def healthy_replicas():
+    return [alias for alias in replica_aliases() if is_healthy(alias)]
+
+
+@contextlib.contextmanager
+def use_primary():
+    """Read from the primary inside the block, e.g. right after a write."""
+    token = _read_from_replica.set(False)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send writes to the primary and, inside requests ReplicaMiddleware lets
+    through, reads to a random healthy replica. Reads fall back to the
+    primary when no replica answers its health check.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _read_from_replica.get():
+            return DEFAULT_DB_ALIAS
+        replicas = healthy_replicas()
+        if not replicas:
+            if replica_aliases():
+                metrics.inc('db_replica_fallbacks_total')
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data, so objects may relate across them.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema from the primary, never from migrate.
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """
+    Let safe requests read from replicas, unless the client wrote something
+    in the last REPLICA_STICKY_SECONDS. A successful write sets a short-lived
+    cookie that keeps the client's reads on the primary until the replicas
+    have caught up, so nobody reads back stale data after their own write.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _read_from_replica.set(self.may_use_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        token = _read_from_replica.set(self.may_use_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+        return self.process_response(request, response)
+
+    def may_use_replica(self, request):
+        return request.method in SAFE_METHODS and STICKY_COOKIE not in request.COOKIES and bool(replica_aliases())
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replica_aliases():
+            response.set_cookie(
+                STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,155 @@
+import functools
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET
+
+from . import docs
+from .docs import openapi, resolve
+
+
+logger = logging.getLogger(__name__)
+
+API_INFO = openapi.Info(
+    title="AI Marketplace API",
+    default_version='v1',
+    description="An API for an AI marketplace",
+)
+API_URL = 'https://ecoapi.araltech.tech/'
+
+FORMATS = {
+    'json': ('application/json', 'OpenAPICodecJson'),
+    'yaml': ('application/yaml; charset=utf-8', 'OpenAPICodecYaml'),
+}
+SOURCE_DIRS = ('eco_portfolio', 'users', 'portfolio')
+
+# (version, format) -> (body, etag), loaded once per process.
+_loaded = {}
+_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """
+    settings.CODE_VERSION when the deploy sets it, otherwise a digest of the
+    project's Python sources, so any code change yields a new schema.
+    """
+    if settings.CODE_VERSION:
+        return settings.CODE_VERSION
+    digest = hashlib.sha256()
+    for directory in SOURCE_DIRS:
+        for path in sorted(Path(settings.BASE_DIR, directory).rglob('*.py')):
+            digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def artifact_path(fmt, version=None):
+    return Path(settings.OPENAPI_SCHEMA_DIR, f'openapi-{version or code_version()}.{fmt}')
+
+
+def generate_schema():
+    from drf_yasg import codecs
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    docs.install()
+    generator = OpenAPISchemaGenerator(resolve(API_INFO), url=API_URL)
+    schema = generator.get_schema(request=None, public=True)
+    return {fmt: getattr(codecs, codec)(validators=[]).encode(schema) for fmt, (_, codec) in FORMATS.items()}
+
+
+def _write_atomic(path, body):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.openapi-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(body)
+    os.replace(tmp, path)
+
+
+def write_artifacts(bodies, version=None):
+    """Store ``bodies`` for the current version and drop other versions' artifacts."""
+    version = version or code_version()
+    for fmt, body in bodies.items():
+        _write_atomic(artifact_path(fmt, version), body)
+    current = {artifact_path(fmt, version).name for fmt in FORMATS}
+    for stale in Path(settings.OPENAPI_SCHEMA_DIR).glob('openapi-*.*'):
+        if stale.name not in current:
+            stale.unlink(missing_ok=True)
+
+
+def _etag(version, body):
+    return f'"{version}-{hashlib.sha256(body).hexdigest()[:16]}"'
+
+
+def load_schema(fmt):
+    """
+    The schema in ``fmt`` and its ETag. Read from the artifact written at
+    deploy time by ``generate_schema``; when there is none yet, it is
+    generated on first use and written for the other workers.
+    """
+    version = code_version()
+    entry = _loaded.get((version, fmt))
+    if entry is not None:
+        return entry
+    with _lock:
+        entry = _loaded.get((version, fmt))
+        if entry is not None:
+            return entry
+        path = artifact_path(fmt, version)
+        if path.exists():
+            bodies = {fmt: path.read_bytes()}
+        else:
+            bodies = generate_schema()
+            try:
+                write_artifacts(bodies, version)
+            except OSError:
+                logger.warning('Could not write the OpenAPI schema artifact to %s', path.parent, exc_info=True)
+        for name, body in bodies.items():
+            _loaded[(version, name)] = (body, _etag(version, body))
+        return _loaded[(version, fmt)]
+
+
+@require_GET
+def schema_view(request, fmt='json'):
+    body, etag = load_schema(fmt)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type=FORMATS[fmt][0])
+    response.headers['ETag'] = etag
+    # The URL is not versioned, so clients revalidate; an unchanged schema costs a 304.
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def ui_view(renderer):
+    """
+    The Swagger UI or ReDoc page, built on first request so drf_yasg is not
+    imported at startup. Its ``?format=openapi`` spec requests are served
+    from the stored schema; the page itself is rendered without introspection.
+    """
+    views = []
+
+    def view(request, *args, **kwargs):
+        fmt = request.GET.get('format')
+        if fmt in ('openapi', 'json', 'yaml'):
+            return schema_view(request, 'yaml' if fmt == 'yaml' else 'json')
+        if not views:
+            from drf_yasg.views import get_schema_view
+            from rest_framework import permissions
+
+            schema_view_class = get_schema_view(
+                resolve(API_INFO),
+                url=API_URL,
+                public=True,
+                permission_classes=(permissions.AllowAny,),
+            )
+            views.append(schema_view_class.with_ui(renderer, cache_timeout=0))
+        return views[0](request, *args, **kwargs)
+    return view
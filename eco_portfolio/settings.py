@@ -1,10 +1,17 @@
 from pathlib import Path
+from importlib.util import find_spec
 import os
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# drf_yasg is not an installed app: importing it runs pkg_resources, which
+# dominates worker start-up. Its templates and static files are added to
+# TEMPLATES and STATICFILES_DIRS instead, and eco_portfolio/docs.py imports
+# the rest on first use of the docs.
+DRF_YASG_DIR = Path(find_spec('drf_yasg').origin).parent
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.0/howto/deployment/checklist/
@@ -29,7 +36,6 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework_simplejwt',
-    'drf_yasg',
     'corsheaders',
 
     'users',
@@ -37,6 +43,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'eco_portfolio.metrics.MetricsMiddleware',
+    'eco_portfolio.compression.CompressionMiddleware',
+    'eco_portfolio.replicas.ReplicaMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -52,7 +61,7 @@ ROOT_URLCONF = 'eco_portfolio.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [BASE_DIR / 'templates']
+        'DIRS': [BASE_DIR / 'templates', DRF_YASG_DIR / 'templates']
         ,
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,9 +85,28 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Persistent connections are opt-in: under ASGI every sync_to_async
+        # thread would keep one of its own, so only WSGI deployments should
+        # set CONN_MAX_AGE (e.g. 60); pool in the database otherwise.
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Comma-separated replica database names, e.g. DATABASE_REPLICAS=replica1.sqlite3,replica2.sqlite3.
+# Each becomes a read-only alias; fill SQLite replicas with `manage.py sync_replicas`.
+for index, name in enumerate(filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / name.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['eco_portfolio.replicas.PrimaryReplicaRouter']
+
+# How long a client's reads stay on the primary after it writes.
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -116,6 +144,7 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'static'
+STATICFILES_DIRS = [DRF_YASG_DIR / 'static']
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -130,8 +159,17 @@ AUTH_USER_MODEL = 'users.UserModel'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'users.authentication.JWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'eco_portfolio.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'eco_portfolio.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 SIMPLE_JWT = {
@@ -140,6 +178,8 @@ SIMPLE_JWT = {
 }
 
 SWAGGER_SETTINGS = {
+   # The UIs load the schema stored by `manage.py generate_schema` (see eco_portfolio/schema.py).
+   'SPEC_URL': 'schema-json',
    'SECURITY_DEFINITIONS': {
        'Bearer': {
            'type': 'apiKey',
@@ -150,23 +190,43 @@ SWAGGER_SETTINGS = {
    }
 }
 
+REDOC_SETTINGS = {
+   'SPEC_URL': 'schema-json',
+}
+
+# Schema artifacts are keyed by CODE_VERSION (e.g. the deployed commit); without
+# it, a digest of the project sources is used.
+CODE_VERSION = os.getenv('CODE_VERSION')
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'schema'
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
         "LOCATION": os.getenv('REDIS_URL', 'redis://localhost:6379/1'),
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "IGNORE_EXCEPTIONS": True,
         }
     }
 }
 
-EMAIL_HOST = os.getenv('EMAIL_HOST')
-EMAIL_PORT = os.getenv('EMAIL_PORT')
-EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
-EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
-EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS')
-DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
-SERVER_EMAIL = EMAIL_HOST_USER
+DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
+
+# /metrics answers scrapers from these addresses or networks, or presenting
+# METRICS_TOKEN as a bearer token. Behind a proxy REMOTE_ADDR is the proxy's,
+# so use the token there.
+METRICS_ALLOWED_IPS = [ip for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip]
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', '').lower() in ('1', 'true', 'yes')
+# Mail is sent from the eco_portfolio.mail worker thread, never from a request.
+EMAIL_TIMEOUT = 10
+DEFAULT_FROM_EMAIL = EMAIL_HOST_USER or 'noreply@localhost'
+SERVER_EMAIL = DEFAULT_FROM_EMAIL
 EMAIL_ADMIN = EMAIL_HOST_USER
 
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
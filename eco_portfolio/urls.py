@@ -1,22 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-from rest_framework import permissions
 from django.conf import settings
 from django.conf.urls.static import static
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="AI Marketplace API",
-        default_version='v1',
-        description="An API for an AI marketplace",
-    ),
-    url='https://ecoapi.araltech.tech/',
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
-
+from .events import events_view
+from .metrics import metrics_view
+from .schema import schema_view, ui_view
 
 
 urlpatterns = [
@@ -24,9 +13,13 @@ urlpatterns = [
 
     path('portfolio/', include('portfolio.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path('events', events_view, name='events'),
 
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    path('openapi.json', schema_view, {'fmt': 'json'}, name='schema-json'),
+    path('openapi.yaml', schema_view, {'fmt': 'yaml'}, name='schema-yaml'),
+    path('swagger/', ui_view('swagger'), name='schema-swagger-ui'),
+    path('redoc/', ui_view('redoc'), name='schema-redoc'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,73 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import NotFound, ValidationError
+
+from eco_portfolio.async_cache import acache_payload
+from eco_portfolio.pagination import KeysetPagination
+from .filters import filter_portfolios
+from .models import PortfolioModel, CategoryModel
+from .serializers import PortfolioSerializer, CategorySerializer
+
+
+# Async variants of the hot public read endpoints, meant to be served by an
+# ASGI server. Payloads are shared with the sync views' cache versions, so
+# writes through the regular endpoints invalidate them as well.
+
+
+def not_found(detail='Not found.'):
+    return JsonResponse({'detail': str(detail)}, status=status.HTTP_404_NOT_FOUND)
+
+
+async def paginated_list(request, queryset, serializer_class, ordering, context=None):
+    paginator = KeysetPagination(ordering=ordering)
+    page = await paginator.apaginate_queryset(queryset, request)
+    if page is not None:
+        return paginator.get_paginated_data(serializer_class(page, many=True, context=context).data)
+    return serializer_class([obj async for obj in queryset], many=True, context=context).data
+
+
+@require_GET
+async def portfolio_list(request):
+    async def build():
+        fieldset = PortfolioSerializer.get_fieldset(request.GET)
+        portfolios = filter_portfolios(PortfolioModel.objects.all(), request.GET)
+        portfolios = PortfolioSerializer.narrow_queryset(portfolios, fieldset, keep=('created_at',))
+        return await paginated_list(request, portfolios, PortfolioSerializer, ('created_at', 'id'),
+                                    context={'fields': fieldset})
+
+    try:
+        data = await acache_payload('portfolio-list', ['portfolio'], request, build)
+    except NotFound as e:
+        return not_found(e.detail)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=status.HTTP_400_BAD_REQUEST)
+    return JsonResponse(data, safe=False)
+
+
+@require_GET
+async def portfolio_detail(request, pk):
+    async def build():
+        fieldset = PortfolioSerializer.get_fieldset(request.GET)
+        portfolio = await PortfolioSerializer.narrow_queryset(PortfolioModel.objects.all(), fieldset).aget(pk=pk)
+        return PortfolioSerializer(portfolio, context={'fields': fieldset}).data
+
+    try:
+        data = await acache_payload('portfolio-detail', ['portfolio'], request, build)
+    except PortfolioModel.DoesNotExist:
+        return not_found()
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=status.HTTP_400_BAD_REQUEST)
+    return JsonResponse(data)
+
+
+@require_GET
+async def category_list(request):
+    async def build():
+        return await paginated_list(request, CategoryModel.objects.all(), CategorySerializer, ('id',))
+
+    try:
+        data = await acache_payload('category-list', ['category'], request, build)
+    except NotFound as e:
+        return not_found(e.detail)
+    return JsonResponse(data, safe=False)
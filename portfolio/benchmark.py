@@ -0,0 +1,342 @@
+import io
+import json
+import random
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from eco_portfolio.mail import SHUTDOWN_TIMEOUT, mail_queue
+from users.models import UserModel, TeamModel
+from users.skills import rebuild_skill_index
+from .counters import reconcile_counters
+from .models import PortfolioModel, CategoryModel
+from .search import rebuild_search_index
+from .uploads import create_session
+
+
+SCALES = {'1k': 1_000, '10k': 10_000, '100k': 100_000}
+SEED = 1337
+BATCH_SIZE = 1000
+PASSWORD = 'Benchmark1!'
+SKILLS = ('python', 'django', 'react', 'vue', 'go', 'rust', 'sql', 'docker', 'figma', 'ml')
+WORDS = (
+    'solar', 'water', 'recycling', 'air', 'quality', 'sensor', 'forest', 'energy', 'waste', 'soil',
+    'climate', 'tracker', 'map', 'platform', 'monitor', 'green', 'river', 'carbon', 'drone', 'farm',
+)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(latencies, elapsed):
+    return {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def drain_mail():
+    """
+    Send what the mail queue holds and drop its connection before the test
+    environment, whose locmem outbox that connection writes to, is torn down.
+    """
+    mail_queue.drain(SHUTDOWN_TIMEOUT)
+    mail_queue.close()
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def generate_data(portfolios, seed=SEED):
+    """
+    Fill the database with a deterministic synthetic catalog: ``portfolios``
+    portfolios, half as many users, one team per twenty portfolios with
+    five members each, and twenty categories.
+    """
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+    user_count = max(portfolios // 2, 10)
+    team_count = max(portfolios // 20, 2)
+
+    UserModel.objects.bulk_create(
+        [
+            UserModel(
+                username=f'user{i}', email=f'user{i}@example.com', password=password,
+                first_name=f'First{i}', last_name=f'Last{i}', role=rng.choice(['pm', 'developer']),
+                skills=rng.sample(SKILLS, 3),
+            )
+            for i in range(user_count)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    TeamModel.objects.bulk_create([TeamModel(name=f'Team {i}') for i in range(team_count)], batch_size=BATCH_SIZE)
+    CategoryModel.objects.bulk_create([CategoryModel(name=f'Category {i}') for i in range(20)])
+
+    user_ids = list(UserModel.objects.values_list('id', flat=True))
+    team_ids = list(TeamModel.objects.values_list('id', flat=True))
+    category_ids = list(CategoryModel.objects.values_list('id', flat=True))
+
+    Membership = TeamModel.members.through
+    Membership.objects.bulk_create(
+        [
+            Membership(teammodel_id=team_id, usermodel_id=user_id)
+            for team_id in team_ids
+            for user_id in rng.sample(user_ids, 5)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    for start in range(0, portfolios, BATCH_SIZE):
+        PortfolioModel.objects.bulk_create(
+            [
+                PortfolioModel(
+                    name=f'{_text(rng, 2).title()} {i}', description=_text(rng, 40),
+                    image='portfolio/benchmark.jpg', link=f'https://example.com/{i}',
+                    demo_video=f'https://video.example.com/{i}',
+                    team_id=rng.choice(team_ids), category_id=rng.choice(category_ids),
+                )
+                for i in range(start, min(start + BATCH_SIZE, portfolios))
+            ],
+        )
+    rebuild_search_index()
+    rebuild_skill_index()
+    reconcile_counters()
+
+    return {
+        'user': user_ids[0],
+        'team': team_ids[0],
+        'category': category_ids[0],
+        'portfolio': PortfolioModel.objects.values_list('id', flat=True).first(),
+    }
+
+
+class Context:
+    def __init__(self, ids):
+        self.ids = ids
+        self.user = UserModel.objects.get(pk=ids['user'])
+        self.access = str(RefreshToken.for_user(self.user).access_token)
+        self.counter = 0
+        self.rng = random.Random(SEED)
+        self.member_ids = list(UserModel.objects.order_by('id').values_list('id', flat=True)[:40])
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), 'green').save(buffer, 'PNG')
+        self.image = buffer.getvalue()
+
+    def unique(self):
+        self.counter += 1
+        return self.counter
+
+    def portfolio_form(self):
+        return {
+            'name': f'Benchmark {self.unique()}', 'description': _text(self.rng, 30),
+            'image': SimpleUploadedFile('benchmark.png', self.image, 'image/png'),
+            'link': 'https://example.com', 'demo_video': 'https://example.com',
+            'team': self.ids['team'], 'category': self.ids['category'],
+        }
+
+    def users(self, count):
+        return UserModel.objects.bulk_create([
+            UserModel(username=f'bench-{self.unique()}', email=f'bench-{self.counter}@example.com')
+            for _ in range(count)
+        ])
+
+    def members(self, count):
+        users = self.users(count)
+        TeamModel.objects.get(pk=self.ids['team']).members.add(*users)
+        return users
+
+    def portfolios(self, count):
+        template = PortfolioModel.objects.get(pk=self.ids['portfolio'])
+        created = []
+        for _ in range(count):
+            template.pk = None
+            template.save()
+            created.append(template.pk)
+        return created
+
+    def uploads(self, count):
+        return [create_session('benchmark.png', len(self.image)).pk for _ in range(count)]
+
+    def categories(self, count):
+        return [CategoryModel.objects.create(name=f'Disposable {self.unique()}').pk for _ in range(count)]
+
+    def teams(self, count):
+        return [TeamModel.objects.create(name=f'Disposable {self.unique()}').pk for _ in range(count)]
+
+
+class Endpoint:
+    """
+    One benchmarked request. ``prepare(ctx, count)`` creates one disposable
+    item per request for endpoints that consume what they touch (deletes,
+    single-use tokens); ``build(ctx, item)`` returns the request arguments.
+    """
+
+    def __init__(self, name, method, path, build=None, prepare=None, auth=False, heavy=False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.build = build
+        self.prepare = prepare
+        self.auth = auth
+        self.heavy = heavy
+
+    def requests(self, ctx, count):
+        items = self.prepare(ctx, count) if self.prepare else [None] * count
+        for item in items:
+            kwargs = self.build(ctx, item) if self.build else {}
+            if self.auth and 'HTTP_AUTHORIZATION' not in kwargs:
+                kwargs['HTTP_AUTHORIZATION'] = f'Bearer {ctx.access}'
+            yield self.path.format(item=item, **ctx.ids), kwargs
+
+
+def _multipart(data):
+    # Client.put() sends dicts as-is; only post() encodes multipart bodies.
+    return {'data': encode_multipart(BOUNDARY, data), 'content_type': MULTIPART_CONTENT}
+
+
+def _json(data):
+    return {'data': json.dumps(data), 'content_type': 'application/json'}
+
+
+def _bearer(user):
+    return f'Bearer {RefreshToken.for_user(user).access_token}'
+
+
+def _ndjson(ctx, item):
+    rows = [
+        {
+            'name': f'Imported {ctx.unique()}', 'description': 'Imported portfolio', 'image': 'portfolio/benchmark.jpg',
+            'link': 'https://example.com', 'demo_video': 'https://example.com',
+            'team': ctx.ids['team'], 'category': ctx.ids['category'],
+        }
+        for _ in range(100)
+    ]
+    return {'data': '\n'.join(json.dumps(row) for row in rows), 'content_type': 'application/x-ndjson'}
+
+
+ENDPOINTS = [
+    # portfolio/urls.py
+    Endpoint('GET portfolio', 'get', '/portfolio/', heavy=True),
+    Endpoint('GET portfolio (page)', 'get', '/portfolio/?page_size=50'),
+    Endpoint('GET portfolio (filtered)', 'get', '/portfolio/?page_size=50&category={category}&created_after=2000-01-01'),
+    Endpoint('GET portfolio (card)', 'get', '/portfolio/?page_size=50&profile=card'),
+    Endpoint('GET portfolio-facets', 'get', '/portfolio/facets/'),
+    Endpoint('POST portfolio', 'post', '/portfolio/', build=lambda ctx, item: {'data': ctx.portfolio_form()}),
+    Endpoint('GET portfolio-search', 'get', '/portfolio/search/?q=solar+energy'),
+    Endpoint('GET portfolio-export', 'get', '/portfolio/export/', heavy=True),
+    Endpoint('POST portfolio-import', 'post', '/portfolio/import/', build=_ndjson, auth=True, heavy=True),
+    Endpoint('GET portfolio-detail', 'get', '/portfolio/{portfolio}/'),
+    Endpoint('PUT portfolio-detail', 'put', '/portfolio/{item}/', prepare=Context.portfolios,
+             build=lambda ctx, item: _multipart(ctx.portfolio_form())),
+    Endpoint('DELETE portfolio-detail', 'delete', '/portfolio/{item}/', prepare=Context.portfolios),
+    Endpoint('GET categories', 'get', '/portfolio/categories/'),
+    Endpoint('POST categories', 'post', '/portfolio/categories/',
+             build=lambda ctx, item: _json({'name': f'Category {ctx.unique()}'})),
+    Endpoint('GET category-detail', 'get', '/portfolio/categories/{category}/'),
+    Endpoint('PUT category-detail', 'put', '/portfolio/categories/{item}/', prepare=Context.categories,
+             build=lambda ctx, item: _json({'name': f'Renamed {ctx.unique()}'})),
+    Endpoint('DELETE category-detail', 'delete', '/portfolio/categories/{item}/', prepare=Context.categories),
+    Endpoint('POST uploads', 'post', '/portfolio/uploads/',
+             build=lambda ctx, item: _json({'filename': 'benchmark.png', 'size': len(ctx.image)})),
+    Endpoint('PATCH upload-detail', 'patch', '/portfolio/uploads/{item}/', prepare=Context.uploads,
+             build=lambda ctx, item: {'data': ctx.image, 'content_type': 'application/offset+octet-stream',
+                                      'HTTP_UPLOAD_OFFSET': '0'}),
+    Endpoint('GET portfolio-async', 'get', '/portfolio/async/?page_size=50'),
+    Endpoint('GET portfolio-detail-async', 'get', '/portfolio/async/{portfolio}/'),
+    Endpoint('GET categories-async', 'get', '/portfolio/async/categories/'),
+
+    # users/urls.py
+    Endpoint('POST register', 'post', '/users/register/', heavy=True, build=lambda ctx, item: _json({
+        'username': f'new{ctx.unique()}', 'email': f'new{ctx.counter}@example.com', 'password': PASSWORD,
+    })),
+    Endpoint('POST login', 'post', '/users/login/', heavy=True,
+             build=lambda ctx, item: _json({'username': ctx.user.username, 'password': PASSWORD})),
+    Endpoint('GET me', 'get', '/users/me/', auth=True),
+    Endpoint('POST refresh-token', 'post', '/users/refresh-token/', prepare=Context.users,
+             build=lambda ctx, item: _json({'refresh': str(RefreshToken.for_user(item))})),
+    Endpoint('POST logout', 'post', '/users/logout/', prepare=Context.users,
+             build=lambda ctx, item: {**_json({}), 'HTTP_AUTHORIZATION': _bearer(item)}),
+    Endpoint('POST logout-all', 'post', '/users/logout-all/', prepare=Context.users,
+             build=lambda ctx, item: {'HTTP_AUTHORIZATION': _bearer(item)}),
+    Endpoint('GET users-list', 'get', '/users/users/', auth=True, heavy=True),
+    Endpoint('GET users-list (page)', 'get', '/users/users/?page_size=50', auth=True),
+    Endpoint('GET skills', 'get', '/users/skills/?prefix=d'),
+    Endpoint('GET skill-search (and)', 'get', '/users/skills/search/?skills=python,django&page_size=50', auth=True),
+    Endpoint('GET skill-search (or)', 'get', '/users/skills/search/?skills=rust,go&mode=or&page_size=50', auth=True),
+    Endpoint('GET users-list (card)', 'get', '/users/users/?page_size=50&profile=card', auth=True),
+    Endpoint('GET user-detail', 'get', '/users/user/{user}/', auth=True),
+    Endpoint('GET teams', 'get', '/users/teams/', auth=True, heavy=True),
+    Endpoint('POST teams', 'post', '/users/teams/', auth=True,
+             build=lambda ctx, item: _json({'name': f'New team {ctx.unique()}'})),
+    Endpoint('GET team-detail', 'get', '/users/team/{team}/'),
+    Endpoint('PUT team-detail', 'put', '/users/team/{item}/', prepare=Context.teams, auth=True,
+             build=lambda ctx, item: _json({'team_id': item, 'name': f'Renamed team {ctx.unique()}'})),
+    Endpoint('DELETE team-detail', 'delete', '/users/team/{item}/', prepare=Context.teams, auth=True),
+    Endpoint('POST team-add-member', 'post', '/users/team/{team}/add-member/', prepare=Context.users, auth=True,
+             build=lambda ctx, item: _json({'team_id': ctx.ids['team'], 'user_id': item.pk})),
+    Endpoint('POST team-remove-member', 'post', '/users/team/{team}/remove-member/', auth=True,
+             prepare=Context.members,
+             build=lambda ctx, item: _json({'team_id': ctx.ids['team'], 'user_id': item.pk})),
+    Endpoint('POST team-members', 'post', '/users/team/{item}/members/', prepare=Context.teams, auth=True,
+             build=lambda ctx, item: _json({'add': ctx.member_ids})),
+    Endpoint('POST teams-members', 'post', '/users/teams/members/', prepare=Context.teams, auth=True,
+             build=lambda ctx, item: _json({'teams': [{'team_id': item, 'add': ctx.member_ids}]})),
+    Endpoint('GET team-detail-async', 'get', '/users/async/team/{team}/'),
+]
+
+
+def run_endpoint(endpoint, ctx, requests, warmup):
+    # Broken endpoints are reported through their status codes, not raised.
+    client = Client(raise_request_exception=False)
+    latencies, queries, statuses = [], 0, {}
+    for index, (path, kwargs) in enumerate(endpoint.requests(ctx, warmup + requests)):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = getattr(client, endpoint.method)(path, **kwargs)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            elapsed = time.perf_counter() - start
+        if index < warmup:
+            continue
+        latencies.append(elapsed)
+        queries += len(captured.captured_queries)
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    result = summarize(latencies, sum(latencies))
+    result['queries'] = queries / len(latencies)
+    result['status_codes'] = statuses
+    return result
+
+
+def compare(results, baseline, threshold):
+    """
+    Return the regressions of ``results`` against a previous run: p95 latency
+    or throughput worse by more than ``threshold``, or more queries at all.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms")
+        if current['throughput'] < previous['throughput'] * (1 - threshold):
+            regressions.append(f"{name}: throughput {previous['throughput']:.1f} -> {current['throughput']:.1f} req/s")
+        if current['queries'] > previous['queries'] + 0.01:
+            regressions.append(f"{name}: queries {previous['queries']:.2f} -> {current['queries']:.2f}")
+    return regressions
@@ -0,0 +1,73 @@
+from collections import Counter
+
+from django.db.models import Count, OuterRef, Subquery
+
+from eco_portfolio.cache import bump_version
+from eco_portfolio.counters import apply_deltas, recount
+from users.membership import recount_members
+from users.models import TeamModel
+from .models import CategoryModel, PortfolioModel
+
+
+# TeamModel.portfolio_count and CategoryModel.portfolio_count follow every
+# portfolio create, delete and reassignment. A portfolio loaded from the
+# database or saved remembers the team and category it was counted under
+# (see PortfolioModel.mark_counted), which is what a reassignment is diffed
+# against.
+
+def count_changes(created=(), updated=(), deleted=()):
+    """
+    Apply the counter changes for saved or deleted portfolios with one
+    UPDATE per counter, however many portfolios there are.
+    """
+    teams, categories = Counter(), Counter()
+    for portfolio in created:
+        teams[portfolio.team_id] += 1
+        categories[portfolio.category_id] += 1
+    for portfolio in updated:
+        team_id, category_id = getattr(portfolio, '_counted', (None, None))
+        if team_id is not None and team_id != portfolio.team_id:
+            teams[team_id] -= 1
+            teams[portfolio.team_id] += 1
+        if category_id is not None and category_id != portfolio.category_id:
+            categories[category_id] -= 1
+            categories[portfolio.category_id] += 1
+    for portfolio in deleted:
+        team_id, category_id = getattr(portfolio, '_counted', (portfolio.team_id, portfolio.category_id))
+        teams[team_id] -= 1
+        categories[category_id] -= 1
+
+    changed = []
+    if apply_deltas(TeamModel, 'portfolio_count', teams):
+        changed.append('team')
+    if apply_deltas(CategoryModel, 'portfolio_count', categories):
+        changed.append('category')
+    if changed:
+        bump_version(*changed)
+    for portfolio in (*created, *updated):
+        portfolio.mark_counted()
+
+
+def _portfolio_count(field):
+    return Subquery(
+        PortfolioModel.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(count=Count('pk')).values('count')
+    )
+
+
+def reconcile_counters():
+    """
+    Recompute every counter from the rows it counts, with one UPDATE per
+    counter that only touches rows that drifted. Returns the number of rows
+    corrected per counter.
+    """
+    corrected = {
+        'team.portfolio_count': recount(TeamModel.objects.all(), 'portfolio_count', _portfolio_count('team')),
+        'category.portfolio_count': recount(
+            CategoryModel.objects.all(), 'portfolio_count', _portfolio_count('category'),
+        ),
+        'team.member_count': recount_members(),
+    }
+    if corrected['team.portfolio_count'] or corrected['category.portfolio_count']:
+        bump_version('team', 'category')
+    return corrected
@@ -0,0 +1,104 @@
+import datetime
+
+from django.db.models import Count, F, Value
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from eco_portfolio.docs import openapi
+from rest_framework.exceptions import ValidationError
+
+
+filter_parameters = [
+    openapi.Parameter('category', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                      description='Only portfolios in this category.'),
+    openapi.Parameter('team', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                      description='Only portfolios of this team.'),
+    openapi.Parameter('created_after', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME,
+                      description='Only portfolios created at or after this date or datetime.'),
+    openapi.Parameter('created_before', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME,
+                      description='Only portfolios created before this date or datetime.'),
+]
+
+# Primary keys are positive and fit a signed 64-bit column; larger values
+# would overflow in the database driver.
+MAX_ID = 2 ** 63 - 1
+
+
+def _parse_id(params, name, errors):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        errors[name] = ['A valid integer is required.']
+        return None
+    if not 0 < value <= MAX_ID:
+        errors[name] = [f'Must be between 1 and {MAX_ID}.']
+        return None
+    return value
+
+
+def _parse_moment(params, name, errors):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            date = parse_date(value)
+            if date is not None:
+                moment = datetime.datetime.combine(date, datetime.time.min)
+    except ValueError:
+        moment = None
+    if moment is None:
+        errors[name] = ['A valid date or ISO 8601 datetime is required.']
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_portfolios(queryset, params):
+    """
+    Apply the category, team and created_at range filters from ``params``.
+
+    Equality on category or team plus the range and keyset ordering on
+    (created_at, id) are served by the composite indexes on PortfolioModel.
+    """
+    errors = {}
+    category = _parse_id(params, 'category', errors)
+    team = _parse_id(params, 'team', errors)
+    created_after = _parse_moment(params, 'created_after', errors)
+    created_before = _parse_moment(params, 'created_before', errors)
+    if errors:
+        raise ValidationError(errors)
+
+    if category is not None:
+        queryset = queryset.filter(category_id=category)
+    if team is not None:
+        queryset = queryset.filter(team_id=team)
+    if created_after is not None:
+        queryset = queryset.filter(created_at__gte=created_after)
+    if created_before is not None:
+        queryset = queryset.filter(created_at__lt=created_before)
+    return queryset
+
+
+def portfolio_facets(queryset):
+    """
+    Count ``queryset`` per category and per team. Both GROUP BYs go to the
+    database as a single UNION ALL statement.
+    """
+    def grouped(kind, field):
+        return (
+            queryset.order_by()
+            .values(kind=Value(kind), key=F(f'{field}_id'), label=F(f'{field}__name'))
+            .annotate(count=Count('id'))
+        )
+
+    facets = {'categories': [], 'teams': []}
+    for row in grouped('categories', 'category').union(grouped('teams', 'team'), all=True):
+        facets[row['kind']].append({'id': row['key'], 'name': row['label'], 'count': row['count']})
+    for rows in facets.values():
+        rows.sort(key=lambda row: (-row['count'], row['id']))
+    return facets
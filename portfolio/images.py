@@ -0,0 +1,111 @@
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from eco_portfolio.cache import bump_version
+from .models import PortfolioModel
+
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_WIDTHS = (320, 640, 1280)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+DERIVATIVE_DIR = 'portfolio/derivatives/'
+
+executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-derivatives')
+
+
+def needs_derivatives(portfolio):
+    if not portfolio.image:
+        return False
+    return (portfolio.image_derivatives or {}).get('source') != portfolio.image.name
+
+
+def derivative_name(pk, source_name, width, extension):
+    # Sources in different directories, or with different extensions, can
+    # share a stem, and two portfolios can share a source: the digest keeps
+    # every portfolio's derivatives apart.
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    digest = hashlib.sha256(f'{pk}:{source_name}'.encode()).hexdigest()[:12]
+    return f'{DERIVATIVE_DIR}{stem}-{digest}-{width}w.{extension}'
+
+
+def generate_derivatives(pk, source_name):
+    with default_storage.open(source_name, 'rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    derivatives = {'source': source_name}
+    for extension, (image_format, options) in DERIVATIVE_FORMATS.items():
+        derivatives[extension] = {}
+        # Never upscale: widths above the original collapse into the original width.
+        for width in sorted({min(width, image.width) for width in DERIVATIVE_WIDTHS}):
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            if image_format == 'JPEG' and resized.mode != 'RGB':
+                resized = resized.convert('RGB')
+
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, **options)
+            # A file left at this name stays until the record that lists it
+            # is replaced; the storage then picks a free name.
+            name = derivative_name(pk, source_name, width, extension)
+            derivatives[extension][str(width)] = default_storage.save(name, ContentFile(buffer.getvalue()))
+    return derivatives
+
+
+def derivative_files(derivatives):
+    return {
+        name
+        for extension in DERIVATIVE_FORMATS
+        for name in (derivatives or {}).get(extension, {}).values()
+    }
+
+
+def process_portfolio_image(pk, force=False):
+    portfolio = PortfolioModel.objects.filter(pk=pk).only('image', 'image_derivatives').first()
+    if portfolio is None or not portfolio.image:
+        return 'skipped'
+    if not force and not needs_derivatives(portfolio):
+        return 'skipped'
+
+    derivatives = generate_derivatives(pk, portfolio.image.name)
+    # Only store the result if the image was not replaced while we were working.
+    updated = PortfolioModel.objects.filter(pk=pk, image=portfolio.image.name).update(
+        image_derivatives=derivatives, updated_at=timezone.now(),
+    )
+    if not updated:
+        for name in derivative_files(derivatives):
+            default_storage.delete(name)
+        return 'stale'
+
+    # Only files the previous record listed are removed.
+    for name in derivative_files(portfolio.image_derivatives) - derivative_files(derivatives):
+        default_storage.delete(name)
+    bump_version('portfolio')
+    return 'generated'
+
+
+def _run(pk):
+    try:
+        process_portfolio_image(pk)
+    except Exception:
+        logger.exception('Failed to generate image derivatives for portfolio %s', pk)
+    finally:
+        connections.close_all()
+
+
+def schedule_derivatives(portfolio):
+    if needs_derivatives(portfolio):
+        transaction.on_commit(lambda: executor.submit(_run, portfolio.pk))
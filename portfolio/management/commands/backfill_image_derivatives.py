@@ -0,0 +1,46 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from portfolio.images import process_portfolio_image
+from portfolio.models import PortfolioModel
+
+
+def _init_worker():
+    django.setup()
+    # Forked workers must not share the parent's database connection.
+    connections.close_all()
+
+
+def _process(args):
+    pk, force = args
+    try:
+        return pk, process_portfolio_image(pk, force=force)
+    except Exception as e:
+        return pk, f'failed: {e}'
+
+
+class Command(BaseCommand):
+    help = 'Generate resized image derivatives for existing portfolios.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: CPU count).')
+        parser.add_argument('--force', action='store_true', help='Regenerate derivatives that are already up to date.')
+
+    def handle(self, *args, **options):
+        pks = list(PortfolioModel.objects.exclude(image='').order_by('pk').values_list('pk', flat=True))
+        connections.close_all()
+
+        counts = {}
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as executor:
+            tasks = ((pk, options['force']) for pk in pks)
+            for pk, result in executor.map(_process, tasks, chunksize=16):
+                if result.startswith('failed'):
+                    self.stderr.write(f'Portfolio {pk}: {result}')
+                    result = 'failed'
+                counts[result] = counts.get(result, 0) + 1
+
+        summary = ', '.join(f'{name}={count}' for name, count in sorted(counts.items())) or 'nothing to do'
+        self.stdout.write(self.style.SUCCESS(f'Processed {len(pks)} portfolios: {summary}'))
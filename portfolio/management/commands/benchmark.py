@@ -0,0 +1,112 @@
+import json
+import logging
+import platform
+import tempfile
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from portfolio.benchmark import ENDPOINTS, SCALES, SEED, Context, compare, drain_mail, generate_data, run_endpoint
+
+
+CACHES = {
+    'locmem': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    'dummy': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway database with synthetic users, teams, categories and portfolios, then measure '
+        'throughput, p50/p95/p99 latency and queries per request for every API endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='1k', help='Number of portfolios to generate.')
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per endpoint.')
+        parser.add_argument('--only', nargs='+', default=[], help='Only run endpoints whose name contains one of these.')
+        parser.add_argument(
+            '--cache', choices=('configured', 'locmem', 'dummy'), default='configured',
+            help='Cache backend to run against; "dummy" measures the uncached code paths.',
+        )
+        parser.add_argument('--output', help='Write results as JSON to this path.')
+        parser.add_argument('--baseline', help='JSON file of a previous run to compare against.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.1,
+            help='Allowed relative p95/throughput regression against --baseline before failing.',
+        )
+
+    def get_endpoints(self, only):
+        endpoints = [endpoint for endpoint in ENDPOINTS if not only or any(name in endpoint.name for name in only)]
+        if not endpoints:
+            raise CommandError('No endpoint matches --only.')
+        return endpoints
+
+    def run(self, options):
+        setup_test_environment()
+        logging.disable(logging.ERROR)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            start = time.perf_counter()
+            ids = generate_data(SCALES[options['scale']])
+            self.stderr.write(f"Generated {options['scale']} dataset in {time.perf_counter() - start:.1f}s")
+
+            ctx = Context(ids)
+            results = {}
+            for endpoint in self.get_endpoints(options['only']):
+                # Full-table endpoints get a tenth of the requests so large scales finish.
+                requests = max(options['requests'] // 10, 1) if endpoint.heavy else options['requests']
+                results[endpoint.name] = run_endpoint(endpoint, ctx, requests, options['warmup'])
+                self.stderr.write(f'{endpoint.name}: done')
+            return results
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            logging.disable(logging.NOTSET)
+            drain_mail()
+            teardown_test_environment()
+
+    def handle(self, *args, **options):
+        overrides = {'MEDIA_ROOT': tempfile.mkdtemp(prefix='benchmark-media-')}
+        if options['cache'] != 'configured':
+            overrides['CACHES'] = CACHES[options['cache']]
+        with override_settings(**overrides):
+            results = self.run(options)
+
+        report = {
+            'meta': {
+                'scale': options['scale'],
+                'requests': options['requests'],
+                'cache': options['cache'],
+                'seed': SEED,
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2, sort_keys=True)
+
+        self.stdout.write(
+            f"{'endpoint':<30}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}  status"
+        )
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:<30}{stats['throughput']:>10.1f}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                f"{stats['p99_ms']:>10.2f}{stats['queries']:>9.1f}  {stats['status_codes']}"
+            )
+
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+            if baseline['meta']['scale'] != options['scale']:
+                raise CommandError(f"Baseline was recorded at scale {baseline['meta']['scale']}.")
+            regressions = compare(results, baseline['results'], options['threshold'])
+            if regressions:
+                raise CommandError('Regressions against baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline.'))
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from portfolio.benchmark import drain_mail, generate_data, summarize
+
+
+ENDPOINTS = (
+    ('portfolio list', '/portfolio/?page_size=50', '/portfolio/async/?page_size=50'),
+    ('portfolio detail', '/portfolio/{portfolio}/', '/portfolio/async/{portfolio}/'),
+    ('category list', '/portfolio/categories/', '/portfolio/async/categories/'),
+    ('team detail', '/users/team/{team}/', '/users/async/team/{team}/'),
+)
+
+
+def run_wsgi(path, requests, workers):
+    def call(_):
+        client = Client()
+        start = time.perf_counter()
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        start = time.perf_counter()
+        latencies = list(executor.map(call, range(requests)))
+        return summarize(latencies, time.perf_counter() - start)
+
+
+async def run_asgi(path, requests, concurrency):
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path)
+            assert response.status_code == 200, (path, response.status_code)
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(call() for _ in range(requests)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput and p50/p99 latency of the sync (WSGI) read endpoints with their async (ASGI) '
+        'variants at the same concurrency, against a throwaway database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and path.')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='WSGI worker threads, and in-flight requests on the ASGI event loop.')
+        parser.add_argument('--portfolios', type=int, default=1000, help='Portfolios to seed.')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            ids = generate_data(options['portfolios'])
+            results = {}
+            for name, sync_path, async_path in ENDPOINTS:
+                results[name] = {
+                    'wsgi': run_wsgi(sync_path.format(**ids), options['requests'], options['workers']),
+                    'asgi': asyncio.run(run_asgi(async_path.format(**ids), options['requests'], options['workers'])),
+                }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            drain_mail()
+            teardown_test_environment()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'endpoint':<18}{'path':<6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, paths in results.items():
+            for path, stats in paths.items():
+                self.stdout.write(
+                    f"{name:<18}{path:<6}{stats['throughput']:>10.1f}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                )
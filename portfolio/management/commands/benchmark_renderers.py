@@ -0,0 +1,92 @@
+import gzip
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+
+from eco_portfolio.compression import BROTLI_QUALITY, brotli
+from eco_portfolio.renderers import FastJSONRenderer, orjson
+from portfolio.benchmark import drain_mail, generate_data
+from portfolio.models import PortfolioModel
+from portfolio.serializers import PortfolioSerializer
+from users.models import UserModel
+from users.serializers import ResponseUserSerializer
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the render cost of the default DRF JSON renderer and FastJSONRenderer, plus gzip and brotli '
+        'compression, on portfolio and user list payloads built from synthetic data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, nargs='+', default=[20, 100, 1000], help='List sizes to render.')
+        parser.add_argument('--repeat', type=int, default=50, help='Renders per measurement; the median is kept.')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+
+    def build_payloads(self, sizes):
+        payloads = {}
+        for size in sizes:
+            portfolios = PortfolioModel.objects.order_by('created_at', 'id')[:size]
+            payloads[f'portfolios x{size}'] = PortfolioSerializer(portfolios, many=True).data
+            users = UserModel.objects.order_by('date_joined', 'id')[:size]
+            payloads[f'users x{size}'] = ResponseUserSerializer(users, many=True).data
+        return payloads
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            generate_data(max(options['items']) * 2)
+            payloads = self.build_payloads(options['items'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            drain_mail()
+            teardown_test_environment()
+
+        default, fast = JSONRenderer(), FastJSONRenderer()
+        repeat = options['repeat']
+        results = {}
+        for name, data in payloads.items():
+            body = default.render(data)
+            result = {
+                'bytes': len(body),
+                'default_ms': measure(lambda: default.render(data), repeat),
+                'fast_ms': measure(lambda: fast.render(data), repeat),
+                'gzip_ms': measure(lambda: gzip.compress(body, 6), repeat),
+                'gzip_bytes': len(gzip.compress(body, 6)),
+            }
+            if brotli is not None:
+                result['brotli_ms'] = measure(lambda: brotli.compress(body, quality=BROTLI_QUALITY), repeat)
+                result['brotli_bytes'] = len(brotli.compress(body, quality=BROTLI_QUALITY))
+            result['speedup'] = result['default_ms'] / result['fast_ms'] if result['fast_ms'] else 0.0
+            results[name] = result
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        if orjson is None:
+            self.stderr.write('orjson is not installed; FastJSONRenderer falls back to the default encoder.')
+        self.stdout.write(
+            f"{'payload':<18}{'bytes':>10}{'default ms':>12}{'fast ms':>10}{'speedup':>9}"
+            f"{'gzip ms':>10}{'gzip B':>10}{'br ms':>9}{'br B':>10}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<18}{result['bytes']:>10}{result['default_ms']:>12.3f}{result['fast_ms']:>10.3f}"
+                f"{result['speedup']:>8.1f}x{result['gzip_ms']:>10.3f}{result['gzip_bytes']:>10}"
+                f"{result.get('brotli_ms', 0):>9.3f}{result.get('brotli_bytes', 0):>10}"
+            )
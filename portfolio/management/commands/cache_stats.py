@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.urls import get_resolver
+
+from eco_portfolio.cache import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the response cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them.')
+
+    def handle(self, *args, **options):
+        # Importing the URLconf imports every view, which registers its cache name.
+        get_resolver().url_patterns
+
+        for name, stats in get_stats().items():
+            self.stdout.write(
+                f"{name:<20} hits={stats['hits']:<10} misses={stats['misses']:<10} "
+                f"hit_rate={stats['hit_rate']:.1%}"
+            )
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from eco_portfolio.schema import FORMATS, artifact_path, code_version, generate_schema, write_artifacts
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate the OpenAPI schema served at /openapi.json, /swagger/ and /redoc/ and store it for the '
+        'current code version. Run at deploy time so no worker introspects the views on a request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate even if this version is stored already.')
+
+    def handle(self, *args, **options):
+        version = code_version()
+        if not options['force'] and all(artifact_path(fmt, version).exists() for fmt in FORMATS):
+            self.stdout.write(f'Schema for version {version} is up to date')
+            return
+
+        start = time.perf_counter()
+        bodies = generate_schema()
+        write_artifacts(bodies, version)
+        elapsed = (time.perf_counter() - start) * 1000
+        for fmt, body in bodies.items():
+            self.stdout.write(f'{artifact_path(fmt, version)}: {len(body)} bytes')
+        self.stdout.write(self.style.SUCCESS(f'Generated schema for version {version} in {elapsed:.0f} ms'))
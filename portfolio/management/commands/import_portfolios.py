@@ -0,0 +1,27 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+
+from portfolio.ndjson import IMPORT_BATCH_SIZE, import_portfolios
+
+
+class Command(BaseCommand):
+    help = 'Create or update portfolios from an NDJSON file (one JSON object per line).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON file to import, or "-" for standard input.')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            report = import_portfolios(sys.stdin, batch_size=options['batch_size'])
+        else:
+            with open(options['path'], encoding='utf-8') as f:
+                report = import_portfolios(f, batch_size=options['batch_size'])
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']}, updated {report['updated']}, failed {len(report['errors'])}."
+        ))
@@ -0,0 +1,115 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Runs in a fresh interpreter: everything a worker does before it can serve
+# its first request, i.e. setting Django up, building the handler and
+# loading the URLconf, which imports every view module.
+WORKER_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from django.core.{handler} import get_{handler}_application
+get_{handler}_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+ready = time.perf_counter()
+print(json.dumps({{
+    'setup_ms': (setup - start) * 1000,
+    'ready_ms': (ready - start) * 1000,
+    'modules': len(sys.modules),
+    'docs_loaded': 'drf_yasg' in sys.modules,
+}}))
+'''
+
+
+def parse_importtime(output):
+    """
+    Per-package self time and per top-level import cumulative time, in
+    milliseconds, from ``python -X importtime`` output.
+    """
+    packages, imports = defaultdict(float), {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        packages[name.strip().split('.')[0]] += int(self_us) / 1000
+        # Imports at depth 0 were triggered by the script itself; their
+        # cumulative times add up to the total import time.
+        if not name[1:].startswith(' '):
+            imports[name.strip()] = int(cumulative_us) / 1000
+    return packages, imports
+
+
+class Command(BaseCommand):
+    help = (
+        'Profile worker start-up: start fresh interpreters that set Django up, build the request handler and '
+        'load the URLconf, and report the time until ready with a cumulative import-time breakdown.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Interpreters to start; medians are reported.')
+        parser.add_argument('--top', type=int, default=15, help='Entries to list in each breakdown.')
+        parser.add_argument('--handler', choices=['wsgi', 'asgi'], default='wsgi', help='Handler to build.')
+        parser.add_argument('--max-ready-ms', type=float, default=None,
+                            help='Fail when the median time until ready exceeds this many milliseconds.')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+
+    def run_worker(self, handler):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'eco_portfolio.settings')}
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', WORKER_SCRIPT.format(handler=handler)],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        if completed.returncode:
+            raise CommandError(f'The worker failed to start:\n{completed.stderr[-2000:]}')
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result['process_ms'] = elapsed
+        return result, *parse_importtime(completed.stderr)
+
+    def handle(self, *args, **options):
+        runs = [self.run_worker(options['handler']) for _ in range(max(options['runs'], 1))]
+
+        def median_of(values):
+            return statistics.median(values) if values else 0.0
+
+        summary = {key: median_of([run[0][key] for run in runs]) for key in ('process_ms', 'setup_ms', 'ready_ms')}
+        summary['modules'] = runs[-1][0]['modules']
+        summary['docs_loaded'] = runs[-1][0]['docs_loaded']
+        packages = {name: median_of([run[1].get(name, 0.0) for run in runs]) for name in runs[-1][1]}
+        imports = {name: median_of([run[2].get(name, 0.0) for run in runs]) for name in runs[-1][2]}
+        top = options['top']
+        summary['packages'] = dict(sorted(packages.items(), key=lambda item: -item[1])[:top])
+        summary['imports'] = dict(sorted(imports.items(), key=lambda item: -item[1])[:top])
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+        else:
+            self.stdout.write(
+                f"Worker ready in {summary['ready_ms']:.1f} ms (django.setup {summary['setup_ms']:.1f} ms, "
+                f"process {summary['process_ms']:.1f} ms), {summary['modules']} modules, "
+                f"drf_yasg {'loaded' if summary['docs_loaded'] else 'not loaded'}; median of {len(runs)} runs"
+            )
+            self.stdout.write(f"\n{'package':<40}{'self ms':>10}")
+            for name, value in summary['packages'].items():
+                self.stdout.write(f'{name:<40}{value:>10.1f}')
+            self.stdout.write(f"\n{'import':<40}{'cumulative ms':>14}")
+            for name, value in summary['imports'].items():
+                self.stdout.write(f'{name:<40}{value:>14.1f}')
+
+        if options['max_ready_ms'] is not None and summary['ready_ms'] > options['max_ready_ms']:
+            raise CommandError(
+                f"Worker start-up took {summary['ready_ms']:.1f} ms, over the {options['max_ready_ms']:.0f} ms limit."
+            )
@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from portfolio.uploads import SESSION_LIFETIME, purge_expired_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete upload sessions, partial files and unattached uploads that have not been touched recently.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=SESSION_LIFETIME.total_seconds() / 3600,
+                            help='Age in hours after which an untouched upload is purged (default: 24).')
+
+    def handle(self, *args, **options):
+        count = purge_expired_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f'Purged {count} uploads'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from eco_portfolio.cache import bump_version
+from portfolio.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index over portfolio names and descriptions.'
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index()
+        bump_version('portfolio')
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} portfolios.'))
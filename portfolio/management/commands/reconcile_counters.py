@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from portfolio.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized team and category counters and correct any that drifted.'
+
+    def handle(self, *args, **options):
+        corrected = reconcile_counters()
+        for counter, count in corrected.items():
+            self.stdout.write(f'{counter}: {count} corrected')
+        self.stdout.write(self.style.SUCCESS(f'Corrected {sum(corrected.values())} counters'))
@@ -0,0 +1,32 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from eco_portfolio.replicas import replica_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the SQLite primary database into every replica configured with DATABASE_REPLICAS. '
+        'Stands in for database replication when running with SQLite replicas locally.'
+    )
+
+    def handle(self, *args, **options):
+        aliases = replica_aliases()
+        if not aliases:
+            raise CommandError('No replicas configured; set DATABASE_REPLICAS.')
+        if any(connections[alias].vendor != 'sqlite' for alias in [DEFAULT_DB_ALIAS, *aliases]):
+            raise CommandError('Only SQLite replicas can be synced; other databases replicate on the server.')
+
+        source = connections[DEFAULT_DB_ALIAS]
+        source.ensure_connection()
+        for alias in aliases:
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                source.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'Synced {alias}')
+        self.stdout.write(self.style.SUCCESS(f'Synced {len(aliases)} replicas'))
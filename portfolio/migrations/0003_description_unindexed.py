@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0002_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='portfoliomodel',
+            name='description',
+            field=models.TextField(),
+        ),
+    ]
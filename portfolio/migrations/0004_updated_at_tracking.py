@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0003_description_unindexed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categorymodel',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='portfoliomodel',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0004_updated_at_tracking'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='portfoliomodel',
+            name='category',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='portfolio', to='portfolio.categorymodel'),
+        ),
+        migrations.AlterField(
+            model_name='portfoliomodel',
+            name='team',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='portfolio', to='users.teammodel'),
+        ),
+        migrations.AddIndex(
+            model_name='portfoliomodel',
+            index=models.Index(fields=['category', 'created_at', 'id'], name='portfolio_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='portfoliomodel',
+            index=models.Index(fields=['team', 'created_at', 'id'], name='portfolio_team_created_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:47
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_portfolios(apps, schema_editor):
+    PortfolioModel = apps.get_model('portfolio', 'PortfolioModel')
+    counted = (
+        (apps.get_model('users', 'TeamModel'), 'team'),
+        (apps.get_model('portfolio', 'CategoryModel'), 'category'),
+    )
+    for model, field in counted:
+        count = Coalesce(Subquery(
+            PortfolioModel.objects.filter(**{field: OuterRef('pk')}).order_by()
+            .values(field).annotate(count=Count('pk')).values('count')
+        ), Value(0))
+        model.objects.exclude(portfolio_count=count).update(portfolio_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0006_upload_sessions'),
+        ('users', '0003_team_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categorymodel',
+            name='portfolio_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_portfolios, migrations.RunPython.noop),
+    ]
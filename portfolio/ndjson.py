@@ -0,0 +1,171 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from rest_framework.parsers import BaseParser
+
+from eco_portfolio.cache import bump_version
+from eco_portfolio.events import emit
+from users.models import TeamModel
+from .models import PortfolioModel, CategoryModel
+from .counters import count_changes
+from .search import index_portfolios
+from .serializers import PortfolioImportSerializer
+from .signals import portfolio_events
+
+
+EXPORT_FIELDS = (
+    ('id', 'id'),
+    ('name', 'name'),
+    ('description', 'description'),
+    ('image', 'image'),
+    ('link', 'link'),
+    ('demo_video', 'demo_video'),
+    ('team', 'team_id'),
+    ('category', 'category_id'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+)
+IMPORT_FIELDS = ('name', 'description', 'image', 'link', 'demo_video', 'team', 'category')
+EXPORT_CHUNK_SIZE = 2000
+IMPORT_BATCH_SIZE = 500
+
+
+class NDJSONParser(BaseParser):
+    """
+    Hands the view a lazy iterator over the raw request lines instead of
+    parsing the whole body up front.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return iter(stream.readline, b'')
+
+
+def export_portfolios(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    keys = [key for key, _ in EXPORT_FIELDS]
+    rows = queryset.order_by('id').values_list(*[field for _, field in EXPORT_FIELDS])
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    lines = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        lines.append(encoder.encode(dict(zip(keys, row))))
+        if len(lines) == chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def _error(line, errors):
+    return {'line': line, 'errors': errors}
+
+
+def _apply(portfolio, data):
+    for field in IMPORT_FIELDS:
+        setattr(portfolio, f'{field}_id' if field in ('team', 'category') else field, data[field])
+    return portfolio
+
+
+def _import_batch(batch, report):
+    valid = []
+    for line, row in batch:
+        serializer = PortfolioImportSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((line, serializer.validated_data))
+        else:
+            report['errors'].append(_error(line, serializer.errors))
+
+    # Foreign keys and existing rows are resolved with one IN query each per batch.
+    teams = set(TeamModel.objects.filter(id__in={data['team'] for _, data in valid}).values_list('id', flat=True))
+    categories = set(CategoryModel.objects.filter(
+        id__in={data['category'] for _, data in valid}
+    ).values_list('id', flat=True))
+    existing = PortfolioModel.objects.in_bulk([data['id'] for _, data in valid if data.get('id')])
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    for line, data in valid:
+        errors = {}
+        if data['team'] not in teams:
+            errors['team'] = [f'Invalid pk "{data["team"]}" - object does not exist.']
+        if data['category'] not in categories:
+            errors['category'] = [f'Invalid pk "{data["category"]}" - object does not exist.']
+        if errors:
+            report['errors'].append(_error(line, errors))
+        elif data.get('id') in existing:
+            portfolio = _apply(existing[data['id']], data)
+            portfolio.updated_at = now
+            to_update.append((line, portfolio))
+        else:
+            to_create.append((line, _apply(PortfolioModel(id=data.get('id')), data)))
+
+    try:
+        with transaction.atomic():
+            PortfolioModel.objects.bulk_create([portfolio for _, portfolio in to_create])
+            PortfolioModel.objects.bulk_update(
+                [portfolio for _, portfolio in to_update], [*IMPORT_FIELDS, 'updated_at'],
+            )
+            index_portfolios([portfolio for _, portfolio in to_create + to_update])
+            count_changes(
+                created=[portfolio for _, portfolio in to_create], updated=[portfolio for _, portfolio in to_update],
+            )
+            emit('portfolio', 'created', portfolio_events(portfolio for _, portfolio in to_create))
+            emit('portfolio', 'updated', portfolio_events(portfolio for _, portfolio in to_update))
+    except DatabaseError:
+        # Something in the batch violates a constraint; retry row by row so
+        # only the offending lines are reported.
+        return _import_rows(to_create, to_update, report)
+
+    report['created'] += len(to_create)
+    report['updated'] += len(to_update)
+
+
+def _import_rows(to_create, to_update, report):
+    rows = [(line, portfolio, True) for line, portfolio in to_create]
+    rows += [(line, portfolio, False) for line, portfolio in to_update]
+    for line, portfolio, created in rows:
+        try:
+            with transaction.atomic():
+                portfolio.save(force_insert=created)
+        except DatabaseError as e:
+            report['errors'].append(_error(line, {'non_field_errors': [str(e)]}))
+        else:
+            report['created' if created else 'updated'] += 1
+
+
+def import_portfolios(lines, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Create or update portfolios from NDJSON lines. Rows with an ``id`` that
+    already exists are updated, all others are created. Invalid lines are
+    reported by line number and skipped; they never abort the load.
+    """
+    report = {'created': 0, 'updated': 0, 'errors': []}
+    batch = []
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            report['errors'].append(_error(number, {'non_field_errors': [f'Invalid JSON: {e}']}))
+            continue
+        if not isinstance(row, dict):
+            report['errors'].append(_error(number, {'non_field_errors': ['Expected a JSON object.']}))
+            continue
+
+        batch.append((number, row))
+        if len(batch) >= batch_size:
+            _import_batch(batch, report)
+            batch = []
+    if batch:
+        _import_batch(batch, report)
+
+    report['errors'].sort(key=lambda error: error['line'])
+    if report['created'] or report['updated']:
+        bump_version('portfolio')
+    return report
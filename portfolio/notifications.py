@@ -0,0 +1,27 @@
+from collections import defaultdict
+
+from django.core.mail import EmailMessage
+
+from eco_portfolio.mail import send_later
+from users.models import TeamModel
+
+
+def notify_portfolios_created(portfolios):
+    # One message per member, so addresses are not shared; the mail queue
+    # sends them over a single connection. Members of every team involved
+    # are read with one query.
+    emails = defaultdict(list)
+    members = TeamModel.members.through.objects.filter(
+        teammodel_id__in={portfolio.team_id for portfolio in portfolios},
+    ).exclude(usermodel__email='').values_list('teammodel_id', 'usermodel__email')
+    for team_id, email in members:
+        emails[team_id].append(email)
+    send_later([
+        EmailMessage(
+            f'New portfolio: {portfolio.name}',
+            f'A new portfolio "{portfolio.name}" was added to your team {portfolio.team.name}.\n\n{portfolio.link}',
+            to=[email],
+        )
+        for portfolio in portfolios
+        for email in emails[portfolio.team_id]
+    ])
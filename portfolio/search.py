@@ -0,0 +1,123 @@
+import html
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import PortfolioModel
+
+
+SEARCH_TABLE = 'portfolio_search'
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+# FTS5 inserts these control characters around matches; the text between
+# them is escaped before they are swapped for the HTML tags.
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+MATCH_RE = re.compile(f'{MATCH_START}(.*?){MATCH_END}', re.DOTALL)
+# bm25() column weights: a hit in the name counts ten times a hit in the description.
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+def is_supported(conn=connection):
+    return conn.vendor == 'sqlite'
+
+
+def create_search_table(conn=connection):
+    if not is_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} '
+            f"USING fts5(name, description, tokenize='porter unicode61 remove_diacritics 2')"
+        )
+
+
+def index_portfolios(portfolios):
+    if not is_supported():
+        return
+    rows = [(portfolio.pk, portfolio.name, portfolio.description) for portfolio in portfolios]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(f'INSERT INTO {SEARCH_TABLE}(rowid, name, description) VALUES (%s, %s, %s)', rows)
+
+
+def unindex_portfolios(pks):
+    if not is_supported() or not pks:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(pk,) for pk in pks])
+
+
+def rebuild_search_index():
+    create_search_table()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, name, description) '
+            f'SELECT id, name, description FROM {PortfolioModel._meta.db_table}'
+        )
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def build_match_query(query):
+    # Every word is quoted so user input can never be parsed as FTS5 syntax;
+    # the last one is a prefix match to support search-as-you-type.
+    tokens = re.findall(r'\w+', query)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def mark_up(text):
+    """HTML-escape highlighted FTS5 output, wrapping the matches in ``<mark>``."""
+    if text is None:
+        return None
+    parts = MATCH_RE.split(text)
+    # split() alternates between unmatched and matched text.
+    marked = [
+        f'{HIGHLIGHT_START}{html.escape(part)}{HIGHLIGHT_END}' if i % 2 else html.escape(part)
+        for i, part in enumerate(parts)
+    ]
+    return ''.join(marked).replace(MATCH_START, '').replace(MATCH_END, '')
+
+
+def search_portfolios(query, limit):
+    """
+    Return ``(portfolio, rank, highlights)`` tuples ordered by relevance.
+    Lower ranks are better, as with bm25().
+    """
+    if not is_supported():
+        portfolios = PortfolioModel.objects.filter(
+            Q(name__icontains=query) | Q(description__icontains=query)
+        ).order_by('-created_at')[:limit]
+        return [(portfolio, None, {}) for portfolio in portfolios]
+
+    match = build_match_query(query)
+    if match is None:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, bm25({SEARCH_TABLE}, %s, %s) AS rank, '
+            f'highlight({SEARCH_TABLE}, 0, %s, %s), '
+            f"snippet({SEARCH_TABLE}, 1, %s, %s, '…', 24) "
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank LIMIT %s',
+            [NAME_WEIGHT, DESCRIPTION_WEIGHT, MATCH_START, MATCH_END,
+             MATCH_START, MATCH_END, match, limit],
+        )
+        rows = cursor.fetchall()
+
+    portfolios = PortfolioModel.objects.in_bulk([row[0] for row in rows])
+    return [
+        (portfolios[pk], rank, {'name': mark_up(name), 'description': mark_up(description)})
+        for pk, rank, name, description in rows
+        if pk in portfolios
+    ]
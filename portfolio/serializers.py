@@ -1,16 +1,44 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.validators import get_available_image_extensions
+from django.db import transaction
 from rest_framework import serializers
-from .models import PortfolioModel, CategoryModel
+from eco_portfolio.bulk import BulkListSerializer, PrefetchedPrimaryKeyRelatedField
+from eco_portfolio.cache import bump_version
+from eco_portfolio.events import emit
+from eco_portfolio.fieldsets import SparseFieldsetMixin
+from .counters import count_changes
+from .images import DERIVATIVE_FORMATS, schedule_derivatives
+from .models import PortfolioModel, CategoryModel, UploadSessionModel
+from .search import index_portfolios
+from .signals import portfolio_events
+from .uploads import MAX_UPLOAD_SIZE
+
 
+class PortfolioSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+    image_srcset = serializers.SerializerMethodField()
+    upload = PrefetchedPrimaryKeyRelatedField(
+        queryset=UploadSessionModel.objects.filter(status='complete'), write_only=True, required=False,
+        help_text='A completed upload to use as the image, instead of sending the file.',
+    )
 
-class PortfolioSerializer(serializers.ModelSerializer):
     class Meta:
         model = PortfolioModel
-        fields = ('id', 'name', 'description', 'image', 'link', 'demo_video', 'team', 'category', 'created_at', 'updated_at')
+        list_serializer_class = BulkListSerializer
+        fields = ('id', 'name', 'description', 'image', 'image_srcset', 'upload', 'link', 'demo_video', 'team', 'category', 'created_at', 'updated_at')
+        profiles = {
+            'card': ('id', 'name', 'image', 'image_srcset', 'team', 'category', 'created_at'),
+        }
+        field_sources = {
+            'image_srcset': ('image', 'image_derivatives'),
+        }
         extra_kwargs = {
             'id': {'read_only': True},
             'name': {'required': True},
             'description': {'required': True},
-            'image': {'required': True},
+            'image': {'required': False},
             'link': {'required': True},
             'demo_video': {'required': True},
             'team': {'required': True},
@@ -29,40 +57,204 @@ class PortfolioSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Invalid link.')
         return value
 
+    def get_image_srcset(self, obj):
+        derivatives = obj.image_derivatives or {}
+        if not obj.image or derivatives.get('source') != obj.image.name:
+            return {}
+
+        request = self.context.get('request')
+        srcset = {}
+        for extension in DERIVATIVE_FORMATS:
+            srcset[extension] = {}
+            for width, name in derivatives.get(extension, {}).items():
+                url = default_storage.url(name)
+                srcset[extension][width] = request.build_absolute_uri(url) if request else url
+        return srcset
+
     def validate(self, data):
         data = super().validate(data)
+        if 'image' in data and 'upload' in data:
+            raise serializers.ValidationError('Send either image or upload, not both.')
+        if self.instance is None and 'image' not in data and 'upload' not in data:
+            raise serializers.ValidationError({'image': ['An image or an upload is required.']})
         return data
 
+    def attach_upload(self, validated_data):
+        upload = validated_data.pop('upload', None)
+        if upload is None:
+            return
+        # The session is consumed; deleting it conditionally stops two
+        # portfolios from claiming the same file.
+        deleted, _ = UploadSessionModel.objects.filter(pk=upload.pk, status='complete').delete()
+        if not deleted:
+            raise serializers.ValidationError({'upload': ['This upload has already been used.']})
+        validated_data['image'] = upload.file
+
     def create(self, validated_data):
-        portfolio = PortfolioModel.objects.create(**validated_data)
+        with transaction.atomic():
+            self.attach_upload(validated_data)
+            portfolio = PortfolioModel.objects.create(**validated_data)
+        schedule_derivatives(portfolio)
+        bump_version('portfolio')
         return portfolio
 
     def update(self, instance, validated_data):
-        instance.name = validated_data.get('name', instance.name)
-        instance.description = validated_data.get('description', instance.description)
-        instance.image = validated_data.get('image', instance.image)
-        instance.link = validated_data.get('link', instance.link)
-        instance.demo_video = validated_data.get('demo_video', instance.demo_video)
-        instance.team = validated_data.get('team', instance.team)
-        instance.category = validated_data.get('category', instance.category)
-        instance.save()
+        with transaction.atomic():
+            self.attach_upload(validated_data)
+            instance.name = validated_data.get('name', instance.name)
+            instance.description = validated_data.get('description', instance.description)
+            instance.image = validated_data.get('image', instance.image)
+            instance.link = validated_data.get('link', instance.link)
+            instance.demo_video = validated_data.get('demo_video', instance.demo_video)
+            instance.team = validated_data.get('team', instance.team)
+            instance.category = validated_data.get('category', instance.category)
+            instance.save()
+        schedule_derivatives(instance)
+        bump_version('portfolio')
         return instance
 
+    def bulk_create(self, items):
+        """
+        Create the portfolios described by ``items`` with one INSERT. Model
+        signals do not fire for bulk inserts, so search indexing, counters and
+        change events are applied here. Returns, per item, the portfolio or
+        the errors that kept it from being created.
+        """
+        with transaction.atomic():
+            claimed = claim_uploads([item['upload'].pk for item in items if 'upload' in item])
+            results = []
+            for item in items:
+                upload = item.pop('upload', None)
+                if upload is not None:
+                    if upload.pk not in claimed:
+                        results.append({'upload': ['This upload has already been used.']})
+                        continue
+                    claimed.discard(upload.pk)
+                    item['image'] = upload.file
+                results.append(PortfolioModel(**item))
+
+            portfolios = PortfolioModel.objects.bulk_create(
+                [result for result in results if isinstance(result, PortfolioModel)]
+            )
+            index_portfolios(portfolios)
+            count_changes(created=portfolios)
+            emit('portfolio', 'created', portfolio_events(portfolios))
+        for portfolio in portfolios:
+            schedule_derivatives(portfolio)
+        if portfolios:
+            bump_version('portfolio')
+        return results
+
+
+def claim_uploads(pks):
+    """
+    Consume the completed upload sessions in ``pks`` with one locking read
+    and one DELETE; returns the set of those that were still available.
+    """
+    if not pks:
+        return set()
+    claimed = set(
+        UploadSessionModel.objects.select_for_update().filter(pk__in=pks, status='complete')
+        .values_list('pk', flat=True)
+    )
+    UploadSessionModel.objects.filter(pk__in=claimed).delete()
+    return claimed
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+
+    class Meta:
+        model = UploadSessionModel
+        fields = ('id', 'filename', 'content_type', 'size', 'sha256', 'offset', 'status', 'file', 'created_at')
+        read_only_fields = ('id', 'status', 'file', 'created_at')
+
+    def validate_filename(self, value):
+        extension = os.path.splitext(value)[1][1:].lower()
+        if extension not in get_available_image_extensions():
+            raise serializers.ValidationError(f'File extension "{extension}" is not an image extension.')
+        return value
+
+    def validate_size(self, value):
+        if not 0 < value <= MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError(f'Uploads must be between 1 and {MAX_UPLOAD_SIZE} bytes.')
+        return value
+
+    def validate_sha256(self, value):
+        if value and (len(value) != 64 or any(c not in '0123456789abcdefABCDEF' for c in value)):
+            raise serializers.ValidationError('Must be a hex-encoded SHA-256 digest.')
+        return value
+
+
+class PortfolioImportSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False, min_value=1)
+    name = serializers.CharField(max_length=255)
+    description = serializers.CharField()
+    image = serializers.CharField(max_length=100)
+    link = serializers.URLField()
+    demo_video = serializers.URLField()
+    team = serializers.IntegerField()
+    category = serializers.IntegerField()
+
+    validate_link = PortfolioSerializer.validate_link
+    validate_demo_video = PortfolioSerializer.validate_demo_video
+
+
+class ImportErrorSerializer(serializers.Serializer):
+    line = serializers.IntegerField()
+    errors = serializers.DictField()
+
+
+class PortfolioImportReportSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    updated = serializers.IntegerField()
+    errors = ImportErrorSerializer(many=True)
+
+
+class PortfolioSearchResultSerializer(serializers.Serializer):
+    portfolio = PortfolioSerializer()
+    rank = serializers.FloatField(allow_null=True)
+    highlights = serializers.DictField(child=serializers.CharField())
+
+
+class FacetSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class PortfolioFacetsSerializer(serializers.Serializer):
+    categories = FacetSerializer(many=True)
+    teams = FacetSerializer(many=True)
+
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = CategoryModel
-        fields = ('id', 'name')
+        list_serializer_class = BulkListSerializer
+        fields = ('id', 'name', 'portfolio_count')
         extra_kwargs = {
             'id': {'read_only': True},
             'name': {'required': True},
+            'portfolio_count': {'read_only': True},
         }
 
     def create(self, validated_data):
         category = CategoryModel.objects.create(**validated_data)
+        bump_version('category')
         return category
 
     def update(self, instance, validated_data):
         instance.name = validated_data.get('name', instance.name)
         instance.save()
-        return instance
\ No newline at end of file
+        bump_version('category')
+        return instance
+
+    def bulk_create(self, items):
+        # Signals do not fire for bulk inserts; the change events are sent here.
+        with transaction.atomic():
+            categories = CategoryModel.objects.bulk_create([CategoryModel(**item) for item in items])
+            emit('category', 'created', [{'id': category.pk} for category in categories])
+        if categories:
+            bump_version('category')
+        return categories
\ No newline at end of file
@@ -0,0 +1,67 @@
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from eco_portfolio.events import emit
+from .counters import count_changes
+from .models import CategoryModel, PortfolioModel
+from .search import create_search_table, index_portfolios, unindex_portfolios
+
+
+SEARCH_FIELDS = {'name', 'description'}
+COUNTED_FIELDS = {'team', 'team_id', 'category', 'category_id'}
+
+
+def create_search_index(sender, using, **kwargs):
+    create_search_table(connections[using])
+
+
+@receiver(post_save, sender=PortfolioModel)
+def portfolio_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        index_portfolios([instance])
+
+
+@receiver(post_delete, sender=PortfolioModel)
+def portfolio_deleted(sender, instance, **kwargs):
+    unindex_portfolios([instance.pk])
+
+
+@receiver(post_save, sender=PortfolioModel)
+def portfolio_counted(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        count_changes(created=[instance])
+    elif update_fields is None or COUNTED_FIELDS & set(update_fields):
+        count_changes(updated=[instance])
+
+
+@receiver(post_delete, sender=PortfolioModel)
+def portfolio_uncounted(sender, instance, **kwargs):
+    count_changes(deleted=[instance])
+
+
+def portfolio_events(portfolios):
+    return [
+        {'id': portfolio.pk, 'team': portfolio.team_id, 'category': portfolio.category_id}
+        for portfolio in portfolios
+    ]
+
+
+@receiver(post_save, sender=PortfolioModel)
+def portfolio_published(sender, instance, created, **kwargs):
+    emit('portfolio', 'created' if created else 'updated', portfolio_events([instance]))
+
+
+@receiver(post_delete, sender=PortfolioModel)
+def portfolio_unpublished(sender, instance, **kwargs):
+    emit('portfolio', 'deleted', portfolio_events([instance]))
+
+
+@receiver(post_save, sender=CategoryModel)
+def category_published(sender, instance, created, **kwargs):
+    emit('category', 'created' if created else 'updated', [{'id': instance.pk}])
+
+
+@receiver(post_delete, sender=CategoryModel)
+def category_unpublished(sender, instance, **kwargs):
+    emit('category', 'deleted', [{'id': instance.pk}])
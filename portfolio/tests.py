@@ -1,3 +1,1066 @@
-from django.test import TestCase
+import datetime
+import decimal
+import fcntl
+import hashlib
+import io
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from eco_portfolio import events, metrics, replicas, schema
+from eco_portfolio.pagination import KeysetPagination
+from eco_portfolio.renderers import FastJSONRenderer
+from users.models import TeamModel, UserModel
+from .benchmark import ENDPOINTS, Context, compare, generate_data, run_endpoint
+from .counters import reconcile_counters
+from .images import derivative_files, process_portfolio_image
+from .management.commands.profile_startup import WORKER_SCRIPT
+from .models import PortfolioModel, CategoryModel, UploadSessionModel
+from .uploads import partial_path
+
+
+def create_portfolio(team, category, name='portfolio', **fields):
+    return PortfolioModel.objects.create(**{
+        'name': name, 'description': f'About {name}', 'image': 'portfolio/image.png',
+        'link': 'https://example.com', 'demo_video': 'https://example.com/video',
+        'team': team, 'category': category, **fields,
+    })
+
+
+# Rows are created through the ORM, which does not bump cache versions.
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+@override_settings(CACHES=NO_CACHE)
+class PortfolioTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.team = TeamModel.objects.create(name='team')
+        self.category = CategoryModel.objects.create(name='category')
+
+
+class KeysetPaginationTests(PortfolioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.portfolios = [create_portfolio(self.team, self.category, f'portfolio-{i}') for i in range(5)]
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get(reverse('portfolio'))
+        self.assertEqual(len(response.json()), 5)
+
+    def test_pages_follow_cursors_both_ways(self):
+        first = self.client.get(reverse('portfolio'), {'page_size': 2}).json()
+        self.assertIsNone(first['previous'])
+        self.assertEqual([p['id'] for p in first['results']], [p.id for p in self.portfolios[:2]])
+
+        second = self.client.get(first['next']).json()
+        third = self.client.get(second['next']).json()
+        self.assertEqual([p['id'] for p in second['results']], [p.id for p in self.portfolios[2:4]])
+        self.assertEqual([p['id'] for p in third['results']], [self.portfolios[4].id])
+        self.assertIsNone(third['next'])
+
+        back = self.client.get(third['previous']).json()
+        self.assertEqual([p['id'] for p in back['results']], [p.id for p in self.portfolios[2:4]])
+
+    def test_page_size_is_capped(self):
+        CategoryModel.objects.bulk_create(CategoryModel(name=f'category-{i}') for i in range(120))
+        response = self.client.get(reverse('categories'), {'page_size': 1000})
+        self.assertEqual(len(response.json()['results']), 100)
+        self.assertIn('page_size=100', response.json()['next'])
+
+    def test_invalid_cursor(self):
+        for cursor in ('not-base64!', 'e30=', 'eyJ2IjpbMV19'):
+            response = self.client.get(reverse('portfolio'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+            self.assertEqual(response.json(), {'detail': 'Invalid cursor.'})
+
+    def test_cursor_values_of_the_wrong_type(self):
+        paginator = KeysetPagination()
+        cursors = (
+            ('portfolio', ['garbage', 1]),
+            ('portfolio', [self.portfolios[0].created_at, 'abc']),
+            ('portfolio', [None, 1]),
+            ('portfolio', [self.portfolios[0].created_at, 2 ** 70]),
+            ('categories', [{'a': 1}]),
+            ('categories', ['abc']),
+            ('categories', [[1]]),
+        )
+        for name, values in cursors:
+            response = self.client.get(reverse(name), {'cursor': paginator.encode_cursor(values)})
+            self.assertEqual((response.status_code, response.json()), (404, {'detail': 'Invalid cursor.'}), values)
+
+        # Values that convert cleanly still work.
+        cursor = paginator.encode_cursor([str(self.category.pk - 1)])
+        response = self.client.get(reverse('categories'), {'cursor': cursor})
+        self.assertEqual([c['id'] for c in response.json()['results']], [self.category.pk])
+
+
+class ImageDerivativeTests(PortfolioTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def save_image(self, name, size, color=(0, 128, 0, 255)):
+        buffer = io.BytesIO()
+        image = Image.new('RGBA', size, color)
+        if name.endswith('.jpg'):
+            image = image.convert('RGB')
+        image.save(buffer, 'JPEG' if name.endswith('.jpg') else 'PNG')
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def pixel(self, name):
+        with default_storage.open(name) as file:
+            return Image.open(file).convert('RGB').getpixel((0, 0))
+
+    def test_generates_every_width_and_format(self):
+        portfolio = create_portfolio(self.team, self.category, image=self.save_image('portfolio/wide.png', (800, 400)))
+        self.assertEqual(process_portfolio_image(portfolio.pk), 'generated')
+
+        portfolio.refresh_from_db()
+        derivatives = portfolio.image_derivatives
+        self.assertEqual(derivatives['source'], 'portfolio/wide.png')
+        for extension, image_format in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+            # 1280 is wider than the original, so it collapses into 800.
+            self.assertEqual(set(derivatives[extension]), {'320', '640', '800'})
+            with default_storage.open(derivatives[extension]['320']) as file:
+                image = Image.open(file)
+                self.assertEqual((image.format, image.size), (image_format, (320, 160)))
+
+        srcset = self.client.get(reverse('portfolio')).json()[0]['image_srcset']
+        self.assertRegex(srcset['webp']['640'], r'/media/portfolio/derivatives/wide-[0-9a-f]{12}-640w\.webp$')
+        self.assertEqual(process_portfolio_image(portfolio.pk), 'skipped')
+
+    def test_replaced_image_drops_old_derivatives(self):
+        portfolio = create_portfolio(self.team, self.category, image=self.save_image('portfolio/old.png', (400, 400)))
+        process_portfolio_image(portfolio.pk)
+        portfolio.refresh_from_db()
+        old = portfolio.image_derivatives['jpeg']['320']
+
+        PortfolioModel.objects.filter(pk=portfolio.pk).update(image=self.save_image('portfolio/new.png', (400, 400)))
+        self.assertEqual(self.client.get(reverse('portfolio')).json()[0]['image_srcset'], {})
+        self.assertEqual(process_portfolio_image(portfolio.pk), 'generated')
+        self.assertFalse(default_storage.exists(old))
+
+    def test_sources_sharing_a_stem(self):
+        red = self.save_image('portfolio/photo.jpg', (400, 400), 'red')
+        blue = self.save_image('portfolio/photo.png', (400, 400), 'blue')
+        red, blue = (create_portfolio(self.team, self.category, image=image) for image in (red, blue))
+        process_portfolio_image(red.pk)
+        process_portfolio_image(blue.pk)
+        red.refresh_from_db()
+        blue.refresh_from_db()
+        self.assertFalse(derivative_files(red.image_derivatives) & derivative_files(blue.image_derivatives))
+        for portfolio, color in ((red, (255, 0, 0)), (blue, (0, 0, 255))):
+            for name in derivative_files(portfolio.image_derivatives):
+                self.assertTrue(all(abs(a - b) < 8 for a, b in zip(self.pixel(name), color)), name)
+
+        # Reprocessing one portfolio only replaces the files its record listed.
+        self.assertEqual(process_portfolio_image(red.pk, force=True), 'generated')
+        refreshed = PortfolioModel.objects.get(pk=red.pk).image_derivatives
+        self.assertFalse(any(default_storage.exists(name) for name in derivative_files(red.image_derivatives)))
+        self.assertTrue(all(default_storage.exists(name) for name in derivative_files(refreshed)))
+        self.assertTrue(all(default_storage.exists(name) for name in derivative_files(blue.image_derivatives)))
+
+
+class SearchTests(PortfolioTestCase):
+    def test_best_match_first(self):
+        create_portfolio(self.team, self.category, 'Garden planner', description='Plan a solar garden.')
+        create_portfolio(self.team, self.category, 'Solar tracker', description='Track panels.')
+        results = self.client.get(reverse('portfolio-search'), {'q': 'sola'}).json()
+        self.assertEqual([r['portfolio']['name'] for r in results], ['Solar tracker', 'Garden planner'])
+        self.assertEqual(results[0]['highlights']['name'], '<mark>Solar</mark> tracker')
+
+    def test_highlights_are_escaped(self):
+        create_portfolio(self.team, self.category, '<script>alert(1)</script> solar', description='a < b & solar')
+        highlights = self.client.get(reverse('portfolio-search'), {'q': 'solar'}).json()[0]['highlights']
+        self.assertEqual(highlights['name'], '&lt;script&gt;alert(1)&lt;/script&gt; <mark>solar</mark>')
+        self.assertEqual(highlights['description'], 'a &lt; b &amp; <mark>solar</mark>')
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get(reverse('portfolio-search')).status_code, 400)
+
+
+class NDJSONTests(PortfolioTestCase):
+    fields = ('id', 'name', 'description', 'image', 'link', 'demo_video', 'team_id', 'category_id')
+
+    def setUp(self):
+        super().setUp()
+        self.user = UserModel.objects.create_user(username='importer', email='importer@example.com')
+        self.client.force_authenticate(self.user)
+
+    def export(self):
+        response = self.client.get(reverse('portfolio-export'))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return b''.join(response.streaming_content)
+
+    def import_(self, body):
+        return self.client.post(reverse('portfolio-import'), body, content_type='application/x-ndjson').json()
+
+    def test_export_import_round_trip(self):
+        for i in range(3):
+            create_portfolio(self.team, self.category, f'Portfolio «{i}»')
+        before = list(PortfolioModel.objects.order_by('id').values_list(*self.fields))
+        body = self.export()
+        self.assertEqual(len(body.splitlines()), 3)
+
+        PortfolioModel.objects.all().delete()
+        self.assertEqual(self.import_(body), {'created': 3, 'updated': 0, 'errors': []})
+        self.assertEqual(list(PortfolioModel.objects.order_by('id').values_list(*self.fields)), before)
+
+        self.assertEqual(self.import_(body), {'created': 0, 'updated': 3, 'errors': []})
+        self.assertEqual(PortfolioModel.objects.count(), 3)
+
+    def test_invalid_lines_are_reported_and_skipped(self):
+        row = json.dumps({
+            'name': 'new', 'description': 'd', 'image': 'portfolio/image.png', 'link': 'https://example.com',
+            'demo_video': 'https://example.com/video', 'team': self.team.id, 'category': self.category.id,
+        })
+        body = '\n'.join([row, '{not json', '[]', '', row.replace(f'"team": {self.team.id}', '"team": 999')])
+        report = self.import_(body.encode())
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([error['line'] for error in report['errors']], [2, 3, 5])
+        self.assertIn('team', report['errors'][2]['errors'])
+        self.assertEqual(PortfolioModel.objects.get().name, 'new')
+
+    def test_import_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(reverse('portfolio-import'), b'', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 401)
+
+
+class ConditionalGetTests(PortfolioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.portfolio = create_portfolio(self.team, self.category)
+
+    def test_list_answers_304_until_changed(self):
+        url = reverse('portfolio')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        create_portfolio(self.team, self.category, 'other')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_deletion_changes_the_list_etag(self):
+        other = create_portfolio(self.team, self.category, 'other')
+        etag = self.client.get(reverse('portfolio'))['ETag']
+        PortfolioModel.objects.filter(pk=other.pk).delete()
+        self.assertEqual(self.client.get(reverse('portfolio'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deletion_is_not_hidden_by_if_modified_since(self):
+        create_portfolio(self.team, self.category, 'second')
+        create_portfolio(self.team, self.category, 'third')
+        self.assertEqual(len(self.client.get(reverse('portfolio')).json()), 3)
+        # The oldest row goes, so the newest updated_at stays the same.
+        self.portfolio.delete()
+        response = self.client.get(reverse('portfolio'), HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_query_string_changes_the_etag(self):
+        first = self.client.get(reverse('portfolio'))['ETag']
+        second = self.client.get(reverse('portfolio'), {'page_size': 1})['ETag']
+        self.assertNotEqual(first, second)
+
+    def test_detail_if_modified_since(self):
+        url = reverse('portfolio-detail', args=[self.portfolio.pk])
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        self.portfolio.name = 'renamed'
+        self.portfolio.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=self.client.get(url)['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+class AsyncViewTests(PortfolioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.portfolios = [create_portfolio(self.team, self.category, f'portfolio-{i}') for i in range(3)]
+
+    async def test_list_matches_sync_view(self):
+        for params in ({}, {'fields': 'id,name'}):
+            response = await self.async_client.get(reverse('portfolio-async'), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), await self.get_sync(reverse('portfolio'), params))
+
+    async def test_pages_link_to_the_async_view(self):
+        first = (await self.async_client.get(reverse('portfolio-async'), {'page_size': 2})).json()
+        self.assertIn(reverse('portfolio-async'), first['next'])
+        second = (await self.async_client.get(first['next'])).json()
+        ids = [p['id'] for p in first['results'] + second['results']]
+        self.assertEqual(ids, [p.pk for p in self.portfolios])
+
+    async def test_detail_matches_sync_view(self):
+        pk = self.portfolios[0].pk
+        response = await self.async_client.get(reverse('portfolio-detail-async', args=[pk]))
+        self.assertEqual(response.json(), await self.get_sync(reverse('portfolio-detail', args=[pk])))
+
+        response = await self.async_client.get(reverse('portfolio-detail-async', args=[999]))
+        self.assertEqual((response.status_code, response.json()), (404, {'detail': 'Not found.'}))
+
+    async def test_categories_and_errors(self):
+        response = await self.async_client.get(reverse('categories-async'))
+        self.assertEqual(response.json(), await self.get_sync(reverse('categories')))
+
+        response = await self.async_client.get(reverse('portfolio-async'), {'cursor': 'e30='})
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.post(reverse('portfolio-async'))
+        self.assertEqual(response.status_code, 405)
+
+    async def get_sync(self, url, params=None):
+        response = await sync_to_async(self.client.get)(url, params)
+        return response.json()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.ids = generate_data(40)
+
+    def test_dataset(self):
+        self.assertEqual(UserModel.objects.count(), 20)
+        self.assertEqual(CategoryModel.objects.count(), 20)
+        self.assertEqual(PortfolioModel.objects.count(), 40)
+        teams = TeamModel.objects.all()
+        self.assertEqual([team.member_count for team in teams], [5, 5])
+        self.assertEqual(sum(team.portfolio_count for team in teams), 40)
+        self.assertEqual(self.client.get(reverse('portfolio-search'), {'q': 'solar'}).status_code, 200)
+
+    def test_every_endpoint_succeeds(self):
+        ctx = Context(self.ids)
+        for endpoint in ENDPOINTS:
+            result = run_endpoint(endpoint, ctx, requests=2, warmup=0)
+            self.assertEqual(result['requests'], 2)
+            self.assertTrue(all(int(code) < 400 for code in result['status_codes']), (endpoint.name, result))
+
+    def test_compare(self):
+        baseline = {'GET a': {'p95_ms': 10.0, 'throughput': 100.0, 'queries': 2.0}}
+        self.assertEqual(compare({'GET a': {'p95_ms': 10.5, 'throughput': 95.0, 'queries': 2.0}}, baseline, 0.1), [])
+        self.assertEqual(compare({'GET b': {'p95_ms': 99.0, 'throughput': 1.0, 'queries': 9.0}}, baseline, 0.1), [])
+        regressions = compare({'GET a': {'p95_ms': 12.0, 'throughput': 80.0, 'queries': 3.0}}, baseline, 0.1)
+        self.assertEqual(len(regressions), 3)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MetricsTests(PortfolioTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+
+    def scrape(self, **extra):
+        return self.client.get(reverse('metrics'), **extra)
+
+    def test_requests_are_counted_per_route(self):
+        self.client.get(reverse('portfolio'))
+        self.client.get(reverse('portfolio'))
+        body = self.scrape().content.decode()
+        self.assertIn('http_requests_total{method="GET",route="portfolio",status="200"} 2', body)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="portfolio"} 2', body)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+
+    def test_requests_never_flush(self):
+        threads = []
+        flush = metrics.flush
+
+        def recording_flush():
+            threads.append(threading.current_thread())
+            flush()
+
+        with mock.patch('eco_portfolio.metrics.flush', recording_flush):
+            self.client.get(reverse('portfolio'))
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_buffer_is_flushed_in_the_background(self):
+        metrics.inc('events_published_total')
+        deadline = time.monotonic() + metrics.FLUSH_INTERVAL * 5
+        while metrics._pending and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(dict(metrics._totals), {'events_published_total': 1.0})
+
+    def test_access_is_restricted(self):
+        self.assertEqual(self.scrape().status_code, 200)
+        self.assertEqual(self.scrape(REMOTE_ADDR='203.0.113.7').status_code, 403)
+        with self.settings(METRICS_ALLOWED_IPS=['203.0.113.0/24']):
+            self.assertEqual(self.scrape(REMOTE_ADDR='203.0.113.7').status_code, 200)
+        with self.settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.scrape(REMOTE_ADDR='203.0.113.7', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+            self.assertEqual(self.scrape(REMOTE_ADDR='203.0.113.7', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+
+class FilterTests(PortfolioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_team = TeamModel.objects.create(name='other team')
+        self.other_category = CategoryModel.objects.create(name='other category')
+        self.first = create_portfolio(self.team, self.category, 'first')
+        self.second = create_portfolio(self.team, self.other_category, 'second')
+        self.third = create_portfolio(self.other_team, self.other_category, 'third')
+        PortfolioModel.objects.filter(pk=self.first.pk).update(created_at='2024-01-01T12:00:00Z')
+
+    def names(self, params):
+        response = self.client.get(reverse('portfolio'), params)
+        self.assertEqual(response.status_code, 200)
+        return [portfolio['name'] for portfolio in response.json()]
+
+    def test_filters(self):
+        self.assertEqual(self.names({'category': self.other_category.id}), ['second', 'third'])
+        self.assertEqual(self.names({'team': self.team.id, 'category': self.other_category.id}), ['second'])
+        self.assertEqual(self.names({'created_before': '2024-01-02'}), ['first'])
+        self.assertEqual(self.names({'created_after': '2024-01-01T13:00:00+00:00'}), ['second', 'third'])
+
+    def test_invalid_filters(self):
+        response = self.client.get(reverse('portfolio'), {'team': 'x', 'created_after': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'team', 'created_after'})
+
+        for value in ('99999999999999999999', '0', '-1'):
+            for url in (reverse('portfolio'), reverse('portfolio-facets')):
+                response = self.client.get(url, {'category': value})
+                self.assertEqual(response.status_code, 400, (url, value))
+                self.assertEqual(list(response.json()), ['category'])
+
+    def test_facets(self):
+        with self.assertNumQueries(1):
+            facets = self.client.get(reverse('portfolio-facets')).json()
+        self.assertEqual(facets, {
+            'categories': [
+                {'id': self.other_category.id, 'name': 'other category', 'count': 2},
+                {'id': self.category.id, 'name': 'category', 'count': 1},
+            ],
+            'teams': [
+                {'id': self.team.id, 'name': 'team', 'count': 2},
+                {'id': self.other_team.id, 'name': 'other team', 'count': 1},
+            ],
+        })
+
+    def test_facets_follow_filters(self):
+        facets = self.client.get(reverse('portfolio-facets'), {'team': self.other_team.id}).json()
+        self.assertEqual(facets['categories'], [{'id': self.other_category.id, 'name': 'other category', 'count': 1}])
+        self.assertEqual(facets['teams'], [{'id': self.other_team.id, 'name': 'other team', 'count': 1}])
+
+
+class SparseFieldsetTests(PortfolioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.portfolio = create_portfolio(self.team, self.category)
+
+    def get(self, params, url=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url or reverse('portfolio'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), queries[-1]['sql']
+
+    def test_fields_narrow_the_payload_and_the_query(self):
+        data, sql = self.get({'fields': 'name,id'})
+        self.assertEqual(data, [{'id': self.portfolio.id, 'name': 'portfolio'}])
+        self.assertNotIn('"description"', sql)
+
+        data, sql = self.get({'fields': 'id,image_srcset'}, reverse('portfolio-detail', args=[self.portfolio.id]))
+        self.assertEqual(data, {'id': self.portfolio.id, 'image_srcset': {}})
+        self.assertIn('"image_derivatives"', sql)
+        self.assertNotIn('"link"', sql)
+
+    def test_exclude_and_profile(self):
+        data, sql = self.get({'exclude': 'description,updated_at'})
+        self.assertEqual(set(data[0]), {
+            'id', 'name', 'image', 'image_srcset', 'link', 'demo_video', 'team', 'category', 'created_at',
+        })
+        self.assertNotIn('"description"', sql)
+
+        data, _ = self.get({'profile': 'card', 'exclude': 'image_srcset'})
+        self.assertEqual(set(data[0]), {'id', 'name', 'image', 'team', 'category', 'created_at'})
+
+    def test_invalid_selections(self):
+        for params in ({'fields': 'id,secret'}, {'exclude': 'secret'}, {'profile': 'full'},
+                       {'profile': 'card', 'fields': 'id'}):
+            response = self.client.get(reverse('portfolio'), params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class FastJSONRendererTests(TestCase):
+    def assertSameBytes(self, data, media_type=None):
+        self.assertEqual(FastJSONRenderer().render(data, media_type), JSONRenderer().render(data, media_type))
+
+    def test_matches_drf_byte_for_byte(self):
+        self.assertSameBytes({
+            'text': 'Ünïcode 🌱 "quoted" \\ back\nslash\t<script>',
+            'separators': 'line\u2028paragraph\u2029end',
+            'lazy': gettext_lazy('Not found.'),
+            'numbers': [0, -1, 2 ** 63 - 1, 0.1, 1.5, -2.25, 123456.789],
+            'decimal': decimal.Decimal('1.10'),
+            'datetime': datetime.datetime(2024, 5, 6, 7, 8, 9, 123456, tzinfo=datetime.timezone.utc),
+            'date': datetime.date(2024, 5, 6),
+            'nested': {1: [True, False, None, ()], 'empty': {}},
+        })
+        self.assertSameBytes([{'id': i, 'name': f'portfolio-{i}'} for i in range(100)])
+        self.assertSameBytes('plain string')
+        self.assertSameBytes({'indented': [1, 2]}, 'application/json; indent=2')
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_big_integers_fall_back_to_drf(self):
+        self.assertSameBytes({'big': 2 ** 70, 'negative': -2 ** 64})
+
+    def test_documented_differences(self):
+        self.assertEqual(FastJSONRenderer().render({'x': float('nan')}), b'{"x":null}')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'x': float('nan')})
+        self.assertEqual(json.loads(FastJSONRenderer().render([1e16])), json.loads(JSONRenderer().render([1e16])))
+
+    @override_settings(CACHES=NO_CACHE)
+    def test_responses_use_it(self):
+        response = APIClient().get(reverse('categories'))
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+
+class UploadTests(PortfolioTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        buffer = io.BytesIO()
+        Image.new('RGB', (32, 32), 'green').save(buffer, 'PNG')
+        self.image = buffer.getvalue()
+
+    def start(self, **fields):
+        response = self.client.post(
+            reverse('uploads'), {'filename': 'image.png', 'size': len(self.image), **fields}, format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        return reverse('upload-detail', args=[response.json()['id']]), response.json()['id']
+
+    def send(self, url, offset, chunk):
+        return self.client.generic('PATCH', url, chunk, 'application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def complete(self, pk):
+        return self.client.post(reverse('upload-complete', args=[pk]))
+
+    def test_resume_and_complete(self):
+        url, pk = self.start(sha256=hashlib.sha256(self.image).hexdigest())
+        half = len(self.image) // 2
+        response = self.send(url, 0, self.image[:half])
+        self.assertEqual((response.status_code, response['Upload-Offset']), (200, str(half)))
+
+        # After a dropped connection the client asks where to resume.
+        self.assertEqual(self.client.get(url).json()['offset'], half)
+        self.assertEqual(self.send(url, half, self.image[half:]).json()['offset'], len(self.image))
+
+        response = self.complete(pk)
+        self.assertEqual(response.json()['status'], 'complete')
+        with default_storage.open(response.json()['file']) as file:
+            self.assertEqual(file.read(), self.image)
+        self.assertEqual(self.complete(pk).json()['file'], response.json()['file'])
+
+        response = self.client.post(reverse('portfolio'), {
+            'name': 'uploaded', 'description': 'd', 'upload': pk, 'link': 'https://example.com',
+            'demo_video': 'https://example.com/video', 'team': self.team.id, 'category': self.category.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(UploadSessionModel.objects.filter(pk=pk).exists())
+
+    def test_offset_mismatch(self):
+        url, _ = self.start()
+        self.send(url, 0, self.image[:10])
+        for offset in (0, 20):
+            response = self.send(url, offset, self.image[offset:offset + 10])
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual((response.json()['offset'], response['Upload-Offset']), (10, '10'))
+        self.assertEqual(self.send(url, 10, self.image[10:]).status_code, 200)
+
+    def test_concurrent_chunk_is_turned_away(self):
+        url, pk = self.start()
+        with open(partial_path(UploadSessionModel.objects.get(pk=pk)), 'r+b') as partial:
+            fcntl.flock(partial, fcntl.LOCK_EX)
+            response = self.send(url, 0, self.image)
+            self.assertEqual((response.status_code, response.json()['offset']), (409, 0))
+            self.assertEqual(self.complete(pk).status_code, 409)
+        self.assertEqual(self.send(url, 0, self.image).status_code, 200)
+
+    def test_invalid_uploads_are_not_completed(self):
+        url, pk = self.start()
+        self.send(url, 0, self.image[:10])
+        self.assertEqual(self.complete(pk).json(), {'detail': f'Received 10 of {len(self.image)} bytes.'})
+        self.assertEqual(self.send(url, 10, self.image[10:] + b'extra').status_code, 400)
+
+        url, pk = self.start(sha256='0' * 64)
+        self.send(url, 0, self.image)
+        response = self.complete(pk)
+        self.assertEqual(response.json(), {'detail': 'The checksum does not match the uploaded bytes.'})
+        self.assertEqual(UploadSessionModel.objects.get(pk=pk).status, 'pending')
+
+
+@override_settings(CACHES=NO_CACHE)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.router = replicas.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.enterContext(mock.patch('eco_portfolio.replicas.replica_aliases', return_value=['replica1']))
+        self.check = self.enterContext(mock.patch('eco_portfolio.replicas.check_replica', return_value=True))
+        replicas._health.clear()
+        self.addCleanup(replicas._health.clear)
+
+    def route(self, request, status_code=200):
+        routed = []
+
+        def view(request):
+            routed.append(self.router.db_for_read(PortfolioModel))
+            return HttpResponse(status=status_code)
+
+        response = replicas.ReplicaMiddleware(view)(request)
+        return routed[0], response
+
+    def test_safe_requests_read_from_replicas(self):
+        self.assertEqual(self.route(self.factory.get('/'))[0], 'replica1')
+        self.assertEqual(self.router.db_for_read(PortfolioModel), 'default')
+        self.assertEqual(self.router.db_for_write(PortfolioModel), 'default')
+
+    def test_writes_stick_to_the_primary(self):
+        alias, response = self.route(self.factory.post('/'))
+        self.assertEqual(alias, 'default')
+        cookie = response.cookies[replicas.STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+
+        request = self.factory.get('/')
+        request.COOKIES[replicas.STICKY_COOKIE] = cookie.value
+        self.assertEqual(self.route(request)[0], 'default')
+
+    def test_failed_writes_do_not_stick(self):
+        _, response = self.route(self.factory.post('/'), status_code=400)
+        self.assertNotIn(replicas.STICKY_COOKIE, response.cookies)
+
+    def test_use_primary(self):
+        def view(request):
+            with replicas.use_primary():
+                return HttpResponse(self.router.db_for_read(PortfolioModel))
+
+        self.assertEqual(replicas.ReplicaMiddleware(view)(self.factory.get('/')).content, b'default')
+
+    def test_unhealthy_replicas_fall_back_to_the_primary(self):
+        self.check.return_value = False
+        metrics.reset()
+        self.assertEqual(self.route(self.factory.get('/'))[0], 'default')
+        self.route(self.factory.get('/'))
+        # The health check result is reused for HEALTH_CHECK_INTERVAL.
+        self.assertEqual(self.check.call_count, 1)
+        metrics.flush()
+        self.assertEqual(metrics._totals['db_replica_fallbacks_total'], 2)
+
+    async def test_async_requests(self):
+        async def view(request):
+            return HttpResponse(self.router.db_for_read(PortfolioModel))
+
+        response = await replicas.ReplicaMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(response.content, b'replica1')
+
+
+@override_settings(CACHES=NO_CACHE)
+class SchemaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.bodies = schema.generate_schema()
+
+    def setUp(self):
+        self.schema_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.schema_dir)
+        self.enterContext(override_settings(OPENAPI_SCHEMA_DIR=self.schema_dir, CODE_VERSION='v1'))
+        self.enterContext(mock.patch.dict(schema._loaded, clear=True))
+        self.generate = self.enterContext(mock.patch('eco_portfolio.schema.generate_schema', return_value=self.bodies))
+        schema.code_version.cache_clear()
+        self.addCleanup(schema.code_version.cache_clear)
+
+    def test_generated_once_and_stored(self):
+        response = self.client.get(reverse('schema-json'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.bodies['json'])
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertRegex(response['ETag'], r'^"v1-[0-9a-f]{16}"$')
+        self.assertEqual(set(response['Cache-Control'].split(', ')), {'public', 'no-cache'})
+        for fmt in schema.FORMATS:
+            self.assertEqual(schema.artifact_path(fmt).read_bytes(), self.bodies[fmt])
+
+        self.assertEqual(self.client.get(reverse('schema-json'))['ETag'], response['ETag'])
+        self.assertEqual(self.client.get(reverse('schema-yaml')).content, self.bodies['yaml'])
+        self.assertEqual(self.generate.call_count, 1)
+
+    def test_if_none_match(self):
+        etag = self.client.get(reverse('schema-json'))['ETag']
+        response = self.client.get(reverse('schema-json'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.content, response['ETag']), (304, b'', etag))
+        self.assertEqual(self.client.get(reverse('schema-json'), HTTP_IF_NONE_MATCH='"v0-0"').status_code, 200)
+
+    def test_served_from_the_deploy_artifact(self):
+        call_command('generate_schema', stdout=io.StringIO())
+        self.assertEqual(self.generate.call_count, 1)
+        schema.write_artifacts({'json': b'{"stored": true}', 'yaml': b'stored: true\n'})
+        stdout = io.StringIO()
+        call_command('generate_schema', stdout=stdout)
+        self.assertIn('up to date', stdout.getvalue())
+
+        response = self.client.get(reverse('schema-swagger-ui'), {'format': 'openapi'})
+        self.assertEqual(response.content, b'{"stored": true}')
+        self.assertEqual(self.client.get(reverse('schema-redoc'), {'format': 'yaml'}).content, b'stored: true\n')
+        self.assertEqual(self.generate.call_count, 1)
+
+    def test_new_code_version(self):
+        etag = self.client.get(reverse('schema-json'))['ETag']
+
+        with self.settings(CODE_VERSION='v2'):
+            schema.code_version.cache_clear()
+            response = self.client.get(reverse('schema-json'), HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response['ETag'].startswith('"v2-'))
+            self.assertEqual(self.generate.call_count, 2)
+            self.assertEqual(sorted(os.listdir(self.schema_dir)), ['openapi-v2.json', 'openapi-v2.yaml'])
+
+
+# The views' documentation declared with drf_yasg itself, as before the
+# stand-ins in eco_portfolio.docs: modules that built stand-ins while Django
+# was set up are reloaded once drf_yasg can be imported.
+EAGER_SCHEMA_SCRIPT = '''
+import importlib, sys
+import django
+django.setup()
+from drf_yasg import openapi, utils
+from eco_portfolio import docs
+stand_in = docs.openapi
+docs.openapi, docs.no_body, docs.swagger_auto_schema = openapi, utils.no_body, utils.swagger_auto_schema
+docs.resolve = lambda value: value
+for module in list(sys.modules.values()):
+    if module is not docs and getattr(module, 'openapi', None) is stand_in:
+        importlib.reload(module)
+from eco_portfolio.schema import generate_schema
+sys.stdout.buffer.write(generate_schema()['json'])
+'''
+
+
+class LazyDocsTests(TestCase):
+    def run_script(self, script):
+        return subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, capture_output=True, check=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'eco_portfolio.settings'},
+        ).stdout
+
+    def test_workers_start_without_drf_yasg(self):
+        for handler in ('wsgi', 'asgi'):
+            self.assertFalse(json.loads(self.run_script(WORKER_SCRIPT.format(handler=handler)))['docs_loaded'])
+
+    def test_schema_matches_eager_declarations(self):
+        self.assertEqual(schema.generate_schema()['json'], self.run_script(EAGER_SCHEMA_SCRIPT))
+
+
+class CounterTests(PortfolioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_team = TeamModel.objects.create(name='other team')
+        self.other_category = CategoryModel.objects.create(name='other category')
+
+    def assertCounts(self, teams, categories):
+        self.assertEqual(
+            dict(TeamModel.objects.values_list('name', 'portfolio_count')),
+            {'team': teams[0], 'other team': teams[1]},
+        )
+        self.assertEqual(
+            dict(CategoryModel.objects.values_list('name', 'portfolio_count')),
+            {'category': categories[0], 'other category': categories[1]},
+        )
+
+    def test_create(self):
+        create_portfolio(self.team, self.category)
+        create_portfolio(self.team, self.other_category)
+        self.assertCounts((2, 0), (1, 1))
+
+    def test_reassign(self):
+        portfolio = create_portfolio(self.team, self.category)
+        portfolio.team = self.other_team
+        portfolio.save()
+        self.assertCounts((0, 1), (1, 0))
+
+        # Loaded from the database, then moved twice.
+        portfolio = PortfolioModel.objects.get(pk=portfolio.pk)
+        portfolio.category = self.other_category
+        portfolio.save(update_fields=['category'])
+        portfolio.category = self.category
+        portfolio.save()
+        self.assertCounts((0, 1), (1, 0))
+
+        portfolio.name = 'renamed'
+        portfolio.save(update_fields=['name'])
+        self.assertCounts((0, 1), (1, 0))
+
+    def test_loading_does_not_query_deferred_columns(self):
+        create_portfolio(self.team, self.category)
+        with self.assertNumQueries(1):
+            portfolio = PortfolioModel.objects.only('name').get()
+        self.assertEqual(portfolio._counted, (None, None))
+
+    def test_delete(self):
+        portfolio = create_portfolio(self.team, self.category)
+        create_portfolio(self.other_team, self.category)
+        portfolio.team = self.other_team
+        # The row is counted under the team it was saved with.
+        portfolio.delete()
+        self.assertCounts((0, 1), (1, 0))
+
+        # Cascades go through the same signals.
+        self.other_team.delete()
+        self.assertEqual(CategoryModel.objects.get(pk=self.category.pk).portfolio_count, 0)
+
+    def test_reconcile_counters(self):
+        create_portfolio(self.team, self.category)
+        self.team.members.add(UserModel.objects.create_user(username='member', email='member@example.com'))
+        self.assertEqual(reconcile_counters(), {
+            'team.portfolio_count': 0, 'category.portfolio_count': 0, 'team.member_count': 0,
+        })
+
+        TeamModel.objects.update(portfolio_count=5, member_count=0)
+        CategoryModel.objects.filter(pk=self.category.pk).update(portfolio_count=0)
+        self.assertEqual(reconcile_counters(), {
+            'team.portfolio_count': 2, 'category.portfolio_count': 1, 'team.member_count': 1,
+        })
+        self.assertCounts((1, 0), (1, 0))
+        self.assertEqual(TeamModel.objects.get(pk=self.team.pk).member_count, 1)
+
+    def test_migrations_count_existing_rows(self):
+        create_portfolio(self.team, self.category)
+        self.team.members.add(UserModel.objects.create_user(username='member', email='member@example.com'))
+        TeamModel.objects.update(portfolio_count=0, member_count=0)
+        CategoryModel.objects.update(portfolio_count=0)
+
+        import_module('users.migrations.0003_team_counters').count_members(apps, None)
+        import_module('portfolio.migrations.0007_category_counters').count_portfolios(apps, None)
+        self.assertCounts((1, 0), (1, 0))
+        self.assertEqual(TeamModel.objects.get(pk=self.team.pk).member_count, 1)
+
+
+class EventStreamTests(PortfolioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch.object(events, '_local_ids', itertools.count(1)))
+        self.enterContext(mock.patch.object(events, '_local_buffer', deque(maxlen=3)))
+        # A stream then sends a keepalive as soon as it has nothing more to send.
+        self.enterContext(mock.patch.object(events, 'HEARTBEAT_INTERVAL', 0.01))
+
+    async def stream(self, headers=None, **params):
+        response = await self.async_client.get(reverse('events'), params, headers=headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = []
+        async for chunk in response.streaming_content:
+            if chunk == b': keepalive\n\n':
+                break
+            chunks.append(chunk.decode())
+        self.assertEqual(chunks[0], f'retry: {events.RETRY_MS}\n\n')
+        received = []
+        for chunk in chunks[1:]:
+            fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+            received.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+        return received
+
+    def publish(self, count, topic='category'):
+        events.publish([(topic, {'action': 'created', 'id': i}) for i in range(count)])
+
+    async def test_new_streams_start_after_the_latest_event(self):
+        self.publish(1)
+        self.assertEqual(await self.stream(), [])
+
+    async def test_replay_after_last_event_id(self):
+        self.publish(3)
+        self.assertEqual([event[0] for event in await self.stream({'Last-Event-ID': '1'})], [2, 3])
+        # EventSource cannot set headers on its first connection.
+        self.assertEqual(await self.stream(last_event_id=2), [(3, 'category', {'action': 'created', 'id': 2})])
+        self.assertEqual(await self.stream({'Last-Event-ID': '3'}), [])
+
+    async def test_topics(self):
+        self.publish(1)
+        self.publish(1, topic='team')
+        received = await self.stream(last_event_id=0, topics='team')
+        self.assertEqual(received, [(2, 'team', {'action': 'created', 'id': 0})])
+
+    async def test_reset_when_events_were_lost(self):
+        self.publish(5)
+        # The buffer holds 3, 4 and 5, so event 2 is lost.
+        self.assertEqual(await self.stream(last_event_id=1), [(5, 'reset', {})])
+        self.assertEqual(len(await self.stream(last_event_id=2)), 3)
+        # An id past the latest one: the ids started over.
+        self.assertEqual(await self.stream(last_event_id=9), [(5, 'reset', {})])
+
+    async def test_live_events(self):
+        self.publish(1)
+        response = await self.async_client.get(reverse('events'), headers={'Last-Event-ID': '0'})
+        content = aiter(response.streaming_content)
+        self.assertEqual(await anext(content), f'retry: {events.RETRY_MS}\n\n'.encode())
+        self.assertEqual(await anext(content), b'id: 1\nevent: category\ndata: {"action":"created","id":0}\n\n')
+        self.publish(1)
+        chunk = await anext(content)
+        while chunk == b': keepalive\n\n':
+            chunk = await anext(content)
+        self.assertEqual(chunk, b'id: 2\nevent: category\ndata: {"action":"created","id":0}\n\n')
+        await content.aclose()
+
+    @sync_to_async
+    def add_member(self):
+        user = UserModel.objects.create_user(username='member', email='member@example.com')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team.members.add(user)
+        return user
+
+    async def test_member_ids_need_authentication(self):
+        user = await self.add_member()
+        received = await self.stream(last_event_id=0)
+        self.assertEqual(received, [(1, 'team', {'action': 'members_added', 'id': self.team.id})])
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        self.assertEqual(
+            await self.stream(headers, last_event_id=0),
+            [(1, 'team', {'action': 'members_added', 'id': self.team.id, 'members': [user.id]})],
+        )
+        response = await self.async_client.get(reverse('events'), headers={'Authorization': 'Bearer invalid'})
+        self.assertEqual(response.status_code, 401)
+
+
+class BulkCreateTests(PortfolioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch.object(events, '_local_buffer', deque()))
+        # The uploads name files that do not exist; derivatives are not generated.
+        self.enterContext(mock.patch('portfolio.images.executor'))
+
+    def create_upload(self, name='image'):
+        return UploadSessionModel.objects.create(
+            filename=f'{name}.png', size=1, received=1, status='complete', file=f'portfolio/{name}.png',
+        )
+
+    def item(self, name, upload, **fields):
+        return {
+            'name': name, 'description': f'About {name}', 'upload': str(upload.pk), 'link': 'https://example.com',
+            'demo_video': 'https://example.com/video', 'team': self.team.pk, 'category': self.category.pk, **fields,
+        }
+
+    def post(self, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('portfolio'), items, format='json')
+
+    def test_creates_every_item(self):
+        uploads = [self.create_upload(f'image-{i}') for i in range(2)]
+        response = self.post([self.item(f'portfolio-{i}', upload) for i, upload in enumerate(uploads)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual([result['index'] for result in response.json()['results']], [0, 1])
+        portfolios = PortfolioModel.objects.order_by('pk')
+        self.assertEqual([result['data']['id'] for result in response.json()['results']], [p.pk for p in portfolios])
+        self.assertEqual([p.image.name for p in portfolios], ['portfolio/image-0.png', 'portfolio/image-1.png'])
+        self.assertFalse(UploadSessionModel.objects.exists())
+
+    def test_mixed_items(self):
+        items = [
+            self.item('valid', self.create_upload()),
+            self.item('unknown team', self.create_upload('other'), team=999),
+            self.item('invalid link', self.create_upload('third'), link='ftp://example.com'),
+            'not an object',
+        ]
+        response = self.post(items)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.json()['created'], 1)
+        results = response.json()['results']
+        self.assertEqual(results[0]['data']['name'], 'valid')
+        self.assertEqual(results[1], {'index': 1, 'errors': {'team': ['Invalid pk "999" - object does not exist.']}})
+        self.assertEqual(results[2], {'index': 2, 'errors': {'link': ['Invalid link.']}})
+        self.assertEqual(list(results[3]['errors']), ['non_field_errors'])
+        # The uploads of the rejected items can still be used.
+        self.assertEqual(UploadSessionModel.objects.count(), 2)
+
+        response = self.post(items[1:])
+        self.assertEqual((response.status_code, response.json()['created']), (400, 0))
+
+    def test_reused_upload(self):
+        upload = self.create_upload()
+        response = self.post([self.item('first', upload), self.item('second', upload)])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.json()['results'][1], {
+            'index': 1, 'errors': {'upload': ['This upload has already been used.']},
+        })
+
+        response = self.post([self.item('third', upload)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['results'][0]['errors'], {
+            'upload': [f'Invalid pk "{upload.pk}" - object does not exist.'],
+        })
+        self.assertEqual(list(PortfolioModel.objects.values_list('name', flat=True)), ['first'])
+
+    def test_one_query_per_related_field(self):
+        def create(count):
+            items = [self.item(f'portfolio-{i}', self.create_upload(f'image-{i}')) for i in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.post(items).json()['created'], count)
+            return [query['sql'] for query in queries.captured_queries]
+
+        few, many = create(2), create(20)
+        self.assertEqual(len(few), len(many))
+        for table in ('users_teammodel', 'portfolio_categorymodel'):
+            self.assertEqual(sum(sql.startswith('SELECT') and f'FROM "{table}"' in sql for sql in many), 1, table)
+
+    def test_side_effects(self):
+        self.post([
+            self.item('Solar tracker', self.create_upload()),
+            self.item('Wind map', self.create_upload('other')),
+        ])
+
+        self.team.refresh_from_db()
+        self.category.refresh_from_db()
+        self.assertEqual((self.team.portfolio_count, self.category.portfolio_count), (2, 2))
+        results = self.client.get(reverse('portfolio-search'), {'q': 'solar'}).json()
+        self.assertEqual([result['portfolio']['name'] for result in results], ['Solar tracker'])
+        published = [events._parse(message)[1:] for message in events._local_buffer]
+        self.assertEqual([(topic, json.loads(data)['action']) for topic, data in published], [
+            ('portfolio', 'created'), ('portfolio', 'created'),
+        ])
+
+    def test_categories(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('categories'), [{'name': 'new'}, {'name': ''}], format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.json()['results'][1], {
+            'index': 1, 'errors': {'name': ['This field may not be blank.']},
+        })
+        self.assertEqual(len(events._local_buffer), 1)
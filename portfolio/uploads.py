@@ -0,0 +1,195 @@
+import fcntl
+import hashlib
+import os
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+
+from .models import UploadSessionModel
+
+
+# Resumable uploads: a session is created with the final size, chunks are
+# appended at the offset the server reports, and finalizing validates the
+# file and moves it into storage, where a portfolio can reference it.
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+BLOCK_SIZE = 64 * 1024
+UPLOAD_DIR = 'portfolio/'
+PARTIAL_DIR = os.path.join('uploads', 'partial')
+SESSION_LIFETIME = timedelta(hours=24)
+
+
+class UploadError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    def __init__(self, offset, message=None):
+        super().__init__(message or f'Expected offset {offset}.')
+        self.offset = offset
+
+
+class UploadBusy(OffsetMismatch):
+    def __init__(self, offset):
+        super().__init__(offset, f'Another request is writing this upload; retry from offset {offset}.')
+
+
+def partial_path(session):
+    # Chunks are written in place, so partial files live on the local disk
+    # under MEDIA_ROOT rather than behind the storage API.
+    return os.path.join(settings.MEDIA_ROOT, PARTIAL_DIR, f'{session.pk}.part')
+
+
+def create_session(filename, size, content_type='', sha256='', user=None):
+    session = UploadSessionModel.objects.create(
+        filename=os.path.basename(filename), size=size, content_type=content_type, sha256=sha256.lower(),
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+    path = partial_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return session
+
+
+@contextmanager
+def locked_partial(session):
+    """
+    Open the partial file of ``session`` under an exclusive lock and reload
+    the session, so chunks and finalization of one upload never overlap.
+    A file lock rather than SELECT ... FOR UPDATE: a chunk can take as long
+    as the client needs to send it, far too long to hold a transaction.
+    """
+    try:
+        target = open(partial_path(session), 'r+b')
+    except FileNotFoundError:
+        # Finalized or discarded since the session was read.
+        session.refresh_from_db()
+        raise UploadError('This upload is already complete.')
+    with target:
+        try:
+            fcntl.flock(target, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            session.refresh_from_db(fields=['received'])
+            raise UploadBusy(session.received)
+        session.refresh_from_db()
+        yield target
+
+
+def write_chunk(session, offset, stream, length):
+    """
+    Copy ``length`` bytes from ``stream`` into the partial file at ``offset``,
+    one block at a time. Bytes that arrive before the client disconnects are
+    kept, so the next chunk resumes from the offset reported back.
+    """
+    if length > MAX_CHUNK_SIZE:
+        raise UploadError(f'Chunks are limited to {MAX_CHUNK_SIZE} bytes.')
+    if session.status != 'pending':
+        raise UploadError('This upload is already complete.')
+
+    written = 0
+    with locked_partial(session) as target:
+        if session.status != 'pending':
+            raise UploadError('This upload is already complete.')
+        if offset != session.received:
+            raise OffsetMismatch(session.received)
+        if offset + length > session.size:
+            raise UploadError('The chunk goes past the declared size.')
+
+        target.seek(offset)
+        while written < length:
+            block = stream.read(min(BLOCK_SIZE, length - written))
+            if not block:
+                break
+            target.write(block)
+            written += len(block)
+        target.truncate()
+        target.flush()
+
+        # Still conditional on the offset, in case the lock is not shared
+        # with another host writing to the same file.
+        advanced = UploadSessionModel.objects.filter(pk=session.pk, received=offset, status='pending').update(
+            received=F('received') + written, updated_at=timezone.now(),
+        )
+    if not advanced:
+        session.refresh_from_db(fields=['received'])
+        raise OffsetMismatch(session.received)
+    session.received = offset + written
+    return written
+
+
+def _verify(source, session):
+    if session.sha256:
+        digest = hashlib.sha256()
+        source.seek(0)
+        for block in iter(lambda: source.read(BLOCK_SIZE), b''):
+            digest.update(block)
+        if digest.hexdigest() != session.sha256:
+            raise UploadError('The checksum does not match the uploaded bytes.')
+    source.seek(0)
+    try:
+        with Image.open(source) as image:
+            image.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise UploadError('The uploaded file is not a valid image.')
+
+
+def finalize_upload(session):
+    """
+    Validate a fully received upload and move it into storage. Returns the
+    stored name, which PortfolioModel.image can reference directly.
+    """
+    if session.status == 'complete':
+        return session.file
+
+    try:
+        with locked_partial(session) as source:
+            if session.received != session.size:
+                raise UploadError(f'Received {session.received} of {session.size} bytes.')
+            _verify(source, session)
+            source.seek(0)
+            name = default_storage.save(UPLOAD_DIR + session.filename, File(source))
+            # The session only turns complete once the file is stored, and
+            # only once: the lock keeps a second finalization out.
+            completed = UploadSessionModel.objects.filter(pk=session.pk, status='pending').update(
+                status='complete', file=name, updated_at=timezone.now(),
+            )
+            if not completed:
+                default_storage.delete(name)
+                raise UploadError('This upload was discarded.')
+            os.remove(partial_path(session))
+    except UploadError:
+        if session.status == 'complete':
+            return session.file
+        raise
+
+    session.status = 'complete'
+    session.file = name
+    return name
+
+
+def discard_upload(session, delete_file=True):
+    path = partial_path(session)
+    if os.path.exists(path):
+        os.remove(path)
+    if delete_file and session.file:
+        default_storage.delete(session.file)
+    session.delete()
+
+
+def purge_expired_uploads(lifetime=SESSION_LIFETIME):
+    """
+    Drop sessions untouched for ``lifetime``, with their partial files and
+    any finalized file that was never attached to a portfolio.
+    """
+    expired = UploadSessionModel.objects.filter(updated_at__lt=timezone.now() - lifetime)
+    count = 0
+    for session in expired.iterator():
+        discard_upload(session)
+        count += 1
+    return count
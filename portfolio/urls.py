@@ -1,10 +1,23 @@
 from django.urls import path
-from .views import PortfolioView, PortfolioDetailView, CategoryView, CategoryDetailView
+from . import async_views
+from .views import PortfolioView, PortfolioDetailView, PortfolioSearchView, PortfolioExportView, PortfolioImportView, \
+    PortfolioFacetsView, CategoryView, CategoryDetailView, UploadView, UploadDetailView, UploadCompleteView
 
 
 urlpatterns = [
     path('', PortfolioView.as_view(), name='portfolio'),
+    path('facets/', PortfolioFacetsView.as_view(), name='portfolio-facets'),
+    path('search/', PortfolioSearchView.as_view(), name='portfolio-search'),
+    path('export/', PortfolioExportView.as_view(), name='portfolio-export'),
+    path('import/', PortfolioImportView.as_view(), name='portfolio-import'),
     path('<int:pk>/', PortfolioDetailView.as_view(), name='portfolio-detail'),
     path('categories/', CategoryView.as_view(), name='categories'),
     path('categories/<int:pk>/', CategoryDetailView.as_view(), name='category-detail'),
+    path('uploads/', UploadView.as_view(), name='uploads'),
+    path('uploads/<uuid:pk>/', UploadDetailView.as_view(), name='upload-detail'),
+    path('uploads/<uuid:pk>/complete/', UploadCompleteView.as_view(), name='upload-complete'),
+
+    path('async/', async_views.portfolio_list, name='portfolio-async'),
+    path('async/<int:pk>/', async_views.portfolio_detail, name='portfolio-detail-async'),
+    path('async/categories/', async_views.category_list, name='categories-async'),
 ]
\ No newline at end of file
@@ -1,15 +1,27 @@
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
-from .models import PortfolioModel, CategoryModel
-from .serializers import PortfolioSerializer, CategorySerializer
+from eco_portfolio.bulk import BulkResultSerializer, bulk_response
+from eco_portfolio.docs import no_body, openapi, swagger_auto_schema
+from eco_portfolio.cache import bump_version, cache_response
+from eco_portfolio.fieldsets import fieldset_parameters
+from eco_portfolio.conditional import collection_validators, conditional_get, instance_validators
+from eco_portfolio.pagination import KeysetPagination, pagination_parameters
+from .filters import filter_parameters, filter_portfolios, portfolio_facets
+from .models import PortfolioModel, CategoryModel, UploadSessionModel
+from .notifications import notify_portfolios_created
+from .search import search_portfolios
+from .serializers import PortfolioSerializer, CategorySerializer, PortfolioSearchResultSerializer, \
+    PortfolioImportReportSerializer, PortfolioFacetsSerializer, UploadSessionSerializer
 from rest_framework.parsers import MultiPartParser, FormParser
+from django.http import StreamingHttpResponse
+from .ndjson import NDJSONParser, export_portfolios, import_portfolios
+from .uploads import OffsetMismatch, UploadError, create_session, discard_upload, finalize_upload, write_chunk
+from eco_portfolio.renderers import FastJSONParser
 
 
 class PortfolioView(APIView):
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [MultiPartParser, FormParser, FastJSONParser]
     # def get_permissions(self):
     #     if self.request.method == 'POST':
     #         return [permissions.IsAuthenticated()]
@@ -17,22 +29,37 @@ class PortfolioView(APIView):
 
     @swagger_auto_schema(
         request_body=PortfolioSerializer,
+        operation_description='A JSON list of portfolios creates them in bulk, each with an `upload` as its image; '
+                              'the response then reports every item.',
         responses={
             201: openapi.Response(
                 'Portfolio created successfully.',
                 PortfolioSerializer,
             ),
+            207: openapi.Response(
+                'Bulk create where only some portfolios were valid.',
+                BulkResultSerializer,
+            ),
         },
         tags=['portfolio'],
     )
     def post(self, request):
+        if isinstance(request.data, list):
+            serializer = PortfolioSerializer(data=request.data, many=True)
+            if serializer.is_valid():
+                notify_portfolios_created(serializer.save())
+                return bulk_response(serializer)
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
         serializer = PortfolioSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            portfolio = serializer.save()
+            notify_portfolios_created([portfolio])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @swagger_auto_schema(
+        manual_parameters=filter_parameters + fieldset_parameters + pagination_parameters,
         responses={
             200: openapi.Response(
                 'Portfolio details retrieved successfully.',
@@ -41,20 +68,116 @@ class PortfolioView(APIView):
         },
         tags=['portfolio'],
     )
+    @conditional_get(collection_validators(PortfolioModel.objects.all()))
+    @cache_response('portfolio-list', ['portfolio'])
     def get(self, request):
-        portfolios = PortfolioModel.objects.all()
-        serializer = PortfolioSerializer(portfolios, many=True)
+        fieldset = PortfolioSerializer.get_fieldset(request.query_params)
+        portfolios = filter_portfolios(PortfolioModel.objects.all(), request.query_params)
+        portfolios = PortfolioSerializer.narrow_queryset(portfolios, fieldset, keep=('created_at',))
+        paginator = KeysetPagination(ordering=('created_at', 'id'))
+        page = paginator.paginate_queryset(portfolios, request)
+        if page is not None:
+            serializer = PortfolioSerializer(page, many=True, context={'fields': fieldset})
+            return paginator.get_paginated_response(serializer.data)
+        serializer = PortfolioSerializer(portfolios, many=True, context={'fields': fieldset})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class PortfolioFacetsView(APIView):
+
+    @swagger_auto_schema(
+        manual_parameters=filter_parameters,
+        responses={
+            200: openapi.Response(
+                'Portfolio counts per category and per team, largest first.',
+                PortfolioFacetsSerializer,
+            ),
+        },
+        tags=['portfolio'],
+    )
+    @cache_response('portfolio-facets', ['portfolio', 'category', 'team'])
+    def get(self, request):
+        portfolios = filter_portfolios(PortfolioModel.objects.all(), request.query_params)
+        serializer = PortfolioFacetsSerializer(portfolio_facets(portfolios))
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class PortfolioSearchView(APIView):
+    max_limit = 100
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True,
+                              description='Words to search for in portfolio names and descriptions.'),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description='Maximum number of results, at most 100.'),
+        ],
+        responses={
+            200: openapi.Response(
+                'Portfolios matching the query, best match first.',
+                PortfolioSearchResultSerializer(many=True),
+            ),
+        },
+        tags=['portfolio'],
+    )
+    @cache_response('portfolio-search', ['portfolio'])
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'q': ['This query parameter is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.max_limit)
+        except ValueError:
+            return Response({'limit': ['A valid integer is required.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [
+            {'portfolio': portfolio, 'rank': rank, 'highlights': highlights}
+            for portfolio, rank, highlights in search_portfolios(query, limit)
+        ]
+        serializer = PortfolioSearchResultSerializer(results, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class PortfolioExportView(APIView):
+
+    @swagger_auto_schema(
+        responses={
+            200: openapi.Response('One JSON portfolio per line (application/x-ndjson).'),
+        },
+        tags=['portfolio'],
+    )
+    def get(self, request):
+        response = StreamingHttpResponse(export_portfolios(PortfolioModel.objects.all()),
+                                         content_type=NDJSONParser.media_type)
+        response['Content-Disposition'] = 'attachment; filename="portfolios.ndjson"'
+        return response
+
+
+class PortfolioImportView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    parser_classes = [NDJSONParser]
+
+    @swagger_auto_schema(
+        operation_description='Body: one JSON portfolio per line. Rows with an existing id are updated.',
+        responses={
+            200: openapi.Response('Import report with per-line errors.', PortfolioImportReportSerializer),
+        },
+        tags=['portfolio'],
+    )
+    def post(self, request):
+        report = import_portfolios(request.data)
+        return Response(report, status=status.HTTP_200_OK)
+
+
 class PortfolioDetailView(APIView):
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [MultiPartParser, FormParser, FastJSONParser]
     # def get_permissions(self):
     #     if self.request.method in ['PUT', 'DELETE']:
     #         return [permissions.IsAuthenticated()]
     #     return [permissions.AllowAny()]
 
     @swagger_auto_schema(
+        manual_parameters=fieldset_parameters,
         responses={
             200: openapi.Response(
                 'Portfolio details retrieved successfully.',
@@ -63,9 +186,12 @@ class PortfolioDetailView(APIView):
         },
         tags=['portfolio'],
     )
+    @conditional_get(instance_validators(PortfolioModel.objects.all()))
+    @cache_response('portfolio-detail', ['portfolio'])
     def get(self, request, pk):
-        portfolio = PortfolioModel.objects.get(pk=pk)
-        serializer = PortfolioSerializer(portfolio)
+        fieldset = PortfolioSerializer.get_fieldset(request.query_params)
+        portfolio = PortfolioSerializer.narrow_queryset(PortfolioModel.objects.all(), fieldset).get(pk=pk)
+        serializer = PortfolioSerializer(portfolio, context={'fields': fieldset})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
@@ -97,6 +223,7 @@ class PortfolioDetailView(APIView):
     def delete(self, request, pk):
         portfolio = PortfolioModel.objects.get(pk=pk)
         portfolio.delete()
+        bump_version('portfolio')
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -108,15 +235,27 @@ class CategoryView(APIView):
 
     @swagger_auto_schema(
         request_body=CategorySerializer,
+        operation_description='A JSON list of categories creates them in bulk; the response then reports every item.',
         responses={
             201: openapi.Response(
                 'Category created successfully.',
                 CategorySerializer,
             ),
+            207: openapi.Response(
+                'Bulk create where only some categories were valid.',
+                BulkResultSerializer,
+            ),
         },
         tags=['category'],
     )
     def post(self, request):
+        if isinstance(request.data, list):
+            serializer = CategorySerializer(data=request.data, many=True)
+            if serializer.is_valid():
+                serializer.save()
+                return bulk_response(serializer)
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
         serializer = CategorySerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
@@ -124,6 +263,7 @@ class CategoryView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @swagger_auto_schema(
+        manual_parameters=pagination_parameters,
         responses={
             200: openapi.Response(
                 'Category details retrieved successfully.',
@@ -132,8 +272,15 @@ class CategoryView(APIView):
         },
         tags=['category'],
     )
+    @conditional_get(collection_validators(CategoryModel.objects.all()))
+    @cache_response('category-list', ['category'])
     def get(self, request):
         categories = CategoryModel.objects.all()
+        paginator = KeysetPagination(ordering=('id',))
+        page = paginator.paginate_queryset(categories, request)
+        if page is not None:
+            serializer = CategorySerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
         serializer = CategorySerializer(categories, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -153,6 +300,7 @@ class CategoryDetailView(APIView):
         },
         tags=['category'],
     )
+    @conditional_get(instance_validators(CategoryModel.objects.all()))
     def get(self, request, pk):
         category = CategoryModel.objects.get(pk=pk)
         serializer = CategorySerializer(category)
@@ -187,4 +335,118 @@ class CategoryDetailView(APIView):
     def delete(self, request, pk):
         category = CategoryModel.objects.get(pk=pk)
         category.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        bump_version('category', 'portfolio')
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def upload_response(session, status_code=status.HTTP_200_OK):
+    response = Response(UploadSessionSerializer(session).data, status=status_code)
+    response['Upload-Offset'] = str(session.received)
+    return response
+
+
+class UploadView(APIView):
+
+    @swagger_auto_schema(
+        request_body=UploadSessionSerializer,
+        responses={
+            201: openapi.Response(
+                'Upload started; send the bytes in chunks to the upload.',
+                UploadSessionSerializer,
+            ),
+        },
+        tags=['uploads'],
+    )
+    def post(self, request):
+        serializer = UploadSessionSerializer(data=request.data)
+        if serializer.is_valid():
+            session = create_session(user=request.user, **serializer.validated_data)
+            return upload_response(session, status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UploadDetailView(APIView):
+    upload_offset_parameter = openapi.Parameter(
+        'Upload-Offset', openapi.IN_HEADER, type=openapi.TYPE_INTEGER, required=True,
+        description='Byte offset of this chunk; must equal the offset reported by the server.',
+    )
+
+    @swagger_auto_schema(
+        responses={
+            200: openapi.Response(
+                'Upload state; resume by sending the bytes from offset.',
+                UploadSessionSerializer,
+            ),
+        },
+        tags=['uploads'],
+    )
+    def get(self, request, pk):
+        session = UploadSessionModel.objects.get(pk=pk)
+        return upload_response(session)
+
+    @swagger_auto_schema(
+        operation_description='Body: raw bytes of the chunk, at most 8 MiB.',
+        manual_parameters=[upload_offset_parameter],
+        responses={
+            200: openapi.Response('Chunk stored.', UploadSessionSerializer),
+            409: openapi.Response('The offset does not match; the expected one is returned.'),
+        },
+        tags=['uploads'],
+    )
+    def patch(self, request, pk):
+        session = UploadSessionModel.objects.get(pk=pk)
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.META['CONTENT_LENGTH'])
+        except KeyError:
+            return Response({'detail': 'Upload-Offset and Content-Length headers are required.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({'detail': 'Upload-Offset and Content-Length must be integers.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # The body is streamed to disk; request.data is never touched.
+            write_chunk(session, offset, request.stream, length)
+        except OffsetMismatch as e:
+            response = Response({'detail': str(e), 'offset': e.offset}, status=status.HTTP_409_CONFLICT)
+            response['Upload-Offset'] = str(e.offset)
+            return response
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return upload_response(session)
+
+    @swagger_auto_schema(
+        responses={
+            204: openapi.Response('Upload discarded.'),
+        },
+        tags=['uploads'],
+    )
+    def delete(self, request, pk):
+        session = UploadSessionModel.objects.get(pk=pk)
+        discard_upload(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadCompleteView(APIView):
+
+    @swagger_auto_schema(
+        request_body=no_body,
+        responses={
+            200: openapi.Response(
+                'Upload validated and stored; pass its id as upload when creating or updating a portfolio.',
+                UploadSessionSerializer,
+            ),
+            409: openapi.Response('A chunk of this upload is still being written.'),
+        },
+        tags=['uploads'],
+    )
+    def post(self, request, pk):
+        session = UploadSessionModel.objects.get(pk=pk)
+        try:
+            finalize_upload(session)
+        except OffsetMismatch as e:
+            return Response({'detail': str(e), 'offset': e.offset}, status=status.HTTP_409_CONFLICT)
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return upload_response(session)
@@ -0,0 +1,24 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from eco_portfolio.async_cache import acache_payload
+from .models import TeamModel
+from .serializers import ResponseTeamSerializer
+
+
+@require_GET
+async def team_detail(request, team_id):
+    async def build():
+        fieldset = ResponseTeamSerializer.get_fieldset(request.GET)
+        team = await ResponseTeamSerializer.setup_eager_loading(TeamModel.objects.all(), fieldset).aget(id=team_id)
+        return ResponseTeamSerializer(team, context={'fields': fieldset}).data
+
+    try:
+        data = await acache_payload('team-detail', ['team'], request, build)
+    except TeamModel.DoesNotExist:
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=status.HTTP_400_BAD_REQUEST)
+    return JsonResponse(data)
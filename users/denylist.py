@@ -0,0 +1,74 @@
+import time
+
+from django.core.cache import cache
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import RedisError
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.settings import api_settings
+
+from eco_portfolio.async_cache import uses_redis
+
+
+# Revoked tokens live in Redis under their jti until they would have expired
+# anyway, so the denylist never needs cleaning up. Revoking every session of
+# a user stores a single "revoked before" timestamp that is compared with the
+# token's iat claim.
+DENYLIST_KEY = 'jwt:denylist:{}'
+REVOKED_BEFORE_KEY = 'jwt:revoked_before:{}'
+
+
+class DenylistUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Token revocation is temporarily unavailable, try again later.'
+    default_code = 'denylist_unavailable'
+
+
+def _client():
+    # The cache itself ignores Redis errors, which would let revoked tokens
+    # through; the denylist goes to django_redis' client, which raises.
+    return cache.client if uses_redis() else cache
+
+
+def _call(method, *args, **kwargs):
+    try:
+        return getattr(_client(), method)(*args, **kwargs)
+    except (ConnectionInterrupted, RedisError) as e:
+        raise DenylistUnavailable() from e
+
+
+def _remaining_lifetime(token):
+    return max(int(token['exp'] - time.time()), 1)
+
+
+def revoke_token(token):
+    _call('set', DENYLIST_KEY.format(token[api_settings.JTI_CLAIM]), 1, timeout=_remaining_lifetime(token))
+
+
+def claim_token(token):
+    """
+    Revoke a single-use token, returning False if it already was revoked.
+    The check and the revocation are one atomic SET NX, so concurrent uses
+    of the same token cannot both succeed.
+    """
+    return bool(_call('add', DENYLIST_KEY.format(token[api_settings.JTI_CLAIM]), 1,
+                      timeout=_remaining_lifetime(token)))
+
+
+def revoke_user_tokens(user_id):
+    longest_lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+    _call('set', REVOKED_BEFORE_KEY.format(user_id), int(time.time()), timeout=int(longest_lifetime.total_seconds()))
+
+
+def is_token_revoked(token):
+    denylist_key = DENYLIST_KEY.format(token.get(api_settings.JTI_CLAIM))
+    revoked_before_key = REVOKED_BEFORE_KEY.format(token.get(api_settings.USER_ID_CLAIM))
+    # Both checks share one round trip.
+    values = _call('get_many', [denylist_key, revoked_before_key])
+    if denylist_key in values:
+        return True
+    # iat has one-second granularity: tokens issued in the second of the
+    # revocation stay valid, or logging in again right away would fail.
+    # Callers revoke the token at hand by jti as well.
+    revoked_before = values.get(revoked_before_key)
+    return revoked_before is not None and token.get('iat', 0) < revoked_before
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.skills import rebuild_skill_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the skill index from the skills lists of all users.'
+
+    def handle(self, *args, **options):
+        count = rebuild_skill_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} user skills.'))
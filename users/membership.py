@@ -0,0 +1,81 @@
+import operator
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+
+from eco_portfolio.cache import bump_version
+from eco_portfolio.counters import recount
+from eco_portfolio.events import emit
+from .models import TeamModel
+from .user_cache import invalidate_users
+
+
+Membership = TeamModel.members.through
+
+
+def apply_membership_changes(changes):
+    """
+    Apply ``[{'team_id', 'add', 'remove'}, ...]`` in one transaction and
+    return what actually changed per team.
+
+    Existing rows are read with one query; additions are a single bulk
+    insert into the through table and removals a single DELETE. Bulk
+    operations skip ``m2m_changed``, so the side effects its receivers and
+    the single-member views provide are applied here.
+    """
+    team_ids = [change['team_id'] for change in changes]
+    user_ids = {user_id for change in changes for user_id in (*change['add'], *change['remove'])}
+
+    with transaction.atomic():
+        existing = set(
+            Membership.objects.filter(teammodel_id__in=team_ids, usermodel_id__in=user_ids)
+            .values_list('teammodel_id', 'usermodel_id')
+        )
+        diff = []
+        to_add, to_remove = [], []
+        for change in changes:
+            team_id = change['team_id']
+            added = sorted(user_id for user_id in set(change['add']) if (team_id, user_id) not in existing)
+            removed = sorted(user_id for user_id in set(change['remove']) if (team_id, user_id) in existing)
+            to_add.extend(Membership(teammodel_id=team_id, usermodel_id=user_id) for user_id in added)
+            if removed:
+                to_remove.append(Q(teammodel_id=team_id, usermodel_id__in=removed))
+            diff.append({'team_id': team_id, 'added': added, 'removed': removed})
+
+        if to_add:
+            # A concurrent request may have inserted the same row since the read.
+            Membership.objects.bulk_create(to_add, ignore_conflicts=True)
+        if to_remove:
+            Membership.objects.filter(reduce(operator.or_, to_remove)).delete()
+        # The same concurrent request means the diff may overstate what was
+        # inserted or deleted, so the affected teams are recounted instead.
+        recount_members([team['team_id'] for team in diff if team['added'] or team['removed']])
+        emit('team', 'members_added', [
+            {'id': team['team_id'], 'members': team['added']} for team in diff if team['added']
+        ])
+        emit('team', 'members_removed', [
+            {'id': team['team_id'], 'members': team['removed']} for team in diff if team['removed']
+        ])
+
+    changed_users = {user_id for team in diff for user_id in (*team['added'], *team['removed'])}
+    if changed_users:
+        bump_version('team')
+        invalidate_users(changed_users)
+    return diff
+
+
+def recount_members(team_ids=None):
+    """
+    Recompute ``TeamModel.member_count`` from the membership table, for
+    ``team_ids`` or every team. Returns the number of teams corrected.
+    """
+    count = Subquery(
+        Membership.objects.filter(teammodel=OuterRef('pk')).order_by()
+        .values('teammodel').annotate(count=Count('pk')).values('count')
+    )
+    teams = TeamModel.objects.all() if team_ids is None else TeamModel.objects.filter(pk__in=team_ids)
+    corrected = recount(teams, 'member_count', count)
+    if corrected:
+        bump_version('team')
+    return corrected
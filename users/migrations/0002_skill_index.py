@@ -0,0 +1,49 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# A copy of users.skills.normalize_skills as of this migration, so later
+# changes to it cannot change what this migration does.
+def normalize_skills(skills):
+    if not isinstance(skills, (list, tuple)):
+        return set()
+    return {' '.join(skill.split()).lower()[:100] for skill in skills if isinstance(skill, str) and skill.strip()}
+
+
+def index_existing_skills(apps, schema_editor):
+    UserModel = apps.get_model('users', 'UserModel')
+    UserSkillModel = apps.get_model('users', 'UserSkillModel')
+    UserSkillModel.objects.bulk_create(
+        [
+            UserSkillModel(user_id=user_id, skill=skill)
+            for user_id, skills in UserModel.objects.exclude(skills=None).values_list('id', 'skills')
+            for skill in normalize_skills(skills)
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSkillModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('skill', models.CharField(max_length=100)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skill_index', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='userskillmodel',
+            constraint=models.UniqueConstraint(fields=('skill', 'user'), name='user_skill_unique'),
+        ),
+        migrations.RunPython(index_existing_skills, migrations.RunPython.noop),
+    ]
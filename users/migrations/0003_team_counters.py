@@ -0,0 +1,36 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:47
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_members(apps, schema_editor):
+    TeamModel = apps.get_model('users', 'TeamModel')
+    Membership = TeamModel.members.through
+    count = Coalesce(Subquery(
+        Membership.objects.filter(teammodel=OuterRef('pk')).order_by()
+        .values('teammodel').annotate(count=Count('pk')).values('count')
+    ), Value(0))
+    TeamModel.objects.exclude(member_count=count).update(member_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_skill_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teammodel',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='teammodel',
+            name='portfolio_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_members, migrations.RunPython.noop),
+    ]
@@ -20,6 +20,11 @@ class UserModel(AbstractUser):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='not_assigned')
     skills = models.JSONField(default=list, blank=True, null=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['date_joined', 'id'], name='user_joined_id_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -30,6 +35,26 @@ class UserModel(AbstractUser):
 class TeamModel(models.Model):
     name = models.CharField(max_length=255)
     members = models.ManyToManyField(UserModel, related_name='teams', blank=True, null=True)
+    # Denormalized counts, maintained by users.signals, users.membership and
+    # portfolio.counters; `manage.py reconcile_counters` corrects any drift.
+    member_count = models.PositiveIntegerField(default=0)
+    portfolio_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.name
+
+
+class UserSkillModel(models.Model):
+    # Normalized copy of UserModel.skills, one row per (skill, user), kept in
+    # sync by users.signals. The unique constraint's (skill, user) index
+    # answers skill lookups without touching the users table.
+    skill = models.CharField(max_length=100)
+    user = models.ForeignKey(UserModel, on_delete=models.CASCADE, related_name='skill_index')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['skill', 'user'], name='user_skill_unique'),
+        ]
+
+    def __str__(self):
+        return self.skill
@@ -0,0 +1,19 @@
+from django.core.mail import EmailMessage
+
+from eco_portfolio.mail import send_later
+
+
+def notify_registered(user):
+    send_later([EmailMessage(
+        'Welcome to Eco Portfolio',
+        f'Hi {user.username},\n\nyour account has been created. You can now sign in with {user.email}.',
+        to=[user.email],
+    )])
+
+
+def notify_membership_changed(team, user, added):
+    if added:
+        subject, body = f'You joined {team.name}', f'Hi {user.username},\n\nyou have been added to the team {team.name}.'
+    else:
+        subject, body = f'You left {team.name}', f'Hi {user.username},\n\nyou have been removed from the team {team.name}.'
+    send_later([EmailMessage(subject, body, to=[user.email])])
@@ -1,7 +1,13 @@
 from django.contrib.auth import authenticate
+from django.db.models import Prefetch
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 import re
+from eco_portfolio.cache import bump_version
+from eco_portfolio.fieldsets import SparseFieldsetMixin
+from .denylist import claim_token, is_token_revoked
+from .membership import apply_membership_changes
 from .models import UserModel, TeamModel
 
 
@@ -54,10 +60,13 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class ResponseUserSerializer(serializers.ModelSerializer):
+class ResponseUserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = UserModel
-        fields = ('id', 'username', 'first_name', 'last_name', 'email', 'password', 'phone_number', 'telegram', 'role', 'skills')
+        fields = ('id', 'username', 'first_name', 'last_name', 'email', 'phone_number', 'telegram', 'role', 'skills')
+        profiles = {
+            'card': ('id', 'username', 'first_name', 'last_name', 'role'),
+        }
 
 
 class LoginSerializer(serializers.Serializer):
@@ -112,18 +121,38 @@ class RefreshTokenSerializer(serializers.Serializer):
 
         try:
             token = RefreshToken(refresh)
-            token.verify()
-            token.blacklist()
-        except Exception as e:
+        except TokenError as e:
             raise serializers.ValidationError(str(e))
+        # Refresh tokens are single use: the presented one is revoked and a
+        # rotated one is returned with the new access token.
+        if is_token_revoked(token) or not claim_token(token):
+            raise serializers.ValidationError('Token has been revoked.')
+
+        access = str(token.access_token)
+        token.set_jti()
+        token.set_exp()
+        token.set_iat()
 
         return {
-            'access': str(token.access_token),
+            'access': access,
+            'refresh': str(token),
         }
 
 
 class ResponseRefreshTokenSerializer(serializers.Serializer):
     access = serializers.CharField()
+    refresh = serializers.CharField()
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=False)
+
+    def validate_refresh(self, value):
+        try:
+            token = RefreshToken(value)
+        except TokenError as e:
+            raise serializers.ValidationError(str(e))
+        return token
 
 
 class TeamSerializer(serializers.ModelSerializer):
@@ -147,14 +176,47 @@ class TeamSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         team = TeamModel.objects.create(**validated_data)
+        bump_version('team')
         return team
 
 
-class ResponseTeamSerializer(serializers.ModelSerializer):
+class ResponseTeamSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    members = ResponseUserSerializer(many=True, read_only=True)
+
     class Meta:
         model = TeamModel
-        fields = ('id', 'name', 'members')
-        depth = 1
+        fields = ('id', 'name', 'member_count', 'portfolio_count', 'members')
+        read_only_fields = ('member_count', 'portfolio_count')
+        profiles = {
+            'card': ('id', 'name'),
+        }
+
+    @staticmethod
+    def setup_eager_loading(queryset, fieldset=None):
+        if fieldset is not None and 'members' not in fieldset:
+            return queryset
+        members = UserModel.objects.only(*ResponseUserSerializer.Meta.fields).order_by('id')
+        return queryset.prefetch_related(Prefetch('members', queryset=members))
+
+
+class TeamMemberSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserModel
+        fields = ('id', 'username', 'first_name', 'last_name', 'role')
+
+
+class TeamListSerializer(serializers.ModelSerializer):
+    members = TeamMemberSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = TeamModel
+        fields = ('id', 'name', 'member_count', 'portfolio_count', 'members')
+        read_only_fields = ('member_count', 'portfolio_count')
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        members = UserModel.objects.only(*TeamMemberSerializer.Meta.fields).order_by('id')
+        return queryset.prefetch_related(Prefetch('members', queryset=members))
 
 
 class AddMemberToTeamSerializer(serializers.Serializer):
@@ -204,6 +266,11 @@ class UpdateTeamSerializer(serializers.Serializer):
 
         return data
 
+    def update(self, instance, validated_data):
+        instance.name = validated_data['name']
+        instance.save(update_fields=['name'])
+        return instance
+
 
 class DeleteTeamSerializer(serializers.Serializer):
     team_id = serializers.IntegerField()
@@ -217,3 +284,68 @@ class DeleteTeamSerializer(serializers.Serializer):
         return data
 
 
+class TeamMembersChangeSerializer(serializers.Serializer):
+    add = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    remove = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, data):
+        if not data['add'] and not data['remove']:
+            raise serializers.ValidationError('Nothing to add or remove.')
+        if set(data['add']) & set(data['remove']):
+            raise serializers.ValidationError('A user cannot be both added and removed.')
+        return data
+
+
+class TeamMembershipChangeSerializer(TeamMembersChangeSerializer):
+    team_id = serializers.IntegerField()
+
+
+class TeamMembershipBatchSerializer(serializers.Serializer):
+    max_users = 1000
+
+    teams = TeamMembershipChangeSerializer(many=True, allow_empty=False)
+
+    def validate_teams(self, value):
+        team_ids = [change['team_id'] for change in value]
+        if len(team_ids) != len(set(team_ids)):
+            raise serializers.ValidationError('Each team may appear only once.')
+        user_ids = {user_id for change in value for user_id in (*change['add'], *change['remove'])}
+        if len(user_ids) > self.max_users:
+            raise serializers.ValidationError(f'At most {self.max_users} distinct users per request.')
+
+        # One IN query per table, whatever the size of the batch.
+        errors = {}
+        missing_teams = set(team_ids) - set(TeamModel.objects.filter(id__in=team_ids).values_list('id', flat=True))
+        if missing_teams:
+            errors['missing_teams'] = sorted(missing_teams)
+        missing_users = user_ids - set(UserModel.objects.filter(id__in=user_ids).values_list('id', flat=True))
+        if missing_users:
+            errors['missing_users'] = sorted(missing_users)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return value
+
+    def create(self, validated_data):
+        return {'teams': apply_membership_changes(validated_data['teams'])}
+
+
+class TeamMembershipDiffSerializer(serializers.Serializer):
+    team_id = serializers.IntegerField()
+    added = serializers.ListField(child=serializers.IntegerField())
+    removed = serializers.ListField(child=serializers.IntegerField())
+
+
+class TeamMembershipBatchResultSerializer(serializers.Serializer):
+    teams = TeamMembershipDiffSerializer(many=True)
+
+
+class SkillCountSerializer(serializers.Serializer):
+    skill = serializers.CharField()
+    users = serializers.IntegerField()
+
+
+class SkillSearchResultSerializer(serializers.Serializer):
+    next = serializers.CharField(allow_null=True)
+    previous = serializers.CharField(allow_null=True)
+    results = ResponseUserSerializer(many=True)
+    skills = SkillCountSerializer(many=True)
@@ -0,0 +1,116 @@
+import logging
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from eco_portfolio.cache import bump_version
+from eco_portfolio.counters import apply_deltas
+from eco_portfolio.events import emit
+from .denylist import DenylistUnavailable, revoke_user_tokens
+from .membership import recount_members
+from .models import UserModel, TeamModel
+from .serializers import ResponseUserSerializer
+from .skills import normalize_skills, sync_user_skills
+from .user_cache import invalidate_users
+
+
+logger = logging.getLogger(__name__)
+
+# Cached team payloads nest these member columns.
+MEMBER_FIELDS = set(ResponseUserSerializer.Meta.fields)
+
+
+@receiver(post_save, sender=UserModel)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    invalidate_users([instance.pk])
+    if update_fields is None or MEMBER_FIELDS & set(update_fields):
+        bump_version('team')
+    if not instance.is_active:
+        # Other workers may still hold the user in their local cache for a few
+        # seconds; revoking the tokens shuts the user out everywhere at once.
+        try:
+            revoke_user_tokens(instance.pk)
+        except DenylistUnavailable:
+            # The deactivation itself stands; authentication still turns the
+            # user away once the local user caches expire.
+            logger.warning('Could not revoke the tokens of deactivated user %s', instance.pk, exc_info=True)
+
+
+@receiver(post_save, sender=UserModel)
+def user_skills_saved(sender, instance, update_fields, **kwargs):
+    # Saves such as the last_login update on login leave skills untouched.
+    if update_fields is None or 'skills' in update_fields:
+        sync_user_skills(instance)
+
+
+@receiver(pre_delete, sender=UserModel)
+def user_deleting(sender, instance, **kwargs):
+    # The cascade deletes memberships without m2m_changed.
+    instance._team_ids = list(instance.teams.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=UserModel)
+def user_deleted(sender, instance, **kwargs):
+    invalidate_users([instance.pk])
+    recount_members(getattr(instance, '_team_ids', []))
+    if getattr(instance, '_team_ids', None):
+        bump_version('team')
+    # The cascade deletes the user's skill index rows.
+    if normalize_skills(instance.skills):
+        bump_version('skills')
+
+
+@receiver(m2m_changed, sender=TeamModel.members.through)
+def team_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        invalidate_users([instance.pk])
+    elif action == 'pre_clear':
+        invalidate_users(instance.members.values_list('pk', flat=True))
+    else:
+        invalidate_users(pk_set)
+
+
+@receiver(m2m_changed, sender=TeamModel.members.through)
+def team_member_count_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add' and pk_set:
+        # pk_set only holds the rows actually inserted.
+        apply_deltas(TeamModel, 'member_count', dict.fromkeys(pk_set, 1) if reverse else {instance.pk: len(pk_set)})
+    elif action == 'post_remove' and pk_set:
+        # pk_set holds what was asked for, removed or not, so count what is left.
+        recount_members(pk_set if reverse else [instance.pk])
+    elif action == 'pre_clear' and reverse:
+        instance._team_ids = list(instance.teams.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        recount_members(getattr(instance, '_team_ids', []) if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=TeamModel)
+def team_published(sender, instance, created, **kwargs):
+    emit('team', 'created' if created else 'updated', [{'id': instance.pk}])
+
+
+@receiver(post_delete, sender=TeamModel)
+def team_unpublished(sender, instance, **kwargs):
+    emit('team', 'deleted', [{'id': instance.pk}])
+
+
+@receiver(m2m_changed, sender=TeamModel.members.through)
+def team_members_published(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            instance._cleared_team_ids = list(instance.teams.values_list('pk', flat=True))
+        else:
+            instance._cleared_member_ids = list(instance.members.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        action = 'post_remove'
+        pk_set = getattr(instance, '_cleared_team_ids' if reverse else '_cleared_member_ids', [])
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    name = 'members_added' if action == 'post_add' else 'members_removed'
+    if reverse:
+        emit('team', name, [{'id': team_id, 'members': [instance.pk]} for team_id in sorted(pk_set)])
+    else:
+        emit('team', name, [{'id': instance.pk, 'members': sorted(pk_set)}])
@@ -0,0 +1,86 @@
+from django.db import transaction
+from django.db.models import Count
+
+from eco_portfolio.cache import bump_version
+from .models import UserModel, UserSkillModel
+
+
+MAX_SKILL_LENGTH = UserSkillModel._meta.get_field('skill').max_length
+BATCH_SIZE = 2000
+
+
+def normalize_skill(skill):
+    return ' '.join(str(skill).split()).lower()[:MAX_SKILL_LENGTH]
+
+
+def normalize_skills(skills):
+    if not isinstance(skills, (list, tuple)):
+        return set()
+    return {normalize_skill(skill) for skill in skills if isinstance(skill, str) and skill.strip()}
+
+
+def sync_user_skills(user):
+    """
+    Bring the skill index rows of ``user`` in line with ``user.skills``,
+    touching only the rows that differ.
+    """
+    wanted = normalize_skills(user.skills)
+    with transaction.atomic():
+        current = set(UserSkillModel.objects.filter(user=user).values_list('skill', flat=True))
+        if current == wanted:
+            return False
+        if current - wanted:
+            UserSkillModel.objects.filter(user=user, skill__in=current - wanted).delete()
+        UserSkillModel.objects.bulk_create(
+            [UserSkillModel(user=user, skill=skill) for skill in wanted - current], ignore_conflicts=True,
+        )
+    bump_version('skills')
+    return True
+
+
+def rebuild_skill_index():
+    """
+    Rebuild the whole index from ``UserModel.skills``, e.g. after bulk
+    imports that bypass signals.
+    """
+    with transaction.atomic():
+        UserSkillModel.objects.all().delete()
+        rows = []
+        users = UserModel.objects.exclude(skills=None).values_list('id', 'skills')
+        for user_id, skills in users.iterator(chunk_size=BATCH_SIZE):
+            rows.extend(UserSkillModel(user_id=user_id, skill=skill) for skill in normalize_skills(skills))
+            if len(rows) >= BATCH_SIZE:
+                UserSkillModel.objects.bulk_create(rows)
+                rows = []
+        UserSkillModel.objects.bulk_create(rows)
+    bump_version('skills')
+    return UserSkillModel.objects.count()
+
+
+def users_with_skills(skills, match_all=True):
+    """
+    Users having all (or any) of ``skills``, as a queryset ready for keyset
+    pagination. The skill filter runs on the index as a subquery.
+    """
+    matches = UserSkillModel.objects.filter(skill__in=skills).values('user_id')
+    if match_all and len(skills) > 1:
+        matches = matches.annotate(matched=Count('skill')).filter(matched=len(skills)).values('user_id')
+    return UserModel.objects.filter(id__in=matches)
+
+
+def skill_counts(skills=None, prefix=None, limit=None):
+    """
+    ``[(skill, users), ...]``, most common first, for the given skills, the
+    skills starting with ``prefix``, or every skill.
+    """
+    counts = UserSkillModel.objects.all()
+    if skills is not None:
+        counts = counts.filter(skill__in=skills)
+    if prefix:
+        # A range rather than LIKE, which SQLite cannot answer from the index.
+        prefix = normalize_skill(prefix)
+        counts = counts.filter(skill__gte=prefix, skill__lt=prefix + '\U0010ffff')
+    counts = counts.values('skill').annotate(users=Count('user_id')).order_by('-users', 'skill')
+    if limit is not None:
+        counts = counts[:limit]
+    return [(row['skill'], row['users']) for row in counts]
@@ -1,3 +1,482 @@
-from django.test import TestCase
+import socketserver
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from eco_portfolio import mail
+from . import user_cache
+from .models import UserModel, TeamModel
+
+
+class TeamListQueryBudgetTests(TestCase):
+    # One query for the teams and one prefetch for all of their members.
+    query_budget = 2
+
+    def setUp(self):
+        self.user = UserModel.objects.create_user(username='viewer', email='viewer@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_teams(self, count, members_per_team=3):
+        for i in range(count):
+            team = TeamModel.objects.create(name=f'team-{TeamModel.objects.count()}')
+            members = [
+                UserModel.objects.create_user(username=f'{team.name}-member-{j}', email=f'{team.name}-{j}@example.com')
+                for j in range(members_per_team)
+            ]
+            team.members.add(*members)
+
+    def test_query_count_does_not_grow_with_teams(self):
+        self.create_teams(2)
+        with self.assertNumQueries(self.query_budget):
+            response = self.client.get(reverse('teams'))
+        self.assertEqual(len(response.json()), 2)
+
+        self.create_teams(20)
+        with self.assertNumQueries(self.query_budget):
+            response = self.client.get(reverse('teams'))
+        self.assertEqual(len(response.json()), 22)
+
+    def test_members_are_slim(self):
+        self.create_teams(1, members_per_team=2)
+        team = self.client.get(reverse('teams')).json()[0]
+        self.assertEqual(len(team['members']), 2)
+        for member in team['members']:
+            self.assertEqual(set(member), {'id', 'username', 'first_name', 'last_name', 'role'})
+
+    def test_empty_teams(self):
+        TeamModel.objects.create(name='empty')
+        with self.assertNumQueries(self.query_budget):
+            response = self.client.get(reverse('teams'))
+        self.assertEqual(response.json(), [{
+            'id': response.json()[0]['id'], 'name': 'empty', 'member_count': 0, 'portfolio_count': 0, 'members': [],
+        }])
+
+    def test_member_count_follows_membership(self):
+        self.create_teams(1, members_per_team=3)
+        team = TeamModel.objects.get()
+        team.members.remove(*team.members.all()[:1], self.user)
+        with self.assertNumQueries(self.query_budget):
+            response = self.client.get(reverse('teams'))
+        self.assertEqual(response.json()[0]['member_count'], 2)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TeamDetailTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.member = UserModel.objects.create_user(username='member', email='member@example.com')
+        self.team = TeamModel.objects.create(name='team')
+        self.team.members.add(self.member)
+        self.url = reverse('team-detail', args=[self.team.id])
+
+
+class TeamDetailCacheTests(TeamDetailTestCase):
+
+    def test_repeated_reads_are_cached(self):
+        first = self.client.get(self.url).json()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).json(), first)
+
+    def test_member_updates_are_shown(self):
+        self.client.get(self.url)
+        self.member.first_name = 'Renamed'
+        self.member.save()
+        members = self.client.get(self.url).json()['members']
+        self.assertEqual(members[0]['first_name'], 'Renamed')
+
+    def test_deleted_members_are_dropped(self):
+        self.client.get(self.url)
+        self.member.delete()
+        self.assertEqual(self.client.get(self.url).json()['members'], [])
+
+    def test_unrelated_user_fields_keep_the_cache(self):
+        self.client.get(self.url)
+        self.member.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+
+class TeamDetailAsyncTests(TeamDetailTestCase):
+    async def test_matches_sync_view(self):
+        response = await self.async_client.get(reverse('team-detail-async', args=[self.team.id]))
+        self.assertEqual(response.status_code, 200)
+        expected = await sync_to_async(self.client.get)(self.url)
+        self.assertEqual(response.json(), expected.json())
+
+    async def test_missing_team(self):
+        response = await self.async_client.get(reverse('team-detail-async', args=[999]))
+        self.assertEqual((response.status_code, response.json()), (404, {'detail': 'Not found.'}))
+
+    async def test_member_updates_are_shown(self):
+        url = reverse('team-detail-async', args=[self.team.id])
+        await self.async_client.get(url)
+        self.member.first_name = 'Renamed'
+        await self.member.asave()
+        members = (await self.async_client.get(url)).json()['members']
+        self.assertEqual(members[0]['first_name'], 'Renamed')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TokenRevocationTests(TestCase):
+    password = 'Secret-passw0rd'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = UserModel.objects.create_user(username='user', email='user@example.com', password=self.password)
+
+    def login(self):
+        response = self.client.post(reverse('login'), {'username': 'user', 'password': self.password})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def me(self, tokens):
+        return self.client.get(reverse('me'), HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}').status_code
+
+    def refresh(self, tokens):
+        return self.client.post(reverse('refresh-token'), {'refresh': tokens['refresh']})
+
+    def test_refresh_rotates_and_is_single_use(self):
+        tokens = self.login()
+        response = self.refresh(tokens)
+        self.assertEqual(response.status_code, 200)
+        rotated = response.json()
+        self.assertNotEqual(rotated['refresh'], tokens['refresh'])
+        self.assertEqual(self.me(rotated), 200)
+
+        response = self.refresh(tokens)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'non_field_errors': ['Token has been revoked.']})
+        self.assertEqual(self.refresh(rotated).status_code, 200)
+
+    def test_logout_revokes_the_session(self):
+        tokens, other = self.login(), self.login()
+        response = self.client.post(reverse('logout'), {'refresh': tokens['refresh']},
+                                    HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.me(tokens), 401)
+        self.assertEqual(self.refresh(tokens).status_code, 400)
+        self.assertEqual(self.me(other), 200)
+
+    def test_logout_all_revokes_earlier_sessions_only(self):
+        issued = timezone.now() - timedelta(seconds=5)
+        with mock.patch('rest_framework_simplejwt.tokens.aware_utcnow', return_value=issued):
+            earlier = self.login()
+        tokens = self.login()
+        response = self.client.post(reverse('logout-all'), HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.me(earlier), 401)
+        self.assertEqual(self.refresh(earlier).status_code, 400)
+        # The caller's own token was issued in the same second and is revoked by jti.
+        self.assertEqual(self.me(tokens), 401)
+
+        # Signing in again right away works.
+        self.assertEqual(self.me(self.login()), 200)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:1/0',
+        'OPTIONS': {'IGNORE_EXCEPTIONS': True},
+    }})
+    def test_unreachable_denylist_fails_closed(self):
+        tokens = self.login()
+        self.assertEqual(self.me(tokens), 503)
+        self.assertEqual(self.refresh(tokens).status_code, 503)
+
+        # Deactivating still works, the failed revocation is only logged.
+        self.user.is_active = False
+        with self.assertLogs('users.signals', 'WARNING'):
+            self.user.save()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class UserCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.local_cache.clear()
+        user_cache.reset_stats()
+        self.user = UserModel.objects.create_user(username='user', email='user@example.com', skills=['python'])
+
+    def test_tiers(self):
+        user_cache.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user_cache.get_user(self.user.pk)
+            user_cache.local_cache.clear()
+            user_cache.get_user(self.user.pk)
+        stats = user_cache.get_stats()
+        self.assertEqual((stats['misses'], stats['local_hits'], stats['redis_hits']), (1, 1, 1))
+        self.assertIsNone(user_cache.get_user(999))
+
+    def test_copies_are_private(self):
+        user = user_cache.get_user(self.user.pk)
+        user.skills.append('go')
+        user.first_name = 'Changed'
+        user._state.db = 'other'
+        user = user_cache.get_user(self.user.pk)
+        self.assertEqual((user.skills, user.first_name, user._state.db), (['python'], None, 'default'))
+
+    def test_saves_invalidate(self):
+        user_cache.get_user(self.user.pk)
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        self.assertEqual(user_cache.get_user(self.user.pk).first_name, 'Renamed')
+
+    def test_read_racing_an_invalidation_is_not_cached(self):
+        stale = UserModel.objects.get(pk=self.user.pk)
+
+        def read_then_update():
+            # The row changes after it was read but before it is cached.
+            UserModel.objects.filter(pk=self.user.pk).update(first_name='Renamed')
+            user_cache.invalidate_users([self.user.pk])
+            return stale
+
+        with mock.patch('users.user_cache.UserModel') as model:
+            model.objects.filter.return_value.first.side_effect = read_then_update
+            self.assertIsNone(user_cache.get_user(self.user.pk).first_name)
+        self.assertEqual(user_cache.get_user(self.user.pk).first_name, 'Renamed')
+
+
+class TeamMembershipTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(UserModel.objects.create_user(username='admin', email='admin@example.com'))
+        self.users = [
+            UserModel.objects.create_user(username=f'user-{i}', email=f'user-{i}@example.com') for i in range(3)
+        ]
+        self.ids = [user.id for user in self.users]
+        self.team = TeamModel.objects.create(name='team')
+        self.other = TeamModel.objects.create(name='other')
+        self.url = reverse('team-members', args=[self.team.id])
+
+    def test_add_and_remove(self):
+        response = self.client.post(self.url, {'add': self.ids[:2]}, format='json')
+        self.assertEqual(response.json(), {'team_id': self.team.id, 'added': self.ids[:2], 'removed': []})
+
+        response = self.client.post(self.url, {'add': self.ids[1:], 'remove': self.ids[:1]}, format='json')
+        self.assertEqual(response.json(), {'team_id': self.team.id, 'added': self.ids[2:], 'removed': self.ids[:1]})
+        self.assertEqual(sorted(self.team.members.values_list('id', flat=True)), self.ids[1:])
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.member_count, 2)
+
+    def test_form_bodies_keep_repeated_fields(self):
+        response = self.client.post(self.url, {'add': self.ids})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['added'], self.ids)
+
+    def test_invalid_bodies(self):
+        for body in ([1, 2], 'add', {}, {'add': [self.ids[0]], 'remove': [self.ids[0]]}):
+            response = self.client.post(self.url, body, format='json')
+            self.assertEqual(response.status_code, 400, body)
+
+        response = self.client.post(self.url, {'add': [999]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'teams': {'missing_users': ['999']}})
+
+    def test_batch(self):
+        # Teams and users are checked and memberships read with one query each.
+        with self.assertNumQueries(7):
+            response = self.client.post(reverse('teams-members'), {'teams': [
+                {'team_id': self.team.id, 'add': self.ids},
+                {'team_id': self.other.id, 'add': self.ids[:1]},
+            ]}, format='json')
+        self.assertEqual(response.json(), {'teams': [
+            {'team_id': self.team.id, 'added': self.ids, 'removed': []},
+            {'team_id': self.other.id, 'added': self.ids[:1], 'removed': []},
+        ]})
+        self.assertEqual(
+            dict(TeamModel.objects.values_list('name', 'member_count')), {'team': 3, 'other': 1},
+        )
+
+    def test_concurrent_changes_keep_the_count(self):
+        Membership = TeamModel.members.through
+        bulk_create = Membership.objects.bulk_create
+
+        def raced_bulk_create(objs, **kwargs):
+            # Another request adds the first member between the read and the insert.
+            self.team.members.add(self.ids[0])
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(Membership.objects, 'bulk_create', raced_bulk_create):
+            self.client.post(self.url, {'add': self.ids}, format='json')
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.member_count, 3)
+
+    def test_batch_rejects_duplicate_teams(self):
+        response = self.client.post(reverse('teams-members'), {'teams': [
+            {'team_id': self.team.id, 'add': self.ids[:1]},
+            {'team_id': self.team.id, 'add': self.ids[1:]},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.team.members.exists())
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SkillIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(UserModel.objects.create_user(username='viewer', email='viewer@example.com'))
+        self.user = UserModel.objects.create_user(
+            username='user', email='user@example.com', skills=['Python', ' Machine   Learning ', 'python', 3],
+        )
+
+    def skills(self):
+        return self.client.get(reverse('skills')).json()
+
+    def test_skills_are_normalized(self):
+        self.assertEqual(set(self.user.skill_index.values_list('skill', flat=True)), {'python', 'machine learning'})
+        self.assertEqual(self.skills(), [
+            {'skill': 'machine learning', 'users': 1},
+            {'skill': 'python', 'users': 1},
+        ])
+
+    def test_counts_follow_edits_and_deletes(self):
+        self.skills()
+        UserModel.objects.create_user(username='other', email='other@example.com', skills=['python'])
+        self.assertEqual(self.skills()[0], {'skill': 'python', 'users': 2})
+
+        self.user.skills = ['go']
+        self.user.save()
+        self.assertEqual(self.skills(), [{'skill': 'go', 'users': 1}, {'skill': 'python', 'users': 1}])
+
+        self.user.delete()
+        self.assertEqual(self.skills(), [{'skill': 'python', 'users': 1}])
+
+    def test_search(self):
+        UserModel.objects.create_user(username='other', email='other@example.com', skills=['python', 'go'])
+        data = self.client.get(reverse('skill-search'), {'skills': 'PYTHON,machine learning'}).json()
+        self.assertEqual([user['username'] for user in data['results']], ['user'])
+        self.assertEqual(data['skills'], [{'skill': 'python', 'users': 2}, {'skill': 'machine learning', 'users': 1}])
+        data = self.client.get(reverse('skill-search'), {'skills': 'go,machine learning', 'mode': 'or'}).json()
+        self.assertEqual([user['username'] for user in data['results']], ['user', 'other'])
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply('220 stand-in ESMTP')
+        for line in self.rfile:
+            command = line.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 stand-in')
+            elif command == 'DATA':
+                self.reply('354 end data with <CR><LF>.<CR><LF>')
+                data = []
+                for line in self.rfile:
+                    if line.rstrip(b'\r\n') == b'.':
+                        break
+                    data.append(line)
+                with server.lock:
+                    if server.defer:
+                        server.defer -= 1
+                        self.reply('451 try again later')
+                        continue
+                    server.messages.append(b''.join(data).decode())
+                self.reply('250 queued')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                break
+            else:
+                self.reply('250 ok')
+
+    def reply(self, text):
+        self.wfile.write(f'{text}\r\n'.encode())
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """
+    A local SMTP server recording the messages it accepts. The first
+    ``defer`` messages are refused with a temporary 451.
+    """
+    daemon_threads = True
+
+    def __init__(self, defer=0):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = []
+        self.defer = defer
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+class NotificationMailTests(TestCase):
+    def setUp(self):
+        self.smtp = SMTPStandIn()
+        self.addCleanup(self.smtp.server_close)
+        self.addCleanup(self.smtp.shutdown)
+        settings = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=self.smtp.server_address[1], EMAIL_USE_TLS=False,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(mail.mail_queue.close)
+        self.client = APIClient()
+
+    def register(self, username):
+        return self.client.post(reverse('register'), {
+            'username': username, 'email': f'{username}@example.com', 'password': 'Secret-passw0rd',
+        }, format='json')
+
+    def test_mail_is_queued_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.register('alice')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.smtp.messages, [])
+
+        callbacks[0]()
+        self.assertTrue(mail.mail_queue.drain(timeout=5))
+        self.assertEqual(len(self.smtp.messages), 1)
+        self.assertIn('To: alice@example.com', self.smtp.messages[0])
+
+    def test_messages_share_one_connection(self):
+        user = UserModel.objects.create_user(username='owner', email='owner@example.com')
+        team = TeamModel.objects.create(name='green')
+        members = [UserModel.objects.create_user(username=f'm{i}', email=f'm{i}@example.com') for i in range(3)]
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            for member in members:
+                response = self.client.post(reverse('team-add-member', args=[team.id]), {'user_id': member.id})
+                self.assertEqual(response.status_code, 200)
+        self.assertTrue(mail.mail_queue.drain(timeout=5))
+        self.assertEqual(len(self.smtp.messages), 3)
+        self.assertEqual(self.smtp.connections, 1)
+
+    def test_membership_mail_only_on_change(self):
+        user = UserModel.objects.create_user(username='owner', email='owner@example.com')
+        team = TeamModel.objects.create(name='green')
+        member = UserModel.objects.create_user(username='member', email='member@example.com')
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            for name in ('team-add-member', 'team-add-member', 'team-remove-member', 'team-remove-member'):
+                response = self.client.post(reverse(name, args=[team.id]), {'user_id': member.id})
+                self.assertEqual(response.status_code, 200)
+        self.assertTrue(mail.mail_queue.drain(timeout=5))
+        self.assertEqual(len(self.smtp.messages), 2)
+        self.assertIn('Subject: You joined green', self.smtp.messages[0])
+        self.assertIn('Subject: You left green', self.smtp.messages[1])
+        team.refresh_from_db()
+        self.assertEqual(team.member_count, 0)
+
+    def test_temporary_failures_are_retried(self):
+        self.smtp.defer = 2
+        with mock.patch.object(mail, 'RETRY_DELAY', 0.01):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.register('bob')
+            self.assertEqual(response.status_code, 201)
+            self.assertTrue(mail.mail_queue.drain(timeout=5))
+        self.assertEqual(self.smtp.defer, 0)
+        self.assertEqual(len(self.smtp.messages), 1)
+        self.assertIn('To: bob@example.com', self.smtp.messages[0])
@@ -1,17 +1,27 @@
 from django.urls import path
+from . import async_views
 from .views import RegisterUserView, UsersListView, RefreshTokenView, UserMeView, UserDetailView, LoginView, \
-    TeamView, TeamAddMemberView, TeamRemoveMemberView, TeamDetailView
+    TeamView, TeamAddMemberView, TeamRemoveMemberView, TeamDetailView, LogoutView, LogoutAllView, \
+    TeamMembersView, TeamMembershipBatchView, SkillSearchView, SkillsView
 
 urlpatterns = [
     path('register/', RegisterUserView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
     path('me/', UserMeView.as_view(), name='me'),
     path('refresh-token/', RefreshTokenView.as_view(), name='refresh-token'),
+    path('logout/', LogoutView.as_view(), name='logout'),
+    path('logout-all/', LogoutAllView.as_view(), name='logout-all'),
     path('users/', UsersListView.as_view(), name='users-list'),
     path('user/<int:user_id>/', UserDetailView.as_view(), name='user-detail'),
+    path('skills/', SkillsView.as_view(), name='skills'),
+    path('skills/search/', SkillSearchView.as_view(), name='skill-search'),
 
     path('teams/', TeamView.as_view(), name='teams'),
+    path('teams/members/', TeamMembershipBatchView.as_view(), name='teams-members'),
     path('team/<int:team_id>/', TeamDetailView.as_view(), name='team-detail'),
     path('team/<int:team_id>/add-member/', TeamAddMemberView.as_view(), name='team-add-member'),
     path('team/<int:team_id>/remove-member/', TeamRemoveMemberView.as_view(), name='team-remove-member'),
+    path('team/<int:team_id>/members/', TeamMembersView.as_view(), name='team-members'),
+
+    path('async/team/<int:team_id>/', async_views.team_detail, name='team-detail-async'),
 ]
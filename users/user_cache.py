@@ -0,0 +1,127 @@
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from eco_portfolio import metrics
+from .models import UserModel
+
+
+# Two tiers: a small per-process LRU that answers without any I/O, in front
+# of Redis shared by all workers. Saves invalidate both tiers of the current
+# process and Redis; other processes' LRU entries age out after LOCAL_TIMEOUT.
+# Redis entries carry the user's version at the time they were read from the
+# database; invalidating replaces the version, so an entry written by a read
+# that raced with the invalidation is never served.
+USER_KEY = 'auth:user:{}'
+USER_VERSION_KEY = 'auth:user:{}:version'
+REDIS_TIMEOUT = 60
+# Outlives every entry, so an expired version never matches a stale entry.
+VERSION_TIMEOUT = 2 * REDIS_TIMEOUT
+LOCAL_TIMEOUT = 5
+LOCAL_MAXSIZE = 1024
+
+
+class LRUCache:
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every delete; set() with an older generation is dropped.
+        self.generation = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self.generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+
+
+local_cache = LRUCache(LOCAL_MAXSIZE, LOCAL_TIMEOUT)
+_stats = {'local_hits': 0, 'redis_hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+    metrics.inc('auth_user_cache_lookups_total', {'result': outcome})
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    total = sum(stats.values())
+    stats['hit_ratio'] = (stats['local_hits'] + stats['redis_hits']) / total if total else 0.0
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        for outcome in _stats:
+            _stats[outcome] = 0
+
+
+def get_user(user_id):
+    """
+    Return a private copy of the user with ``user_id`` or None. Callers may
+    modify the instance without affecting what other requests see.
+    """
+    key, version_key = USER_KEY.format(user_id), USER_VERSION_KEY.format(user_id)
+    user = local_cache.get(key)
+    if user is not None:
+        _count('local_hits')
+        return copy.deepcopy(user)
+
+    generation = local_cache.generation
+    values = cache.get_many([key, version_key])
+    version = values.get(version_key)
+    entry = values.get(key)
+    if isinstance(entry, tuple) and entry[0] == version:
+        user = entry[1]
+        _count('redis_hits')
+    else:
+        _count('misses')
+        user = UserModel.objects.filter(pk=user_id).first()
+        if user is None:
+            return None
+        cache.set(key, (version, user), REDIS_TIMEOUT)
+    local_cache.set(key, user, generation)
+    return copy.deepcopy(user)
+
+
+def invalidate_users(user_ids):
+    keys = [USER_KEY.format(user_id) for user_id in user_ids]
+    for key in keys:
+        local_cache.delete(key)
+    cache.set_many({USER_VERSION_KEY.format(user_id): uuid.uuid4().hex for user_id in user_ids}, VERSION_TIMEOUT)
+    cache.delete_many(keys)
@@ -1,12 +1,21 @@
 from .serializers import UserSerializer, LoginSerializer, ResponseUserSerializer, ResponseLoginSerializer, \
     RefreshTokenSerializer, ResponseRefreshTokenSerializer, TeamSerializer, ResponseTeamSerializer, AddMemberToTeamSerializer, \
-    DeleteTeamSerializer, RemoveMemberFromTeamSerializer, UpdateTeamSerializer
+    DeleteTeamSerializer, RemoveMemberFromTeamSerializer, UpdateTeamSerializer, TeamListSerializer, LogoutSerializer, \
+    TeamMembersChangeSerializer, TeamMembershipBatchSerializer, TeamMembershipDiffSerializer, \
+    TeamMembershipBatchResultSerializer, SkillCountSerializer, SkillSearchResultSerializer
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from rest_framework_simplejwt.settings import api_settings
+from eco_portfolio.docs import openapi, swagger_auto_schema
+from eco_portfolio.cache import bump_version, cache_response
+from eco_portfolio.fieldsets import fieldset_parameters
+from eco_portfolio.pagination import KeysetPagination, pagination_parameters
+from .denylist import revoke_token, revoke_user_tokens
+from .membership import apply_membership_changes
 from .models import UserModel, TeamModel
+from .notifications import notify_membership_changed, notify_registered
+from .skills import normalize_skills, skill_counts, users_with_skills
 
 
 class RegisterUserView(APIView):
@@ -25,7 +34,8 @@ class RegisterUserView(APIView):
     def post(self, request):
         serializer = UserSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            user = serializer.save()
+            notify_registered(user)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -54,6 +64,7 @@ class UserMeView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     @swagger_auto_schema(
+        manual_parameters=fieldset_parameters,
         responses={
             200: openapi.Response(
                 'User details retrieved successfully.',
@@ -63,7 +74,8 @@ class UserMeView(APIView):
         tags=['users'],
     )
     def get(self, request):
-        serializer = ResponseUserSerializer(request.user)
+        fieldset = ResponseUserSerializer.get_fieldset(request.query_params)
+        serializer = ResponseUserSerializer(request.user, context={'fields': fieldset})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -71,6 +83,7 @@ class UserDetailView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     @swagger_auto_schema(
+        manual_parameters=fieldset_parameters,
         responses={
             200: openapi.Response(
                 'User details retrieved successfully.',
@@ -80,8 +93,9 @@ class UserDetailView(APIView):
         tags=['users'],
     )
     def get(self, request, user_id):
-        user = UserModel.objects.get(id=user_id)
-        serializer = ResponseUserSerializer(user)
+        fieldset = ResponseUserSerializer.get_fieldset(request.query_params)
+        user = ResponseUserSerializer.narrow_queryset(UserModel.objects.all(), fieldset).get(id=user_id)
+        serializer = ResponseUserSerializer(user, context={'fields': fieldset})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -89,6 +103,7 @@ class UsersListView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     @swagger_auto_schema(
+        manual_parameters=fieldset_parameters + pagination_parameters,
         responses={
             200: openapi.Response(
                 'Users retrieved successfully.',
@@ -98,8 +113,14 @@ class UsersListView(APIView):
         tags=['users'],
     )
     def get(self, request):
-        users = UserModel.objects.all()
-        serializer = ResponseUserSerializer(users, many=True)
+        fieldset = ResponseUserSerializer.get_fieldset(request.query_params)
+        users = ResponseUserSerializer.narrow_queryset(UserModel.objects.all(), fieldset, keep=('date_joined',))
+        paginator = KeysetPagination(ordering=('date_joined', 'id'))
+        page = paginator.paginate_queryset(users, request)
+        if page is not None:
+            serializer = ResponseUserSerializer(page, many=True, context={'fields': fieldset})
+            return paginator.get_paginated_response(serializer.data)
+        serializer = ResponseUserSerializer(users, many=True, context={'fields': fieldset})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -123,6 +144,46 @@ class RefreshTokenView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class LogoutView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @swagger_auto_schema(
+        request_body=LogoutSerializer,
+        responses={
+            204: openapi.Response(
+                'The current access token and the given refresh token are revoked.',
+            ),
+        },
+        tags=['users'],
+    )
+    def post(self, request):
+        serializer = LogoutSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        refresh = serializer.validated_data.get('refresh')
+        if refresh is not None and str(refresh.get(api_settings.USER_ID_CLAIM)) == str(request.user.pk):
+            revoke_token(refresh)
+        revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class LogoutAllView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @swagger_auto_schema(
+        responses={
+            204: openapi.Response(
+                'Every token issued to the user so far is revoked.',
+            ),
+        },
+        tags=['users'],
+    )
+    def post(self, request):
+        revoke_user_tokens(request.user.pk)
+        revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class TeamView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -130,14 +191,14 @@ class TeamView(APIView):
         responses={
             200: openapi.Response(
                 'Teams retrieved successfully.',
-                ResponseTeamSerializer,
+                TeamListSerializer,
             ),
         },
         tags=['teams'],
     )
     def get(self, request):
-        teams = TeamModel.objects.all()
-        serializer = ResponseTeamSerializer(teams, many=True)
+        teams = TeamListSerializer.setup_eager_loading(TeamModel.objects.order_by('id'))
+        serializer = TeamListSerializer(teams, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
@@ -164,6 +225,7 @@ class TeamDetailView(APIView):
             return permissions.AllowAny(),
         return permissions.IsAuthenticated(),
     @swagger_auto_schema(
+        manual_parameters=fieldset_parameters,
         responses={
             200: openapi.Response(
                 'Team details retrieved successfully.',
@@ -172,9 +234,11 @@ class TeamDetailView(APIView):
         },
         tags=['teams'],
     )
+    @cache_response('team-detail', ['team'])
     def get(self, request, team_id):
-        team = TeamModel.objects.get(id=team_id)
-        serializer = ResponseTeamSerializer(team)
+        fieldset = ResponseTeamSerializer.get_fieldset(request.query_params)
+        team = ResponseTeamSerializer.setup_eager_loading(TeamModel.objects.all(), fieldset).get(id=team_id)
+        serializer = ResponseTeamSerializer(team, context={'fields': fieldset})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
@@ -191,8 +255,9 @@ class TeamDetailView(APIView):
         team = TeamModel.objects.get(id=team_id)
         serializer = UpdateTeamSerializer(team, data=request.data)
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            team = serializer.save()
+            bump_version('team')
+            return Response(ResponseTeamSerializer(team).data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @swagger_auto_schema(
@@ -207,9 +272,11 @@ class TeamDetailView(APIView):
     )
     def delete(self, request, team_id):
         team = TeamModel.objects.get(id=team_id)
+        # Serialized first: members can no longer be read once the team is gone.
+        data = ResponseTeamSerializer(team).data
         team.delete()
-        serializer = ResponseTeamSerializer(team)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        bump_version('team', 'portfolio')
+        return Response(data, status=status.HTTP_200_OK)
 
 
 class TeamAddMemberView(APIView):
@@ -225,10 +292,12 @@ class TeamAddMemberView(APIView):
         },
         tags=['teams'],
     )
-    def post(self, request):
-        team = TeamModel.objects.get(id=request.data['team_id'])
+    def post(self, request, team_id):
+        team = TeamModel.objects.get(id=team_id)
         user = UserModel.objects.get(id=request.data['user_id'])
-        team.members.add(user)
+        # Mail only goes out when the membership actually changed.
+        if apply_membership_changes([{'team_id': team.id, 'add': [user.id], 'remove': []}])[0]['added']:
+            notify_membership_changed(team, user, added=True)
         serializer = ResponseTeamSerializer(team)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -246,9 +315,126 @@ class TeamRemoveMemberView(APIView):
         },
         tags=['teams'],
     )
-    def post(self, request):
-        team = TeamModel.objects.get(id=request.data['team_id'])
+    def post(self, request, team_id):
+        team = TeamModel.objects.get(id=team_id)
         user = UserModel.objects.get(id=request.data['user_id'])
-        team.members.remove(user)
+        if apply_membership_changes([{'team_id': team.id, 'add': [], 'remove': [user.id]}])[0]['removed']:
+            notify_membership_changed(team, user, added=False)
         serializer = ResponseTeamSerializer(team)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class TeamMembersView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @swagger_auto_schema(
+        request_body=TeamMembersChangeSerializer,
+        responses={
+            200: openapi.Response(
+                'Members actually added and removed.',
+                TeamMembershipDiffSerializer,
+            ),
+        },
+        tags=['teams'],
+    )
+    def post(self, request, team_id):
+        # Validated on its own first: that rejects bodies that are not objects
+        # and reads repeated form fields as lists.
+        change = TeamMembersChangeSerializer(data=request.data)
+        if not change.is_valid():
+            return Response(change.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer = TeamMembershipBatchSerializer(data={'teams': [{**change.validated_data, 'team_id': team_id}]})
+        if serializer.is_valid():
+            result = serializer.save()
+            return Response(result['teams'][0], status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class TeamMembershipBatchView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @swagger_auto_schema(
+        request_body=TeamMembershipBatchSerializer,
+        responses={
+            200: openapi.Response(
+                'Members actually added and removed, per team.',
+                TeamMembershipBatchResultSerializer,
+            ),
+        },
+        tags=['teams'],
+    )
+    def post(self, request):
+        serializer = TeamMembershipBatchSerializer(data=request.data)
+        if serializer.is_valid():
+            return Response(serializer.save(), status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class SkillSearchView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    max_skills = 20
+
+    @swagger_auto_schema(
+        manual_parameters=fieldset_parameters + [
+            openapi.Parameter('skills', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True,
+                              description='Comma-separated skills, matched case-insensitively.'),
+            openapi.Parameter('mode', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['and', 'or'],
+                              description='"and" (default) requires every skill, "or" any of them.'),
+        ] + pagination_parameters,
+        responses={
+            200: openapi.Response(
+                'A page of matching users and how many users have each requested skill.',
+                SkillSearchResultSerializer,
+            ),
+        },
+        tags=['users'],
+    )
+    def get(self, request):
+        skills = normalize_skills(request.query_params.get('skills', '').split(','))
+        if not skills:
+            return Response({'skills': ['This query parameter is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        if len(skills) > self.max_skills:
+            return Response({'skills': [f'At most {self.max_skills} skills.']}, status=status.HTTP_400_BAD_REQUEST)
+        mode = request.query_params.get('mode', 'and')
+        if mode not in ('and', 'or'):
+            return Response({'mode': ['Must be "and" or "or".']}, status=status.HTTP_400_BAD_REQUEST)
+
+        fieldset = ResponseUserSerializer.get_fieldset(request.query_params)
+        users = users_with_skills(sorted(skills), match_all=mode == 'and')
+        users = ResponseUserSerializer.narrow_queryset(users, fieldset, keep=('date_joined',))
+        paginator = KeysetPagination(ordering=('date_joined', 'id'), optional=False)
+        page = paginator.paginate_queryset(users, request)
+        data = paginator.get_paginated_data(ResponseUserSerializer(page, many=True, context={'fields': fieldset}).data)
+        data['skills'] = SkillCountSerializer(
+            [{'skill': skill, 'users': count} for skill, count in skill_counts(skills=skills)], many=True,
+        ).data
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class SkillsView(APIView):
+    max_limit = 100
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('prefix', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description='Only skills starting with this text.'),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description='Maximum number of skills, at most 100.'),
+        ],
+        responses={
+            200: openapi.Response(
+                'Skills with the number of users having them, most common first.',
+                SkillCountSerializer(many=True),
+            ),
+        },
+        tags=['users'],
+    )
+    @cache_response('skills', ['skills'])
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.max_limit)
+        except ValueError:
+            return Response({'limit': ['A valid integer is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        counts = skill_counts(prefix=request.query_params.get('prefix'), limit=limit)
+        serializer = SkillCountSerializer([{'skill': skill, 'users': count} for skill, count in counts], many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)